@@ -0,0 +1,6 @@
+from django.contrib import admin
+
+from apps.jobs.models import Job, PeriodicSchedule
+
+admin.site.register(Job)
+admin.site.register(PeriodicSchedule)
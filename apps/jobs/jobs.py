@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.jobs.models import Job
+from apps.jobs.registry import task
+
+
+@task(every=timedelta(days=1))
+def purge_finished_jobs():
+    """
+    Delete the jobs finished more than ``JOBS_RETENTION_DAYS`` ago.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.JOBS_RETENTION_DAYS)
+    Job.all_objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=cutoff).delete()
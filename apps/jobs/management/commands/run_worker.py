@@ -0,0 +1,27 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from apps.jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Runs the queued background jobs and the periodic tasks until stopped (SIGINT/SIGTERM)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Jobs run at once, each in a thread')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds between polls while no job is due')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due')
+
+    def handle(self, *args, **options):
+        worker = Worker(concurrency=options['concurrency'], poll_interval=options['poll_interval'])
+        if not options['once']:
+            signal.signal(signal.SIGINT, worker.stop)
+            signal.signal(signal.SIGTERM, worker.stop)
+            self.stdout.write(f'Worker {worker.name} running {options["concurrency"]} jobs at once')
+        worker.run(once=options['once'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Worker stopped: {worker.succeeded} jobs done, {worker.failed} failed')
+        )
@@ -0,0 +1,73 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from utils.models import BaseModel
+
+
+class Job(BaseModel):
+    """
+    One run of a task (see ``apps.jobs.registry``), executed by ``manage.py run_worker``.
+
+    Jobs are queued in the transaction of the write that needs them, so they
+    are only seen by workers once that write commits. While a job runs, the
+    worker holds it until ``locked_until``; a job whose worker died is taken
+    again once that lease expires.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=255)
+    kwargs = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    # Jobs queued with the key of a job still pending are dropped.
+    key = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    locked_by = models.CharField(max_length=255, null=True, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # Polled by every worker; finished jobs stay out of the index.
+            models.Index(
+                fields=['run_at'],
+                condition=Q(status__in=['pending', 'running']),
+                name='job_due_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=Q(status='pending'),
+                name='unique_pending_job_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class PeriodicSchedule(BaseModel):
+    """
+    Next run of a periodic task. Workers queue a run by moving ``next_run_at``
+    forward with a compare-and-set, so each run is queued once however many
+    workers poll.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    next_run_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} at {self.next_run_at}"
@@ -0,0 +1,173 @@
+"""
+The job queue: queueing, claiming and finishing jobs, all through the
+database, so it needs no broker.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection
+from django.db import transaction as db_transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.jobs.models import Job, PeriodicSchedule
+from apps.jobs.registry import get_task, periodic_tasks
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between two attempts of a failing job.
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+
+def build_job(task, key=None, run_at=None, **kwargs):
+    """
+    Unsaved job running ``task`` (a task function or name) with ``kwargs``.
+    """
+    registered = get_task(task)
+    return Job(
+        name=registered.name,
+        kwargs=kwargs,
+        key=key,
+        run_at=run_at or timezone.now(),
+        max_attempts=registered.max_attempts,
+    )
+
+
+def enqueue(task, key=None, run_at=None, **kwargs):
+    """
+    Queue a run of ``task`` with ``kwargs`` in the current transaction.
+    Nothing is queued while a job with the same ``key`` is pending.
+    """
+    enqueue_many([build_job(task, key=key, run_at=run_at, **kwargs)])
+
+
+def enqueue_many(jobs):
+    """
+    Queue the jobs of ``build_job`` in a single INSERT.
+    """
+    Job.objects.bulk_create(jobs, ignore_conflicts=True)
+
+
+def retry_delay(attempts):
+    """
+    Wait before retrying a job that failed ``attempts`` times: doubles from
+    ``JOBS_RETRY_BACKOFF`` seconds up to ``MAX_RETRY_DELAY``.
+    """
+    return min(timedelta(seconds=settings.JOBS_RETRY_BACKOFF * 2 ** (attempts - 1)), MAX_RETRY_DELAY)
+
+
+@db_transaction.atomic
+def claim(worker, count):
+    """
+    Hand ``worker`` up to ``count`` due jobs, oldest first, leased for
+    ``settings.JOBS_LEASE`` seconds.
+
+    Same protocol as ``claim_withdrawals``: candidates are locked with
+    ``SELECT ... FOR UPDATE SKIP LOCKED`` so concurrent workers take disjoint
+    jobs, and databases without SKIP LOCKED (SQLite) rely on the
+    compare-and-set UPDATE alone.
+    """
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=settings.JOBS_LEASE)
+    claimable = Q(status=Job.PENDING) | Q(status=Job.RUNNING, locked_until__lte=now)
+    candidates = Job.objects.filter(claimable, run_at__lte=now)
+    if connection.features.has_select_for_update_skip_locked:
+        candidates = candidates.select_for_update(skip_locked=True)
+    ids = list(candidates.order_by('run_at').values_list('pk', flat=True)[:count])
+    if not ids:
+        return []
+
+    Job.objects.filter(claimable, pk__in=ids).update(
+        status=Job.RUNNING,
+        locked_by=worker,
+        locked_until=locked_until,
+        attempts=F('attempts') + 1,
+        updated_at=now,
+    )
+    return list(Job.objects.filter(pk__in=ids, locked_by=worker, locked_until=locked_until).order_by('run_at'))
+
+
+def held(job):
+    """
+    The job as long as its worker still holds it; a job taken over after its
+    lease expired belongs to the new worker.
+    """
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by, locked_until=job.locked_until)
+
+
+def complete(job):
+    now = timezone.now()
+    held(job).update(status=Job.DONE, finished_at=now, locked_by=None, locked_until=None, updated_at=now)
+
+
+def fail(job, error):
+    """
+    Record a failed attempt of ``job``: it is retried after ``retry_delay``,
+    or marked failed once it used up its attempts.
+    """
+    now = timezone.now()
+    failed = {'status': Job.FAILED, 'finished_at': now, 'last_error': error,
+              'locked_by': None, 'locked_until': None, 'updated_at': now}
+    if job.attempts >= job.max_attempts:
+        held(job).update(**failed)
+        return
+    try:
+        with db_transaction.atomic():
+            held(job).update(status=Job.PENDING, run_at=now + retry_delay(job.attempts), last_error=error,
+                             locked_by=None, locked_until=None, updated_at=now)
+    except IntegrityError:
+        # A job with the same key was queued meanwhile and will redo the work.
+        held(job).update(**failed)
+
+
+def run(job):
+    """
+    Run a claimed job and record its outcome. Returns whether it succeeded.
+    """
+    try:
+        if job.attempts > job.max_attempts:
+            # Its worker kept dying before finishing it.
+            raise RuntimeError('Lease expired on the last attempt')
+        get_task(job.name).func(**job.kwargs)
+    except Exception:
+        logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.name, job.attempts)
+        fail(job, traceback.format_exc())
+        return False
+    complete(job)
+    return True
+
+
+def ensure_schedules(at=None):
+    """
+    Create the missing schedules of the periodic tasks, due at ``at``.
+    """
+    at = at or timezone.now()
+    PeriodicSchedule.objects.bulk_create(
+        [PeriodicSchedule(name=registered.name, next_run_at=at) for registered in periodic_tasks()],
+        ignore_conflicts=True,
+    )
+
+
+def enqueue_due(at=None):
+    """
+    Queue a run of every periodic task whose schedule is due at ``at`` and
+    move the schedule to its next slot. Slots missed while no worker ran
+    are skipped. Returns the number of runs queued.
+    """
+    at = at or timezone.now()
+    every = {registered.name: registered.every for registered in periodic_tasks()}
+    queued = 0
+    for schedule in PeriodicSchedule.objects.filter(name__in=every, next_run_at__lte=at):
+        interval = every[schedule.name]
+        next_run_at = schedule.next_run_at + ((at - schedule.next_run_at) // interval + 1) * interval
+        with db_transaction.atomic():
+            moved = PeriodicSchedule.objects.filter(pk=schedule.pk, next_run_at=schedule.next_run_at).update(
+                next_run_at=next_run_at,
+                updated_at=at,
+            )
+            if moved:
+                enqueue(schedule.name, key=f'periodic:{schedule.name}', run_at=at)
+                queued += 1
+    return queued
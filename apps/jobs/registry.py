@@ -0,0 +1,49 @@
+"""
+Tasks runnable as background jobs.
+
+A task is a function of JSON-serializable keyword arguments declared with
+``@task`` in the ``jobs`` module of an app. Tasks may run more than once for
+the same job (after a failure, or when a worker dies mid-run), so they must
+be idempotent.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Optional
+
+tasks = {}
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    func: Callable
+    max_attempts: int
+    every: Optional[timedelta]
+
+
+def task(name=None, max_attempts=5, every=None):
+    """
+    Register the decorated function as a task. With ``every`` it also runs
+    periodically, once per interval across all workers.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        tasks[task_name] = Task(task_name, func, max_attempts, every)
+        func.task_name = task_name
+        return func
+    return decorator
+
+
+def get_task(name_or_func):
+    """
+    Return the registered task of a name or of a decorated function.
+    """
+    name = getattr(name_or_func, 'task_name', name_or_func)
+    try:
+        return tasks[name]
+    except KeyError:
+        raise LookupError(f'Unknown task {name!r}') from None
+
+
+def periodic_tasks():
+    return [registered for registered in tasks.values() if registered.every is not None]
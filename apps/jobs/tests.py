@@ -0,0 +1,142 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+
+from apps.jobs.models import Job, PeriodicSchedule
+from apps.jobs.queue import claim, enqueue, enqueue_due, ensure_schedules, run
+from apps.jobs.registry import task
+from apps.roi.accrual import get_state
+from apps.roi.models import AccrualState, ROI
+
+User = get_user_model()
+
+calls = []
+
+
+@task(name='tests.record', max_attempts=2)
+def record(value):
+    calls.append(value)
+
+
+@task(name='tests.explode', max_attempts=2)
+def explode():
+    raise ValueError('boom')
+
+
+@task(name='tests.tick', every=timedelta(minutes=5))
+def tick():
+    calls.append('tick')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_pending_key_is_queued_once(self):
+        enqueue(record, key='same', value=1)
+        enqueue(record, key='same', value=2)
+        enqueue(record, value=3)
+        self.assertEqual(Job.objects.count(), 2)
+
+        job, = claim('w1', 1)
+        self.assertEqual(job.kwargs, {'value': 1})
+        # Once running, the key can be queued again for a later change.
+        enqueue(record, key='same', value=4)
+        self.assertEqual(Job.objects.filter(status=Job.PENDING).count(), 2)
+
+    def test_claims_are_disjoint_until_the_lease_expires(self):
+        for value in range(3):
+            enqueue(record, value=value)
+        first = claim('w1', 2)
+        second = claim('w2', 2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertEqual(claim('w3', 2), [])
+
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(hours=1)):
+            taken_over = claim('w3', 5)
+        self.assertEqual(len(taken_over), 3)
+        self.assertEqual({job.attempts for job in taken_over}, {2})
+
+        # The first worker no longer holds its job and cannot finish it.
+        self.assertTrue(run(first[0]))
+        self.assertEqual(Job.objects.get(pk=first[0].pk).status, Job.RUNNING)
+
+    def test_failures_are_retried_with_backoff(self):
+        enqueue(explode)
+        job, = claim('w1', 1)
+        started = timezone.now()
+        with self.assertLogs('apps.jobs.queue', 'ERROR'):
+            self.assertFalse(run(job))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertIn('ValueError: boom', job.last_error)
+        self.assertGreaterEqual(job.run_at, started + timedelta(seconds=10))
+        self.assertEqual(claim('w1', 1), [])
+
+        with mock.patch('django.utils.timezone.now', return_value=job.run_at):
+            job, = claim('w1', 1)
+        with self.assertLogs('apps.jobs.queue', 'ERROR'):
+            self.assertFalse(run(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_periodic_run_is_queued_once_per_slot(self):
+        start = timezone.now()
+        ensure_schedules(start)
+        enqueue_due(start)
+        enqueue_due(start)
+        enqueue_due(start + timedelta(minutes=1))
+        ticks = Job.objects.filter(name='tests.tick')
+        self.assertEqual(ticks.count(), 1)
+
+        # Missed slots are skipped, not caught up.
+        ticks.update(status=Job.DONE)
+        enqueue_due(start + timedelta(minutes=21))
+        self.assertEqual(ticks.count(), 2)
+        self.assertEqual(PeriodicSchedule.objects.get(name='tests.tick').next_run_at, start + timedelta(minutes=25))
+
+
+class AccrualRebuildJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='jobs', email='jobs@example.com', name='Jobs', last_name='User', password='testpass123'
+        )
+        self.roi = ROI.objects.create(owner=self.user, deposit_amount=Decimal('1000'))
+        self.weight = get_state(self.user.pk).weight
+
+    def test_roi_update_queues_the_rebuild(self):
+        self.roi.deposit_amount = Decimal('2000')
+        self.roi.save()
+        self.assertFalse(AccrualState.objects.filter(owner=self.user).exists())
+
+        job, = claim('w1', 1)
+        self.assertTrue(run(job))
+        self.assertEqual(AccrualState.objects.get(owner=self.user).weight, 2 * self.weight)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+
+
+@override_settings(JOBS_RETRY_BACKOFF=3600)
+class RunWorkerTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    # In-memory SQLite test databases lock whole tables across threads.
+    @skipUnlessDBFeature('has_select_for_update_skip_locked')
+    def test_once_runs_the_due_jobs(self):
+        for value in range(10):
+            enqueue(record, value=value)
+        enqueue(explode)
+        with self.assertLogs('apps.jobs.queue', 'ERROR'):
+            call_command('run_worker', '--once', '--concurrency', '3', stdout=mock.MagicMock())
+
+        self.assertEqual(sorted(value for value in calls if value != 'tick'), list(range(10)))
+        self.assertEqual(Job.objects.filter(name='tests.record', status=Job.DONE).count(), 10)
+        self.assertEqual(Job.objects.get(name='tests.explode').status, Job.PENDING)
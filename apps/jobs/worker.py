@@ -0,0 +1,76 @@
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.db import close_old_connections
+
+from apps.jobs.queue import claim, enqueue_due, ensure_schedules, run
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Poll the job table and run due jobs in a pool of ``concurrency`` threads.
+    Each thread uses a database connection of its own.
+    """
+
+    def __init__(self, concurrency=4, poll_interval=1.0, name=None):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.succeeded = 0
+        self.failed = 0
+
+    def stop(self, *args):
+        """
+        Stop claiming jobs; the running ones are finished first. Usable as a
+        signal handler.
+        """
+        self.stopping.set()
+
+    def run(self, once=False):
+        """
+        Run jobs until ``stop`` is called, or with ``once`` until no job is due.
+        """
+        ensure_schedules()
+        running = set()
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix='job') as pool:
+            while not self.stopping.is_set():
+                enqueue_due()
+                jobs = claim(self.name, self.concurrency - len(running)) if len(running) < self.concurrency else []
+                running.update(pool.submit(self.execute, job) for job in jobs)
+                if once and not running:
+                    break
+                if jobs and len(running) < self.concurrency:
+                    # The pool has room and more jobs may be due right away.
+                    continue
+                if running:
+                    done, running = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    self.collect(done)
+                else:
+                    self.stopping.wait(self.poll_interval)
+            self.collect(wait(running).done)
+        close_old_connections()
+
+    def execute(self, job):
+        try:
+            return run(job)
+        finally:
+            close_old_connections()
+
+    def collect(self, done):
+        for future in done:
+            try:
+                succeeded = future.result()
+            except Exception:
+                # Recording the outcome failed; the job is run again once its lease expires.
+                logger.exception('Worker %s lost track of a job', self.name)
+                succeeded = False
+            if succeeded:
+                self.succeeded += 1
+            else:
+                self.failed += 1
@@ -0,0 +1,153 @@
+from asgiref.sync import sync_to_async
+from django.db import transaction as db_transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from apps.roi.models import AccrualState, ROI
+from utils.fixedpoint import accrual_weight, capped_units, to_microseconds, to_units
+
+ROI_COLUMNS = ('created_at', 'ends_at', 'deposit_amount', 'daily_percentage', 'roi_percentage')
+
+
+def roi_terms(created_at, ends_at, deposit_amount, daily_percentage, roi_percentage):
+    """
+    Return the ``(end, weight, weighted_start, cap_units)`` terms of one ROI.
+    """
+    deposit_units = to_units(deposit_amount)
+    weight = accrual_weight(deposit_units, to_units(daily_percentage))
+    return ends_at, weight, weight * to_microseconds(created_at), capped_units(deposit_units, to_units(roi_percentage))
+
+
+@db_transaction.atomic
+def build_state(owner_id, at=None):
+    """
+    (Re)build the accrual state of a user from all of their ROIs.
+
+    The row is created and locked before the ROIs are read, so an ``add_roi``
+    running meanwhile waits for the rebuild and then applies on top of it.
+    """
+    if at is None:
+        at = timezone.now()
+    AccrualState.all_objects.get_or_create(owner_id=owner_id)
+    state = AccrualState.all_objects.select_for_update().get(owner_id=owner_id)
+
+    weight = weighted_start = settled = 0
+    next_expiry = None
+    rows = ROI.objects.filter(owner_id=owner_id).values_list(*ROI_COLUMNS)
+    for row in rows.iterator(chunk_size=2000):
+        end, roi_weight, roi_weighted_start, cap = roi_terms(*row)
+        if end <= at:
+            settled += cap
+            continue
+        weight += roi_weight
+        weighted_start += roi_weighted_start
+        next_expiry = end if next_expiry is None else min(next_expiry, end)
+
+    state.weight = weight
+    state.weighted_start = weighted_start
+    state.settled_units = settled
+    state.settled_through = at
+    state.next_expiry = next_expiry
+    state.deleted_at = None
+    state.save()
+    return state
+
+
+def states_at(owner_ids, at):
+    """
+    Unsaved accrual states of ``owner_ids`` holding the ROIs active at ``at``,
+    which may be in the past, keyed by owner. Owners without any are left out.
+    """
+    states = {}
+    rois = ROI.objects.filter(owner_id__in=owner_ids, created_at__lte=at, ends_at__gt=at)
+    for owner_id, *row in rois.values_list('owner_id', *ROI_COLUMNS):
+        _, weight, weighted_start, _ = roi_terms(*row)
+        state = states.setdefault(owner_id, AccrualState(owner_id=owner_id))
+        state.weight += weight
+        state.weighted_start += weighted_start
+    return states
+
+
+def ending_between(owner_id, start, end):
+    """
+    ROIs of a user whose period ends in ``(start, end]``.
+    """
+    rois = ROI.objects.filter(owner_id=owner_id, ends_at__lte=end)
+    if start is not None:
+        rois = rois.filter(ends_at__gt=start)
+    return rois
+
+
+@db_transaction.atomic
+def settle(owner_id, at):
+    """
+    Move the ROIs that ended since the last settlement from the linear part
+    of the state to ``settled_units``, and find the next expiry.
+    """
+    state = AccrualState.objects.select_for_update().get(owner_id=owner_id)
+    if state.next_expiry is None or state.next_expiry > at:
+        # Settled by a concurrent request meanwhile.
+        return state
+
+    weight, weighted_start = state.weight, state.weighted_start
+    for row in ending_between(owner_id, state.settled_through, at).values_list(*ROI_COLUMNS):
+        _, roi_weight, roi_weighted_start, cap = roi_terms(*row)
+        weight -= roi_weight
+        weighted_start -= roi_weighted_start
+        state.settled_units += cap
+
+    next_expiry = ROI.objects.filter(owner_id=owner_id, ends_at__gt=at).aggregate(next_expiry=Min('ends_at'))
+
+    state.weight = weight
+    state.weighted_start = weighted_start
+    state.settled_through = at
+    state.next_expiry = next_expiry['next_expiry']
+    state.save(update_fields=['weight', 'weighted_start', 'settled_units', 'settled_through', 'next_expiry',
+                              'updated_at'])
+    return state
+
+
+def get_state(owner_id, at=None):
+    """
+    Return the accrual state of a user, settled at ``at``.
+    A single indexed read unless an ROI has ended since the last call.
+    """
+    if at is None:
+        at = timezone.now()
+    state = AccrualState.objects.filter(owner_id=owner_id).first()
+    if state is None:
+        return build_state(owner_id, at)
+    if state.next_expiry is not None and state.next_expiry <= at:
+        return settle(owner_id, at)
+    return state
+
+
+async def aget_state(owner_id, at=None):
+    """
+    Async version of ``get_state``. The read is async; the (rare) build or
+    settlement runs in a thread since it locks rows inside a transaction.
+    """
+    if at is None:
+        at = timezone.now()
+    state = await AccrualState.objects.filter(owner_id=owner_id).afirst()
+    if state is None or (state.next_expiry is not None and state.next_expiry <= at):
+        return await sync_to_async(get_state)(owner_id, at)
+    return state
+
+
+@db_transaction.atomic
+def add_roi(roi):
+    """
+    Add a newly created ROI to the state of its owner under the row lock.
+    Falls back to a rebuild when there is no state yet (one may be being
+    built, uncommitted) or when the ROI would already be settled.
+    """
+    end, weight, weighted_start, _ = roi_terms(*(getattr(roi, column) for column in ROI_COLUMNS))
+    state = AccrualState.objects.select_for_update().filter(owner_id=roi.owner_id).first()
+    if state is None or (state.settled_through is not None and state.settled_through >= end):
+        build_state(roi.owner_id)
+        return
+    state.weight += weight
+    state.weighted_start += weighted_start
+    state.next_expiry = end if state.next_expiry is None else min(state.next_expiry, end)
+    state.save(update_fields=['weight', 'weighted_start', 'next_expiry', 'updated_at'])
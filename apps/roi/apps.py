@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RoiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.roi'
+
+    def ready(self):
+        from apps.roi import signals  # noqa: F401
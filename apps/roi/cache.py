@@ -0,0 +1,162 @@
+"""
+Cached ROI schedules of the profile endpoints.
+
+``schedules`` backs the ROI list of the profile. ``calculate_balance_history``
+reads the ROIs started before its last point with ``load_schedule``
+directly instead of through the cache, so a history is never computed from
+a schedule another process changed within the TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from apps.roi.models import ROI
+from utils.fixedpoint import accrual_weight, capped_units, to_microseconds, to_units
+
+
+class ScheduleRecord:
+    """
+    Compact, read-only view of one ROI: everything the profile and the
+    balance history read, with its terms in the integer kernel of
+    ``utils.fixedpoint``, without keeping the model instance around.
+    """
+    __slots__ = ('start', 'end', 'amount', 'daily_percentage', 'start_us', 'end_us', 'weight', 'cap_units')
+
+    def __init__(self, start, end, deposit_amount, daily_percentage, roi_percentage):
+        self.start = start
+        self.end = end
+        self.amount = deposit_amount
+        self.daily_percentage = daily_percentage
+        self.start_us = to_microseconds(start)
+        self.end_us = to_microseconds(end)
+        deposit_units = to_units(deposit_amount)
+        self.weight = accrual_weight(deposit_units, to_units(daily_percentage))
+        self.cap_units = capped_units(deposit_units, to_units(roi_percentage))
+
+
+class Schedule:
+    """
+    ROI schedule of a user, ordered by start.
+    """
+    __slots__ = ('records', 'loaded_at')
+
+    def __init__(self, records):
+        self.records = tuple(records)
+        self.loaded_at = time.monotonic()
+
+
+def schedule_rows(user_id, before=None):
+    """
+    Columns of the ROIs of a user needed to build their schedule: those
+    started before ``before``, when given.
+    """
+    rows = ROI.objects.filter(owner_id=user_id)
+    if before is not None:
+        rows = rows.filter(created_at__lt=before)
+    return rows.order_by('created_at').values_list(
+        'created_at', 'ends_at', 'deposit_amount', 'daily_percentage', 'roi_percentage'
+    )
+
+
+def load_schedule(user_id, before=None):
+    """
+    Build the schedule of a user with a single query and no model instances.
+    """
+    return Schedule(ScheduleRecord(*row) for row in schedule_rows(user_id, before))
+
+
+async def aload_schedule(user_id):
+    """
+    Async version of ``load_schedule``.
+    """
+    return Schedule([ScheduleRecord(*row) async for row in schedule_rows(user_id)])
+
+
+class ScheduleCache:
+    """
+    Process-local LRU cache of ROI schedules keyed by user id.
+
+    Entries are dropped by the ROI and Transaction signals of this process;
+    ``ttl`` bounds how long a change made by another process can go unseen.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """
+        Return the schedule of ``user_id``, loading it on a miss.
+        """
+        schedule, generation = self._lookup(user_id)
+        if schedule is not None:
+            return schedule
+        return self._store(user_id, load_schedule(user_id), generation)
+
+    async def aget(self, user_id):
+        """
+        Async version of ``get``.
+        """
+        schedule, generation = self._lookup(user_id)
+        if schedule is not None:
+            return schedule
+        return self._store(user_id, await aload_schedule(user_id), generation)
+
+    def _lookup(self, user_id):
+        """
+        Return ``(schedule, None)`` on a hit, ``(None, generation)`` on a miss.
+        """
+        with self._lock:
+            schedule = self._entries.get(user_id)
+            if schedule is not None and time.monotonic() - schedule.loaded_at < self.ttl:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return schedule, None
+            self.misses += 1
+            return None, self._generation
+
+    def _store(self, user_id, schedule, generation):
+        with self._lock:
+            # Don't store a schedule an invalidation may have raced with.
+            if generation != self._generation:
+                return schedule
+            self._entries[user_id] = schedule
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return schedule
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+        }
+
+
+schedules = ScheduleCache(
+    maxsize=settings.ROI_SCHEDULE_CACHE_SIZE,
+    ttl=settings.ROI_SCHEDULE_CACHE_TTL,
+)
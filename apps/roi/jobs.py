@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from apps.jobs.registry import task
+from apps.roi.accrual import build_state, settle
+from apps.roi.models import AccrualState
+
+
+@task()
+def rebuild_accrual_state(owner_id):
+    build_state(owner_id)
+
+
+@task(every=timedelta(minutes=1))
+def settle_accrual_states():
+    """
+    Settle the states whose next ROI has ended, so profile reads stay a
+    single lookup.
+    """
+    now = timezone.now()
+    for owner_id in AccrualState.objects.filter(next_expiry__lte=now).values_list('owner_id', flat=True):
+        settle(owner_id, now)
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.roi.accrual import build_state
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the accrual state of every user holding ROIs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Only rebuild the state of this user')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(roi_owners__isnull=False).distinct().order_by('pk')
+        if options['email']:
+            users = users.filter(email=options['email'])
+
+        count = 0
+        for user_id in users.values_list('pk', flat=True).iterator():
+            build_state(user_id)
+            count += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {count} accrual states')
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roi', '0004_roi_transaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roi',
+            name='deposit_amount_units',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-17 20:43
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roi', '0005_fixed_point_units'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccrualState',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('weight', models.DecimalField(decimal_places=0, default=0, max_digits=80)),
+                ('weighted_start', models.DecimalField(decimal_places=0, default=0, max_digits=80)),
+                ('settled_units', models.BigIntegerField(default=0)),
+                ('settled_through', models.DateTimeField(blank=True, null=True)),
+                ('next_expiry', models.DateTimeField(blank=True, null=True)),
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='accrual_state', to=settings.AUTH_USER_MODEL, verbose_name='Owner')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-17 20:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roi', '0006_accrualstate'),
+        ('transaction', '0005_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='roi',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['owner', 'created_at'], include=('deposit_amount', 'daily_percentage', 'roi_percentage', 'duration_seconds'), name='roi_owner_created_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-17 23:10
+
+import apps.roi.models
+from datetime import timedelta
+from django.db import migrations, models
+from django.db.models import DurationField, ExpressionWrapper, F, Value
+
+
+def backfill_ends_at(apps, schema_editor):
+    ROI = apps.get_model('roi', 'ROI')
+    duration = ExpressionWrapper(F('duration_seconds') * Value(timedelta(seconds=1)), output_field=DurationField())
+    ROI.objects.update(ends_at=F('created_at') + duration)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roi', '0007_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roi',
+            name='ends_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_ends_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='roi',
+            name='ends_at',
+            field=apps.roi.models.EndsAtField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='roi',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['owner', 'ends_at'], include=('created_at', 'deposit_amount', 'daily_percentage', 'roi_percentage'), name='roi_owner_ends_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 09:30
+
+import utils.models
+from django.db import migrations
+
+
+def drop_states(apps, schema_editor):
+    # Accrual states are derived and may hold rounded values (SQLite): they
+    # are rebuilt exactly on the next read.
+    AccrualState = apps.get_model('roi', 'AccrualState')
+    AccrualState.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roi', '0008_roi_ends_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_states, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='accrualstate',
+            name='weight',
+            field=utils.models.ExactIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='accrualstate',
+            name='weighted_start',
+            field=utils.models.ExactIntegerField(default=0),
+        ),
+    ]
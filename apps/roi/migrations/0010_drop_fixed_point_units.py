@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 23:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roi', '0009_exact_accrual_state'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='roi',
+            name='deposit_amount_units',
+        ),
+    ]
@@ -1,16 +1,36 @@
+import numpy as np
+from bisect import bisect_right
 from django.db import models
-from utils.models import BaseModel
+from utils.models import BaseModel, ExactIntegerField
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 from apps.transaction.models import Transaction
+from utils.fixedpoint import accrued_units, from_units, roi_earnings_units, to_microseconds, to_units
 
 User = get_user_model()
 
 
 # Create your models here.
 
+# Columns of an ROI derived from its deposit amount.
+ROI_TERMS = ('level', 'deposit_amount', 'roi_percentage', 'daily_percentage', 'duration_seconds')
+
+
+class EndsAtField(models.DateTimeField):
+    """
+    End of an ROI's period, ``created_at + duration_seconds``, computed every
+    time the row is written (``save`` and ``bulk_create``), once ``created_at``
+    has its value. ``QuerySet.update`` of either column must set it too.
+    """
+
+    def pre_save(self, model_instance, add):
+        value = model_instance.created_at + timedelta(seconds=model_instance.duration_seconds)
+        setattr(model_instance, self.attname, value)
+        return value
+
+
 class ROI(BaseModel):
     LEVEL_CHOICES = [
         (1, 'Level 1: $100 - 30% ROI'),
@@ -39,6 +59,7 @@ class ROI(BaseModel):
         decimal_places=8
     )
     duration_seconds = models.IntegerField()
+    ends_at = EndsAtField(editable=False)
     transaction = models.ForeignKey(
         Transaction,
         on_delete=models.CASCADE,
@@ -48,6 +69,24 @@ class ROI(BaseModel):
         blank=True
     )
 
+    class Meta:
+        indexes = [
+            # Every balance query reads the ROIs of one owner by creation date.
+            models.Index(
+                fields=['owner', 'created_at'],
+                include=['deposit_amount', 'daily_percentage', 'roi_percentage', 'duration_seconds'],
+                condition=models.Q(deleted_at__isnull=True),
+                name='roi_owner_created_idx',
+            ),
+            # Active and matured ROIs at an instant are ranges of ``ends_at``.
+            models.Index(
+                fields=['owner', 'ends_at'],
+                include=['created_at', 'deposit_amount', 'daily_percentage', 'roi_percentage'],
+                condition=models.Q(deleted_at__isnull=True),
+                name='roi_owner_ends_idx',
+            ),
+        ]
+
     LEVEL_CONFIG = {
         1: {
             "roi_percentage": 30,
@@ -76,24 +115,50 @@ class ROI(BaseModel):
         },
     }
 
+    # Lowest deposit of each level, from level 1.
+    LEVEL_THRESHOLDS = (100, 500, 1000, 3000, 5000)
+    # Deposits booked as another amount.
+    DEPOSIT_OVERRIDES = {Decimal('0.3'): 650, Decimal('0.1'): 150}
+
     @classmethod
     def get_level_by_deposit(cls, deposit):
-        if deposit == Decimal('0.3'):
-            deposit = 650
-        elif deposit == Decimal('0.1'):
-            deposit = 150
-        if deposit >= 5000:
-            return 5
-        elif deposit >= 3000:
-            return 4
-        elif deposit >= 1000:
-            return 3
-        elif deposit >= 500:
-            return 2
-        elif deposit >= 100:
-            return 1
-        else:
+        deposit = cls.DEPOSIT_OVERRIDES.get(deposit, deposit)
+        level = bisect_right(cls.LEVEL_THRESHOLDS, deposit)
+        if not level:
             raise ValueError("Deposit is too low to assign a valid ROI.")
+        return level
+
+    @classmethod
+    def level_terms(cls, amounts):
+        """
+        ``get_level_by_deposit`` and ``assign_values_by_level`` for a whole
+        sequence of deposit amounts: one threshold search over their
+        fixed-point units. Returns a dict of arrays aligned with ``amounts``,
+        with ``level`` 0 where the deposit is too low.
+        """
+        booked = np.empty(len(amounts), dtype=object)
+        booked[:] = amounts
+        units = np.fromiter((to_units(amount) for amount in amounts), dtype=np.int64, count=len(amounts))
+        for amount, booked_amount in cls.DEPOSIT_OVERRIDES.items():
+            overridden = units == to_units(amount)
+            booked[overridden] = booked_amount
+            units[overridden] = to_units(booked_amount)
+        thresholds = np.array([to_units(threshold) for threshold in cls.LEVEL_THRESHOLDS], dtype=np.int64)
+        levels = np.searchsorted(thresholds, units, side='right')
+
+        def by_level(key, convert=None):
+            values = [cls.LEVEL_CONFIG[level][key] for level in range(1, len(thresholds) + 1)]
+            column = np.empty(len(values) + 1, dtype=object)
+            column[1:] = [convert(value) for value in values] if convert else values
+            return column[levels]
+
+        return {
+            'level': levels,
+            'deposit_amount': booked,
+            'roi_percentage': by_level('roi_percentage'),
+            'daily_percentage': by_level('daily_percentage'),
+            'duration_seconds': by_level('duration_days', lambda days: days * 24 * 60 * 60),
+        }
 
     def assign_values_by_level(self):
         level_config = self.LEVEL_CONFIG.get(self.level)
@@ -108,9 +173,30 @@ class ROI(BaseModel):
         else:
             raise ValueError("Level configuration not found.")
 
+    @classmethod
+    def for_deposits(cls, deposits):
+        """
+        Build the unsaved ROIs of ``(owner_id, transaction)`` pairs for
+        ``bulk_create``, with the values ``save`` would assign (see
+        ``level_terms``) and the creation date of their transaction.
+        """
+        deposits = list(deposits)
+        terms = cls.level_terms([transaction.amount for _, transaction in deposits])
+        if not terms['level'].all():
+            raise ValueError("Deposit is too low to assign a valid ROI.")
+        columns = zip(*(terms[key].tolist() for key in ROI_TERMS))
+        return [
+            cls(owner_id=owner_id, transaction=transaction, created_at=transaction.created_at,
+                **dict(zip(ROI_TERMS, values)))
+            for (owner_id, transaction), values in zip(deposits, columns)
+        ]
+
     def save(self, *args, **kwargs):
         self.level = self.get_level_by_deposit(self.deposit_amount)
         self.assign_values_by_level()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'created_at', 'duration_seconds'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'ends_at'}
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -123,12 +209,9 @@ class ROI(BaseModel):
         If the ROI period has ended, returns timedelta(0).
         All time calculations use UTC timezone.
         """
-        # Calculate end date by adding duration to created_at
-        end_date = self.created_at + timedelta(seconds=self.duration_seconds)
-        
         # Calculate the remaining time between now and the end date
         now = timezone.now()
-        remaining = end_date - now
+        remaining = self.ends_at - now
         
         # If remaining time is negative, return zero
         if remaining.total_seconds() < 0:
@@ -140,28 +223,44 @@ class ROI(BaseModel):
     def current_earnings(self):
         """Calculate how much has been earned so far based on creation date, elapsed time, and daily percentage.
         Returns a decimal value representing the current earnings in the same currency as the deposit.
-        The earnings accumulate continuously (per second) based on the daily percentage rate.
+        The earnings accumulate continuously (per microsecond) based on the daily percentage rate,
+        computed with the fixed-point kernel in ``utils.fixedpoint``.
         """
-        from decimal import Decimal
-        
-        now = timezone.now()
-        elapsed_time = now - self.created_at
-        total_seconds_elapsed = elapsed_time.total_seconds()
-        
-        # Calculate daily earnings
-        daily_earnings = self.deposit_amount * self.daily_percentage / 100
-        
-        # Calculate earnings per second
-        seconds_in_day = 24 * 60 * 60  # 86400 seconds
-        earnings_per_second = daily_earnings / Decimal(str(seconds_in_day))
-        
-        # Calculate current earnings based on elapsed seconds
-        current_earnings = earnings_per_second * Decimal(str(total_seconds_elapsed))
-        
-        # If the total duration has passed, cap at the total expected ROI
-        total_duration = timedelta(seconds=self.duration_seconds)
-        if elapsed_time >= total_duration:
-            return self.deposit_amount * self.roi_percentage / 100
-            
-        return round(current_earnings, 10)
+        elapsed_time = timezone.now() - self.created_at
+        units = roi_earnings_units(
+            to_units(self.deposit_amount),
+            to_units(self.daily_percentage),
+            to_units(self.roi_percentage),
+            self.duration_seconds,
+            elapsed_time // timedelta(microseconds=1),
+        )
+        return from_units(units)
+
+
+class AccrualState(BaseModel):
+    """
+    Running aggregates of a user's ROIs, so accrual can be read in constant time.
+
+    Active ROIs accrue ``(t * weight - weighted_start) / (SCALE * 100 * MICROSECONDS_IN_DAY)``
+    units at ``t`` (see ``utils.fixedpoint``). When an ROI ends it is settled:
+    its weight leaves the linear part and its capped total is added to
+    ``settled_units``. ``next_expiry`` is the end of the first active ROI.
+    """
+    owner = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='accrual_state',
+        verbose_name='Owner'
+    )
+    weight = ExactIntegerField(default=0)
+    weighted_start = ExactIntegerField(default=0)
+    settled_units = models.BigIntegerField(default=0)
+    settled_through = models.DateTimeField(null=True, blank=True)
+    next_expiry = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Accrual state - {self.owner.email}"
 
+    def accrued_units(self, at):
+        """Earnings of the active ROIs at ``at``, in fixed-point units."""
+        return accrued_units(1, self.weight * to_microseconds(at) - self.weighted_start)
@@ -0,0 +1,76 @@
+from django.db import transaction as db_transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from apps.jobs.queue import build_job, enqueue_many
+from apps.roi.accrual import add_roi
+from apps.roi.cache import schedules
+from apps.roi.jobs import rebuild_accrual_state
+from apps.roi.models import AccrualState, ROI
+from apps.transaction.models import Transaction
+from apps.transaction.signals import transactions_created, transactions_reviewed
+from apps.wallet.models import Wallet
+
+# Sent after ``bulk_create`` inserted ``rois`` (no post_save is sent).
+rois_created = Signal()
+
+
+def invalidate_schedules(owners):
+    """
+    Drop the cached schedules now and again on commit, so a schedule
+    reloaded before the write is committed is not kept.
+    """
+    schedules.invalidate(*owners)
+    db_transaction.on_commit(lambda: schedules.invalidate(*owners))
+
+
+@receiver([post_save, post_delete], sender=ROI)
+def invalidate_roi_schedule(sender, instance, **kwargs):
+    invalidate_schedules([instance.owner_id])
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+def invalidate_transaction_schedules(sender, instance, **kwargs):
+    wallets = [instance.origin_id, instance.destination_id]
+    invalidate_schedules(list(Wallet.all_objects.filter(pk__in=wallets).values_list('owner_id', flat=True)))
+
+
+@receiver([transactions_reviewed, transactions_created])
+def invalidate_bulk_transaction_schedules(sender, transactions, **kwargs):
+    wallets = {wallet for transaction in transactions for wallet in (transaction.origin_id, transaction.destination_id)}
+    invalidate_schedules(list(Wallet.all_objects.filter(pk__in=wallets).values_list('owner_id', flat=True)))
+
+
+def discard_accrual_states(owners):
+    """
+    Drop the accrual states of ``owners`` and queue their rebuild. Until the
+    worker has run, reads rebuild a missing state themselves.
+    """
+    owners = list(AccrualState.all_objects.filter(owner_id__in=owners).values_list('owner_id', flat=True))
+    if not owners:
+        return
+    AccrualState.all_objects.filter(owner_id__in=owners).delete()
+    enqueue_many([
+        build_job(rebuild_accrual_state, key=f'accrual_state:{owner_id}', owner_id=owner_id)
+        for owner_id in owners
+    ])
+
+
+@receiver(post_save, sender=ROI)
+def update_accrual_state(sender, instance, created, **kwargs):
+    if created and not instance.is_deleted:
+        add_roi(instance)
+    else:
+        discard_accrual_states([instance.owner_id])
+
+
+@receiver(rois_created)
+def update_bulk_accrual_states(sender, rois, **kwargs):
+    owners = {roi.owner_id for roi in rois}
+    invalidate_schedules(list(owners))
+    discard_accrual_states(owners)
+
+
+@receiver(post_delete, sender=ROI)
+def rebuild_accrual_state_on_delete(sender, instance, **kwargs):
+    discard_accrual_states([instance.owner_id])
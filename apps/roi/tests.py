@@ -1,3 +1,231 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction as db_transaction
+from django.test import SimpleTestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+
+from apps.roi import accrual
+from apps.roi.accrual import build_state, ending_between, get_state
+from apps.roi.cache import Schedule, ScheduleCache, schedules
+from apps.roi.models import AccrualState, ROI
+from apps.users.serializers.profile import UserProfileSerializer
+from utils.bo import active_rois
+from utils.tests import BaseTestCase
+
+User = get_user_model()
+
+
+class LevelTermsTests(SimpleTestCase):
+    amounts = [Decimal('0.1'), Decimal('0.3'), Decimal('99.99999999'), Decimal('100'), Decimal('499.99999999'),
+               Decimal('500'), Decimal('1000'), Decimal('2999.5'), Decimal('3000'), Decimal('5000'),
+               Decimal('123456.78')]
+
+    def test_matches_the_per_instance_assignment(self):
+        terms = ROI.level_terms(self.amounts)
+        for i, amount in enumerate(self.amounts):
+            if amount == Decimal('99.99999999'):
+                self.assertEqual(terms['level'][i], 0)
+                with self.assertRaises(ValueError):
+                    ROI.get_level_by_deposit(amount)
+                continue
+            roi = ROI(deposit_amount=amount, level=ROI.get_level_by_deposit(amount))
+            roi.assign_values_by_level()
+            self.assertEqual(terms['level'][i], roi.level)
+            self.assertEqual(terms['deposit_amount'][i], roi.deposit_amount)
+            self.assertEqual(terms['roi_percentage'][i], roi.roi_percentage)
+            self.assertEqual(terms['daily_percentage'][i], roi.daily_percentage)
+            self.assertEqual(terms['duration_seconds'][i], roi.duration_seconds)
+
+
+class EndsAtTests(BaseTestCase):
+    def backdate(self, roi, days):
+        roi.created_at -= timedelta(days=days)
+        roi.save(update_fields=['created_at'])
+        roi.refresh_from_db()
+        return roi
+
+    def test_kept_on_every_write(self):
+        roi = ROI.objects.create(owner=self.user, deposit_amount=Decimal('1000'))
+        self.assertEqual(roi.ends_at, roi.created_at + timedelta(seconds=roi.duration_seconds))
+        roi = self.backdate(roi, 10)
+        self.assertEqual(roi.ends_at, roi.created_at + timedelta(seconds=roi.duration_seconds))
+
+        template = ROI(deposit_amount=Decimal('5000'), level=5)
+        template.assign_values_by_level()
+        [bulk] = ROI.objects.bulk_create([ROI(
+            owner=self.user, deposit_amount=template.deposit_amount, level=5,
+            roi_percentage=template.roi_percentage, daily_percentage=template.daily_percentage,
+            duration_seconds=template.duration_seconds,
+        )])
+        bulk.refresh_from_db()
+        self.assertEqual(bulk.ends_at, bulk.created_at + timedelta(days=60))
+
+    def test_matured_rois(self):
+        active = ROI.objects.create(owner=self.user, deposit_amount=Decimal('1000'))
+        matured = self.backdate(ROI.objects.create(owner=self.user, deposit_amount=Decimal('500')), 91)
+        now = timezone.now()
+        self.assertEqual(list(active_rois(now)), [active])
+        self.assertEqual(list(ending_between(self.user.pk, None, now)), [matured])
+
+        # The profile keeps listing matured ROIs.
+        rois = UserProfileSerializer(self.user, fields=['rois']).data['rois']
+        self.assertEqual([roi['started_at'] for roi in rois], [matured.created_at, active.created_at])
+        self.assertEqual(get_state(self.user.pk, now).next_expiry, active.ends_at)
+
+
+class AccrualStateTests(BaseTestCase):
+    """
+    The incrementally maintained state must equal a rebuild from all ROIs.
+    """
+
+    def assertMatchesRebuild(self, at):
+        state = get_state(self.user.pk, at)
+        incremental = (state.weight, state.weighted_start, state.settled_units, state.next_expiry)
+        rebuilt = build_state(self.user.pk, at)
+        rebuilt.refresh_from_db()
+        self.assertEqual(incremental, (rebuilt.weight, rebuilt.weighted_start, rebuilt.settled_units,
+                                       rebuilt.next_expiry))
+        return state
+
+    def test_inserts_expiries_and_deletes(self):
+        now = timezone.now()
+        self.assertMatchesRebuild(now)
+        for amount in ['1000', '5000', '100', '123456.78']:
+            ROI.objects.create(owner=self.user, deposit_amount=Decimal(amount))
+        # Beyond 64 bits: SQLite used to round these.
+        state = self.assertMatchesRebuild(timezone.now())
+        self.assertGreater(state.weighted_start, 2 ** 63)
+
+        # The level 5 ROIs (60 days) expire first.
+        state = self.assertMatchesRebuild(now + timedelta(days=61))
+        self.assertGreater(state.settled_units, 0)
+
+        # Added after a settlement, and ending after it.
+        ROI.objects.create(owner=self.user, deposit_amount=Decimal('100'))
+        self.assertMatchesRebuild(now + timedelta(days=62))
+        ROI.objects.filter(deposit_amount=Decimal('1000')).get().delete()
+        self.assertMatchesRebuild(now + timedelta(days=85))
+        state = self.assertMatchesRebuild(now + timedelta(days=200))
+        self.assertEqual((state.weight, state.next_expiry), (0, None))
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentAccrualStateTests(TransactionTestCase):
+    """
+    An ROI inserted from another connection while the state is being rebuilt.
+    Needs a database with row locks (PostgreSQL).
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', name='Test', last_name='User', password='testpass123'
+        )
+        ROI.objects.create(owner=self.user, deposit_amount=Decimal('1000'))
+
+    def insert_roi(self, errors):
+        try:
+            with db_transaction.atomic():
+                ROI.objects.create(owner=self.user, deposit_amount=Decimal('5000'))
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    def rebuild_while_inserting(self):
+        """
+        Rebuild the state, inserting an ROI from a thread once the scan has
+        started and giving it time to commit before the rebuild saves.
+        """
+        errors = []
+        inserter = threading.Thread(target=self.insert_roi, args=(errors,))
+        rebuilder = threading.current_thread()
+        roi_terms = accrual.roi_terms
+
+        def scanning_roi_terms(*row):
+            if threading.current_thread() is rebuilder and inserter.ident is None:
+                inserter.start()
+                time.sleep(0.5)
+            return roi_terms(*row)
+
+        with mock.patch.object(accrual, 'roi_terms', scanning_roi_terms):
+            build_state(self.user.pk)
+        inserter.join()
+        self.assertEqual(errors, [])
+
+        now = timezone.now()
+        state = get_state(self.user.pk, now)
+        incremental = (state.weight, state.weighted_start, state.next_expiry)
+        rebuilt = build_state(self.user.pk, now)
+        self.assertEqual(ROI.objects.filter(owner=self.user).count(), 2)
+        self.assertEqual(incremental, (rebuilt.weight, rebuilt.weighted_start, rebuilt.next_expiry))
+
+    def test_insert_during_rebuild(self):
+        build_state(self.user.pk)
+        self.rebuild_while_inserting()
+
+    def test_insert_during_first_build(self):
+        AccrualState.all_objects.filter(owner=self.user).delete()
+        self.rebuild_while_inserting()
+
+
+class ScheduleCacheTests(BaseTestCase):
+    """
+    LRU, TTL and signal invalidation of the ROI schedule cache.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.cache = ScheduleCache(maxsize=2, ttl=60)
+        schedules.clear()
+        self.addCleanup(schedules.clear)
+
+    def loads(self):
+        return mock.patch('apps.roi.cache.load_schedule', side_effect=lambda *args, **kwargs: Schedule([]))
+
+    def test_evicts_the_least_recently_used(self):
+        with self.loads() as load:
+            self.cache.get(1)
+            self.cache.get(2)
+            self.cache.get(1)
+            self.cache.get(3)
+            self.assertEqual(load.call_count, 3)
+            self.cache.get(1)
+            self.cache.get(2)
+            self.assertEqual(load.call_count, 4)
+        self.assertEqual(self.cache.stats(), {'hits': 2, 'misses': 4, 'evictions': 2, 'size': 2, 'maxsize': 2})
+
+    def test_expires_after_the_ttl(self):
+        with self.loads() as load:
+            first = self.cache.get(1)
+            self.assertIs(self.cache.get(1), first)
+            first.loaded_at -= 60
+            self.assertIsNot(self.cache.get(1), first)
+            self.assertEqual(load.call_count, 2)
+        self.assertEqual((self.cache.stats()['hits'], self.cache.stats()['misses']), (1, 2))
+
+    def test_invalidated_by_roi_save_and_delete(self):
+        hits, misses = schedules.hits, schedules.misses
+        ROI.objects.create(owner=self.user, deposit_amount=Decimal('1000'))
+        self.assertEqual(len(schedules.get(self.user.pk).records), 1)
+        roi = ROI.objects.create(owner=self.user, deposit_amount=Decimal('500'))
+        self.assertEqual(len(schedules.get(self.user.pk).records), 2)
+        roi.delete()
+        self.assertEqual(len(schedules.get(self.user.pk).records), 1)
+        self.assertEqual((schedules.hits - hits, schedules.misses - misses), (0, 3))
+
+    def test_load_racing_an_invalidation_is_not_stored(self):
+        def load_schedule(*args, **kwargs):
+            # The ROI is saved while its owner's schedule is being loaded.
+            ROI.objects.create(owner=self.user, deposit_amount=Decimal('1000'))
+            return Schedule([])
+
+        with mock.patch('apps.roi.cache.load_schedule', load_schedule):
+            stale = schedules.get(self.user.pk)
+        self.assertEqual(stale.records, ())
+        self.assertEqual(schedules.stats()['size'], 0)
+        self.assertEqual(len(schedules.get(self.user.pk).records), 1)
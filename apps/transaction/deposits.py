@@ -0,0 +1,168 @@
+import uuid
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.roi.models import ROI
+from apps.roi.signals import rois_created
+from apps.transaction.models import Transaction
+from apps.transaction.signals import transactions_created
+from apps.wallet import ledger
+from apps.wallet.models import Posting, Wallet
+from apps.wallet.system import system_wallet_id
+from utils.fixedpoint import MAX_AMOUNT
+from utils.models import bulk_create_dated
+
+
+def parse_record(record, historical=False):
+    """
+    Validate one ``(wallet_address, amount, hash)`` record, plus its past
+    ``created_at`` when ``historical``. The deposit level is checked per batch.
+    Returns ``(address, amount, hash, created_at, error)``.
+    """
+    address = (record.get('wallet_address') or '').strip()
+    hash_value = (record.get('hash') or '').strip()
+    created_at = None
+    try:
+        amount = Decimal(str(record.get('amount')))
+        if not amount.is_finite() or abs(amount) > MAX_AMOUNT:
+            raise ValueError(amount)
+        amount = Transaction.normalize_amount(amount)
+    except (InvalidOperation, ValueError):
+        return address, None, hash_value, created_at, 'invalid_amount'
+    if not address:
+        return address, amount, hash_value, created_at, 'missing_wallet_address'
+    if not hash_value:
+        return address, amount, hash_value, created_at, 'missing_hash'
+    if historical:
+        try:
+            created_at = parse_datetime((record.get('created_at') or '').strip())
+        except ValueError:
+            created_at = None
+        if created_at is not None and timezone.is_naive(created_at):
+            created_at = timezone.make_aware(created_at)
+        if created_at is None or created_at > timezone.now():
+            return address, amount, hash_value, created_at, 'invalid_created_at'
+    return address, amount, hash_value, created_at, None
+
+
+@db_transaction.atomic
+def ingest_batch(records, destination, historical=False):
+    """
+    Insert a batch of deposits, skipping those whose ``hash`` already exists.
+    With ``historical`` the deposits and their ROIs keep the ``created_at``
+    of their records, set back by one more UPDATE each.
+
+    A fixed number of statements whatever the batch size: one wallet lookup,
+    one ``INSERT ... ON CONFLICT DO NOTHING`` for the transactions, one read
+    back of the inserted ids, one insert for the ROIs, the ledger postings and
+    one UPDATE of the wallet balances.
+
+    Returns ``{'inserted': n, 'duplicates': n, 'rejected': [(hash, error), ...]}``.
+    """
+    result = {'inserted': 0, 'duplicates': 0, 'rejected': []}
+    rows = [parse_record(record, historical) for record in records]
+    # Levels of the whole batch in one vectorized search.
+    levels = iter(ROI.level_terms([row[1] for row in rows if row[4] is None])['level'].tolist())
+    parsed = {}
+    for address, amount, hash_value, created_at, error in rows:
+        if error is None and not next(levels):
+            error = 'amount_too_low'
+        if error:
+            result['rejected'].append((hash_value, error))
+        elif hash_value in parsed:
+            result['duplicates'] += 1
+        else:
+            parsed[hash_value] = (address, amount, created_at)
+
+    wallets = Wallet.objects.in_bulk({address for address, _, _ in parsed.values()}, field_name='address')
+    deposits = []
+    for hash_value, (address, amount, created_at) in parsed.items():
+        wallet = wallets.get(address)
+        if wallet is None:
+            result['rejected'].append((hash_value, 'unknown_wallet'))
+            continue
+        deposits.append(Transaction(
+            id=uuid.uuid4(),
+            origin=wallet,
+            destination=destination,
+            amount=amount,
+            is_deposit=True,
+            is_pending=False,
+            is_approved=True,
+            hash=hash_value,
+            created_at=created_at,
+        ))
+    if not deposits:
+        return result
+
+    # Rows whose hash already exists are skipped by the database; the ids
+    # generated here tell which ones made it in.
+    if historical:
+        bulk_create_dated(Transaction, deposits, ignore_conflicts=True)
+    else:
+        Transaction.objects.bulk_create(deposits, ignore_conflicts=True)
+    inserted_ids = set(
+        Transaction.objects.filter(pk__in=[deposit.pk for deposit in deposits]).values_list('pk', flat=True)
+    )
+    inserted = [deposit for deposit in deposits if deposit.pk in inserted_ids]
+    result['inserted'] = len(inserted)
+    result['duplicates'] += len(deposits) - len(inserted)
+    if not inserted:
+        return result
+
+    rois = ROI.for_deposits((deposit.origin.owner_id, deposit) for deposit in inserted)
+    if historical:
+        rois = bulk_create_dated(ROI, rois, derived=['ends_at'])
+    else:
+        rois = ROI.objects.bulk_create(rois)
+    ledger.record_many(inserted, Posting.DEPOSIT)
+    credit_wallets(inserted)
+
+    transactions_created.send(sender=Transaction, transactions=inserted)
+    rois_created.send(sender=ROI, rois=rois)
+    return result
+
+
+def credit_wallets(deposits):
+    """
+    Add the deposits to the balance of their wallets in a single UPDATE.
+    """
+    totals = defaultdict(Decimal)
+    for deposit in deposits:
+        totals[deposit.origin_id] += Decimal(deposit.amount)
+    Wallet.add_to_balances(totals)
+
+
+def ingest_deposits(records, batch_size=1000, destination=None, historical=False, on_batch=None):
+    """
+    Ingest an iterable of deposit records in batches of ``batch_size``, each
+    in a transaction of its own. ``on_batch`` is called with the running
+    totals after every batch. Running it again with the same records
+    inserts nothing.
+    """
+    if destination is None:
+        destination = Wallet.objects.get(pk=system_wallet_id())
+    totals = {'inserted': 0, 'duplicates': 0, 'rejected': []}
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            add_result(totals, ingest_batch(batch, destination, historical))
+            batch = []
+            if on_batch is not None:
+                on_batch(totals)
+    if batch:
+        add_result(totals, ingest_batch(batch, destination, historical))
+        if on_batch is not None:
+            on_batch(totals)
+    return totals
+
+
+def add_result(totals, result):
+    totals['inserted'] += result['inserted']
+    totals['duplicates'] += result['duplicates']
+    totals['rejected'] += result['rejected']
@@ -0,0 +1,98 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.roi.accrual import build_state, get_state
+from apps.transaction.models import Transaction, WithdrawalEligibility
+from utils.bo import calculate_withdrawals, rois_total
+from utils.fixedpoint import from_units, to_units
+
+
+def build_eligibility(owner_id):
+    """
+    (Re)build the withdrawal eligibility of a user from their withdrawals.
+    """
+    last_withdrawal_at = Transaction.objects.filter(
+        destination__owner_id=owner_id,
+        is_deposit=False,
+    ).aggregate(last=Max('created_at'))['last']
+    eligibility, _ = WithdrawalEligibility.all_objects.update_or_create(
+        owner_id=owner_id,
+        defaults={
+            'last_withdrawal_at': last_withdrawal_at,
+            'withdrawn_units': to_units(calculate_withdrawals(owner_id)),
+            'deleted_at': None,
+        },
+    )
+    return eligibility
+
+
+def get_eligibility(owner_id, lock=False):
+    """
+    Return the withdrawal eligibility of a user along with their accrual
+    state (as ``eligibility.owner.accrual_state``) in a single indexed read.
+
+    With ``lock`` the eligibility row is locked until the end of the current
+    transaction, so concurrent withdrawals of a user are decided one at a time.
+    """
+    eligibilities = WithdrawalEligibility.objects.select_related('owner__accrual_state')
+    if lock:
+        eligibilities = eligibilities.select_for_update(of=('self',))
+    eligibility = eligibilities.filter(owner_id=owner_id).first()
+    if eligibility is None:
+        build_eligibility(owner_id)
+        eligibility = eligibilities.get(owner_id=owner_id)
+    return eligibility
+
+
+async def aget_eligibility(owner_id):
+    """
+    Async version of ``get_eligibility`` (without locking).
+    """
+    eligibility = await WithdrawalEligibility.objects.select_related(
+        'owner__accrual_state',
+    ).filter(owner_id=owner_id).afirst()
+    if eligibility is None:
+        eligibility = await sync_to_async(get_eligibility)(owner_id)
+    return eligibility
+
+
+def available_balance(eligibility, at=None):
+    """
+    ROI balance a user can withdraw at ``at``: the earnings of their active
+    ROIs minus their approved withdrawals (``calculate_rois``).
+    """
+    if at is None:
+        at = timezone.now()
+    owner = eligibility.owner
+    try:
+        state = owner.accrual_state
+    except ObjectDoesNotExist:
+        state = build_state(owner.pk, at)
+    if state.next_expiry is not None and state.next_expiry <= at:
+        # An ROI ended since the last read: settle it first.
+        state = get_state(owner.pk, at)
+    return rois_total(state, at, from_units(eligibility.withdrawn_units))
+
+
+def withdrawal_check(eligibility, at=None):
+    """
+    Data of ``WithdrawalCheckSerializer``: whether the user may withdraw at
+    ``at`` or how many days of their cooldown remain.
+    """
+    if at is None:
+        at = timezone.now()
+    if eligibility.in_cooldown(at):
+        # Calcular días restantes
+        days_passed = (at - eligibility.last_withdrawal_at).days
+        days_remaining = 7 - days_passed
+        return {
+            'can_withdraw': False,
+            'days_remaining': days_remaining,
+            'message': f'Debes esperar {days_remaining} días para realizar otro retiro.'
+        }
+    return {
+        'can_withdraw': True,
+        'message': 'Puedes realizar un retiro.'
+    }
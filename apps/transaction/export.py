@@ -0,0 +1,47 @@
+from django.db.models import F
+
+from apps.transaction.pagination import TransactionCursorPagination
+
+EXPORT_FIELDS = [
+    'id', 'created_at', 'type', 'status', 'amount', 'hash',
+    'origin', 'origin_owner', 'destination', 'destination_owner', 'reviewed_at',
+]
+
+
+def transaction_status(is_pending, is_approved):
+    """
+    Same status as ``TransactionListSerializer.get_status``.
+    """
+    if is_pending:
+        return 'pending'
+    return 'approved' if is_approved else 'rejected'
+
+
+def export_rows(queryset, chunk_size=2000):
+    """
+    Yield one flat dict per transaction of ``queryset`` (newest first).
+
+    Rows are plain column values read through a server-side cursor, ``chunk_size``
+    at a time, so memory stays constant whatever the number of rows.
+    """
+    rows = queryset.prefetch_related(None).order_by(*TransactionCursorPagination.ordering).values(
+        'id', 'created_at', 'amount', 'hash', 'is_deposit', 'is_pending', 'is_approved', 'reviewed_at',
+        origin_address=F('origin__address'),
+        origin_email=F('origin__owner__email'),
+        destination_address=F('destination__address'),
+        destination_email=F('destination__owner__email'),
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield {
+            'id': row['id'],
+            'created_at': row['created_at'],
+            'type': 'deposit' if row['is_deposit'] else 'withdrawal',
+            'status': transaction_status(row['is_pending'], row['is_approved']),
+            'amount': row['amount'],
+            'hash': row['hash'],
+            'origin': row['origin_address'],
+            'origin_owner': row['origin_email'],
+            'destination': row['destination_address'],
+            'destination_owner': row['destination_email'],
+            'reviewed_at': row['reviewed_at'],
+        }
@@ -0,0 +1,53 @@
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.transaction.deposits import ingest_deposits
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports historical deposits (wallet_address, amount, hash, created_at) from a CSV, keeping their '
+        'dates and skipping known hashes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to read ('-' for stdin)")
+        parser.add_argument('--batch-size', type=int, default=5000, help='Deposits inserted per transaction')
+        parser.add_argument('--progress-every', type=int, default=100000,
+                            help='Report progress every this many rows')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        reported = 0
+
+        def progress(totals):
+            nonlocal reported
+            rows = totals['inserted'] + totals['duplicates'] + len(totals['rejected'])
+            if rows - reported >= options['progress_every']:
+                reported = rows
+                self.stdout.write(f'{rows} rows, {rows / (time.monotonic() - started):.0f} rows/s')
+
+        source = sys.stdin if options['path'] == '-' else open(options['path'], newline='')
+        try:
+            result = ingest_deposits(
+                csv.DictReader(source),
+                batch_size=options['batch_size'],
+                historical=True,
+                on_batch=progress,
+            )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        for hash_value, error in result['rejected']:
+            self.stderr.write(f'Rejected {hash_value or "(no hash)"}: {error}')
+        elapsed = time.monotonic() - started
+        rows = result['inserted'] + result['duplicates'] + len(result['rejected'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully imported historical deposits: {result['inserted']} inserted, "
+            f"{result['duplicates']} duplicates, {len(result['rejected'])} rejected in {elapsed:.1f}s "
+            f"({rows / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
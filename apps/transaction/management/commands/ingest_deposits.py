@@ -0,0 +1,38 @@
+import csv
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.transaction.deposits import ingest_deposits
+
+
+class Command(BaseCommand):
+    help = 'Ingests deposits (wallet_address, amount, hash) from a CSV or NDJSON file, skipping known hashes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read ('-' for stdin)")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        source = sys.stdin if options['path'] == '-' else open(options['path'], newline='')
+        try:
+            if options['format'] == 'csv':
+                records = csv.DictReader(source)
+            else:
+                records = (json.loads(line) for line in source if line.strip())
+            started = time.monotonic()
+            result = ingest_deposits(records, batch_size=options['batch_size'])
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        for hash_value, error in result['rejected']:
+            self.stderr.write(f'Rejected {hash_value or "(no hash)"}: {error}')
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully ingested deposits: {result['inserted']} inserted, {result['duplicates']} duplicates, "
+            f"{len(result['rejected'])} rejected in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction', '0003_alter_transaction_amount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='amount_units',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
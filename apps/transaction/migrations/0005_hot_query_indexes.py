@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-17 20:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction', '0004_fixed_point_units'),
+        ('wallet', '0005_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True), ('is_deposit', True)), fields=['origin', 'created_at'], include=('amount',), name='tx_deposit_origin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True), ('is_deposit', False)), fields=['destination', 'created_at'], include=('amount', 'is_approved'), name='tx_withdrawal_dest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['-created_at', '-id'], name='tx_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True), ('is_pending', True)), fields=['created_at'], name='tx_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-17 20:49
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction', '0005_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WithdrawalEligibility',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('last_withdrawal_at', models.DateTimeField(blank=True, null=True)),
+                ('withdrawn_units', models.BigIntegerField(default=0)),
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='withdrawal_eligibility', to=settings.AUTH_USER_MODEL, verbose_name='Owner')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 23:29
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction', '0007_review_claims'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='transaction',
+            name='amount_units',
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from utils.models import BaseModel
 from apps.wallet.models import Wallet
+from datetime import timedelta
 from decimal import Decimal
 
 User = get_user_model()
@@ -45,15 +46,97 @@ class Transaction(BaseModel):
         null=True,
         blank=True
     )
+    # Review queue lease (see apps.transaction.review.claim_withdrawals).
+    claimed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='claimed_transactions'
+    )
+    claim_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Deposits of a wallet (balance engine, checkpoints, history).
+            models.Index(
+                fields=['origin', 'created_at'],
+                include=['amount'],
+                condition=models.Q(deleted_at__isnull=True, is_deposit=True),
+                name='tx_deposit_origin_idx',
+            ),
+            # Withdrawals into a wallet: approved totals and the 7 day cooldown.
+            models.Index(
+                fields=['destination', 'created_at'],
+                include=['amount', 'is_approved'],
+                condition=models.Q(deleted_at__isnull=True, is_deposit=False),
+                name='tx_withdrawal_dest_idx',
+            ),
+            # Keyset pagination of the staff list.
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(deleted_at__isnull=True),
+                name='tx_created_idx',
+            ),
+            # Review queue: pending rows by age, with their lease.
+            models.Index(
+                fields=['created_at'],
+                include=['claim_expires_at'],
+                condition=models.Q(deleted_at__isnull=True, is_pending=True),
+                name='tx_pending_idx',
+            ),
+        ]
 
     def __str__(self):
         origin_str = self.origin.address if self.origin else "External"
         destination_str = self.destination.address if self.destination else "External"
         return f"Transaction: {origin_str} → {destination_str} ({self.amount})"
     
+    @staticmethod
+    def normalize_amount(amount):
+        """
+        Amount stored for ``amount`` (placeholder amounts map to fixed deposits).
+        """
+        if amount == Decimal('0.000045'):
+            return 650
+        elif amount == Decimal('0.000035'):
+            return 150
+        return amount
+
     def save(self, *args, **kwargs):
-        if self.amount == Decimal('0.000045'):
-            self.amount = 650
-        elif self.amount == Decimal('0.000035'):
-            self.amount = 150
+        self.amount = self.normalize_amount(self.amount)
         super().save(*args, **kwargs)
+
+
+class WithdrawalEligibility(BaseModel):
+    """
+    Per-user inputs of the withdrawal rules, maintained by the Transaction
+    signals: the date of the last withdrawal (7 day cooldown) and the total
+    of the approved withdrawals subtracted from the ROI balance.
+    See ``apps.transaction.eligibility``.
+    """
+    COOLDOWN = timedelta(days=7)
+
+    owner = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='withdrawal_eligibility',
+        verbose_name='Owner'
+    )
+    last_withdrawal_at = models.DateTimeField(null=True, blank=True)
+    # Approved withdrawals into the primary wallet, in fixed-point units.
+    withdrawn_units = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Withdrawal eligibility - {self.owner.email}"
+
+    def cooldown_ends_at(self):
+        """End of the cooldown started by the last withdrawal, if any."""
+        if self.last_withdrawal_at is None:
+            return None
+        return self.last_withdrawal_at + self.COOLDOWN
+
+    def in_cooldown(self, at):
+        """Whether a withdrawal was made in the 7 days before ``at``."""
+        ends_at = self.cooldown_ends_at()
+        return ends_at is not None and ends_at >= at
@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+from abc import ABC, abstractmethod
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class StreamingRenderer(BaseRenderer, ABC):
+    """
+    Renderer that can also encode an iterable of rows lazily.
+
+    ``stream(rows)`` yields encoded text in chunks of about ``buffer_size``
+    characters and is what a ``StreamingHttpResponse`` is built from; ``render``
+    encodes regular (small) response data, such as errors, the same way.
+    Subclasses implement ``encode``.
+    """
+    charset = 'utf-8'
+    buffer_size = 64 * 1024
+
+    @abstractmethod
+    def encode(self, rows, fields=None):
+        """
+        Yield the encoded pieces of ``rows`` (dicts with the keys ``fields``).
+        """
+
+    def stream(self, rows, fields=None):
+        buffer = []
+        size = 0
+        for piece in self.encode(rows, fields):
+            buffer.append(piece)
+            size += len(piece)
+            if size >= self.buffer_size:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+        if buffer:
+            yield ''.join(buffer)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(self.stream(rows)).encode(self.charset)
+
+
+class NDJSONRenderer(StreamingRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def encode(self, rows, fields=None):
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+class StreamingJSONRenderer(StreamingRenderer):
+    """
+    JSON array written one element at a time, for exports. Paginated lists
+    keep DRF's ``JSONRenderer``: their pages are bounded by ``max_page_size``.
+    """
+    media_type = 'application/json'
+    format = 'json'
+
+    def encode(self, rows, fields=None):
+        yield '['
+        separator = ''
+        for row in rows:
+            yield separator + json.dumps(row, cls=DjangoJSONEncoder)
+            separator = ','
+        yield ']'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, list):
+            return super().render(data, accepted_media_type, renderer_context)
+        return json.dumps(data, cls=DjangoJSONEncoder).encode(self.charset)
+
+
+class CSVRenderer(StreamingRenderer):
+    """
+    CSV with a header row: ``fields``, or the keys of the first row.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def encode(self, rows, fields=None):
+        line = io.StringIO()
+        writer = None
+        if fields is not None:
+            writer = csv.DictWriter(line, fieldnames=fields)
+            writer.writeheader()
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(line, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow({key: self.cell(value) for key, value in row.items()})
+            yield line.getvalue()
+            line.seek(0)
+            line.truncate()
+        if writer is not None and line.tell():
+            # Header of an empty export.
+            yield line.getvalue()
+
+    @staticmethod
+    def cell(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.transaction.models import Transaction
+from apps.transaction.serializers import TransactionListSerializer
+from apps.transaction.signals import transactions_reviewed
+from apps.wallet import ledger
+from apps.wallet.models import Posting, Wallet
+
+APPROVED = 'approved'
+REJECTED = 'rejected'
+ALREADY_PROCESSED = 'already_processed'
+NOT_FOUND = 'not_found'
+
+
+@db_transaction.atomic
+def review_transactions(ids, approve, reviewer):
+    """
+    Approve or reject the transactions in ``ids`` that are still pending.
+
+    The rows are claimed with a single compare-and-set ``UPDATE ... WHERE
+    is_pending``: a row another reviewer processed meanwhile no longer matches
+    (the concurrent UPDATE waits for the row lock and re-checks the condition),
+    so every transaction is reviewed exactly once.
+
+    Returns ``(outcomes, reviewed)``: the outcome of every id (as a UUID), in
+    order, and the transactions reviewed by this call.
+    """
+    now = timezone.now()
+    ids = list(dict.fromkeys(Transaction._meta.pk.to_python(pk) for pk in ids))
+    Transaction.objects.filter(pk__in=ids, is_pending=True).update(
+        is_pending=False,
+        is_approved=approve,
+        reviewer=reviewer,
+        reviewed_at=now,
+        updated_at=now,
+    )
+    # Rows this UPDATE claimed: reviewed by ``reviewer`` at this very instant.
+    reviewed = list(TransactionListSerializer.setup_eager_loading(
+        Transaction.objects.filter(pk__in=ids, reviewer=reviewer, reviewed_at=now)
+    ))
+    existing = set(Transaction.objects.filter(pk__in=ids).values_list('pk', flat=True))
+
+    if reviewed:
+        ledger.record_many(reviewed, Posting.APPROVAL if approve else Posting.REJECTION)
+        if approve:
+            wallets = {transaction.destination_id for transaction in reviewed if not transaction.is_deposit}
+            Wallet.objects.filter(pk__in=wallets).update(last_transaction_date=now, updated_at=now)
+        transactions_reviewed.send(sender=Transaction, transactions=reviewed)
+
+    claimed = {transaction.pk for transaction in reviewed}
+    outcomes = {}
+    for pk in ids:
+        if pk in claimed:
+            outcomes[pk] = APPROVED if approve else REJECTED
+        elif pk in existing:
+            outcomes[pk] = ALREADY_PROCESSED
+        else:
+            outcomes[pk] = NOT_FOUND
+    return outcomes, reviewed
+
+
+@db_transaction.atomic
+def claim_withdrawals(reviewer, count):
+    """
+    Hand ``reviewer`` the ``count`` oldest pending withdrawals nobody holds,
+    leased for ``settings.REVIEW_CLAIM_LEASE`` seconds.
+
+    Candidates are locked with ``SELECT ... FOR UPDATE SKIP LOCKED``, so
+    reviewers claiming at the same time take disjoint rows instead of waiting
+    on each other. Databases without SKIP LOCKED (SQLite, which serializes
+    writes anyway) rely on the compare-and-set UPDATE alone.
+
+    Returns ``(claimed, expires_at)``.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.REVIEW_CLAIM_LEASE)
+    claimable = Q(claim_expires_at__isnull=True) | Q(claim_expires_at__lte=now)
+    candidates = Transaction.objects.filter(claimable, is_pending=True, is_deposit=False)
+    if connection.features.has_select_for_update_skip_locked:
+        candidates = candidates.select_for_update(skip_locked=True)
+    ids = list(candidates.order_by('created_at').values_list('pk', flat=True)[:count])
+
+    Transaction.objects.filter(claimable, pk__in=ids, is_pending=True).update(
+        claimed_by=reviewer,
+        claim_expires_at=expires_at,
+    )
+    claimed = TransactionListSerializer.setup_eager_loading(
+        Transaction.objects.filter(pk__in=ids, claimed_by=reviewer, claim_expires_at=expires_at)
+    ).order_by('created_at')
+    return list(claimed), expires_at
+
+
+def release_claims(reviewer, ids):
+    """
+    Give back the claims ``reviewer`` holds on ``ids`` before the lease ends.
+    """
+    return Transaction.objects.filter(pk__in=ids, claimed_by=reviewer).update(
+        claimed_by=None,
+        claim_expires_at=None,
+    )
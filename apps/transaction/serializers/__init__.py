@@ -1 +1 @@
-from apps.transaction.serializers.transaction import TransactionSerializer, TransactionListSerializer, WithdrawalCheckSerializer
\ No newline at end of file
+from apps.transaction.serializers.transaction import TransactionSerializer, TransactionListSerializer, WithdrawalCheckSerializer, BulkReviewSerializer, BatchDepositSerializer, ClaimSerializer, ReleaseClaimsSerializer
\ No newline at end of file
@@ -1,12 +1,15 @@
 from rest_framework import serializers
 from django.db import transaction as db_transaction
+from django.db.models import Prefetch
 from django.utils import timezone
-from datetime import timedelta
 
+from apps.transaction.eligibility import available_balance, get_eligibility
 from apps.transaction.models import Transaction
-from apps.wallet.models import Wallet
+from apps.wallet import ledger
+from apps.wallet.models import Posting, Wallet
+from apps.wallet.system import system_wallet_id
 from apps.roi.models import ROI
-from utils.bo import calculate_rois
+from utils.fixedpoint import MAX_AMOUNT
 
 
 class TransactionSerializer(serializers.Serializer):
@@ -20,10 +23,20 @@ class TransactionSerializer(serializers.Serializer):
     
     def validate_amount(self, value):
         """
-        Validate that the amount is positive.
+        Validate that the amount is positive and fits the fixed-point columns.
         """
         if value <= 0:
             raise serializers.ValidationError("El monto debe ser mayor que cero.")
+        if value > MAX_AMOUNT:
+            raise serializers.ValidationError("El monto excede el máximo permitido.")
+        return value
+    
+    def validate_hash(self, value):
+        """
+        Validate that the hash has not been registered yet.
+        """
+        if value and Transaction.all_objects.filter(hash=value).exists():
+            raise serializers.ValidationError("Esta transacción ya fue registrada.")
         return value
     
     def validate(self, data):
@@ -36,21 +49,15 @@ class TransactionSerializer(serializers.Serializer):
         try:
             # For withdrawals, ensure the system wallet has enough funds
             if not data['is_deposit']:
-                if calculate_rois(user) < data['amount']:
+                now = timezone.now()
+                eligibility = get_eligibility(user.pk)
+                if available_balance(eligibility, now) < data['amount']:
                     raise serializers.ValidationError(
                         {"amount": "No hay fondos suficientes para completar esta transacción."}
                     )
                 
                 # Check if user has made a withdrawal in the last 7 days
-                seven_days_ago = timezone.now() - timedelta(days=7)
-                
-                recent_withdrawal = Transaction.objects.filter(
-                    destination__owner=user,
-                    is_deposit=False,
-                    created_at__gte=seven_days_ago
-                ).exists()
-                
-                if recent_withdrawal:
+                if eligibility.in_cooldown(now):
                     raise serializers.ValidationError(
                         {"non_field_errors": "Ya has realizado un retiro en los últimos 7 días. Por favor espera."}
                     )
@@ -74,32 +81,41 @@ class TransactionSerializer(serializers.Serializer):
         user = self.context['request'].user
         
         try:
-            # Try to find if the user already has a wallet with this address
-            try:
-                if is_deposit:
-                    user_wallet = Wallet.objects.get(owner=user)
-                else:
-                    user_wallet = Wallet.objects.get(address=wallet_address, owner=user)
-            except Wallet.DoesNotExist:
+            # Deposits leave from the user's primary wallet, withdrawals arrive
+            # to the wallet with this address.
+            if is_deposit:
+                user_wallet = Wallet.objects.filter(owner=user).order_by('pk').first()
+            else:
+                user_wallet = Wallet.objects.filter(address=wallet_address, owner=user).first()
+            if user_wallet is None:
                 # Create a new wallet for the user
-                user_wallet = Wallet.objects.update(
-                    address=wallet_address,
-                )
-            
+                if Wallet.all_objects.filter(address=wallet_address).exists():
+                    raise serializers.ValidationError(
+                        {"wallet_address": "Esta dirección pertenece a otra billetera."}
+                    )
+                user_wallet = Wallet.objects.create(owner=user, address=wallet_address)
             
-            # Get the system wallet
-            system_wallet = Wallet.objects.get(owner__email='admin@gmail.com')
+            # Get the system wallet (resolved once per process)
+            system_wallet_pk = system_wallet_id()
             
             # Set origin and destination based on transaction type
             if is_deposit:
-                origin = user_wallet
-                destination = system_wallet
+                origin_id = user_wallet.pk
+                destination_id = system_wallet_pk
 
             else:
-                origin = system_wallet
-                destination = user_wallet
+                origin_id = system_wallet_pk
+                destination_id = user_wallet.pk
                 
-                if calculate_rois(user) < amount:
+                # Locked until commit, so concurrent withdrawals are decided one at a time:
+                # both rules are checked again on the locked row.
+                now = timezone.now()
+                eligibility = get_eligibility(user.pk, lock=True)
+                if eligibility.in_cooldown(now):
+                    raise serializers.ValidationError(
+                        {"non_field_errors": "Ya has realizado un retiro en los últimos 7 días. Por favor espera."}
+                    )
+                if available_balance(eligibility, now) < amount:
                     raise serializers.ValidationError(
                         {"amount": "No hay fondos suficientes para completar esta transacción."}
                     )
@@ -112,8 +128,8 @@ class TransactionSerializer(serializers.Serializer):
 
             # Create the transaction
             transaction = Transaction.objects.create(
-                origin=origin,
-                destination=destination,
+                origin_id=origin_id,
+                destination_id=destination_id,
                 amount=amount,
                 is_deposit=is_deposit,
                 is_pending=True if not is_deposit else False, 
@@ -121,17 +137,22 @@ class TransactionSerializer(serializers.Serializer):
                 hash=hash_value,
             )
 
+            # Balances are incremented by the database, never read and written back.
             if is_deposit:
-                user_wallet.balance += amount
-                user_wallet.save()
+                Wallet.add_to_balances({user_wallet.pk: transaction.amount})
+                ledger.record(transaction, Posting.DEPOSIT)
                 ROI.objects.create(
                     owner=user,
-                    deposit_amount=amount,
+                    deposit_amount=transaction.amount,
                     transaction=transaction,
                 )
             else:
-                user_wallet.balance -= amount
-                user_wallet.save()
+                Wallet.add_to_balances({user_wallet.pk: -transaction.amount})
+                ledger.record(transaction, Posting.WITHDRAWAL)
+                # Start the cooldown on the locked row before releasing it, so a
+                # withdrawal waiting for the lock sees this one.
+                eligibility.last_withdrawal_at = transaction.created_at
+                eligibility.save(update_fields=['last_withdrawal_at', 'updated_at'])
             
             return transaction
             
@@ -173,6 +194,33 @@ class TransactionListSerializer(serializers.ModelSerializer):
         else:
             return 'rejected'
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load everything the serializer reads with a fixed number of queries:
+        wallet owners through joins and the ROIs through a prefetch.
+        """
+        return queryset.select_related(
+            'origin__owner',
+            'destination__owner',
+        ).prefetch_related(
+            Prefetch('roi_transactions', queryset=ROI.objects.order_by('pk'), to_attr='prefetched_rois'),
+        )
+
+    def get_user_wallet_ids(self):
+        """
+        Return the ids of the requesting user's wallets, loaded once per
+        serialization (shared by every row of a list) unless already given
+        as ``user_wallet_ids`` in the context.
+        """
+        if 'user_wallet_ids' in self.context:
+            return self.context['user_wallet_ids']
+        root = self.root
+        if not hasattr(root, '_user_wallet_ids'):
+            request = self.context.get('request')
+            root._user_wallet_ids = set(request.user.wallets.values_list('pk', flat=True))
+        return root._user_wallet_ids
+
     def get_user(self, obj):
         """
         Return information about the wallet counterparty.
@@ -181,17 +229,17 @@ class TransactionListSerializer(serializers.ModelSerializer):
         if not request or not request.user:
             return None
             
-        user_wallets = request.user.wallets.all()
+        user_wallets = self.get_user_wallet_ids()
         
         # If user is sender, show recipient
-        if obj.origin and obj.origin in user_wallets:
+        if obj.origin_id and obj.origin_id in user_wallets:
             if obj.destination:
                 return {
                     'id': str(obj.destination.owner.id),
                     'username': obj.destination.owner.username
                 }
         # If user is recipient, show sender
-        elif obj.destination and obj.destination in user_wallets:
+        elif obj.destination_id and obj.destination_id in user_wallets:
             if obj.origin:
                 return {
                     'id': str(obj.origin.owner.id),
@@ -213,7 +261,10 @@ class TransactionListSerializer(serializers.ModelSerializer):
             return None
         
         user = request.user
-        roi = ROI.objects.filter(owner=user, transaction=obj).first()
+        if hasattr(obj, 'prefetched_rois'):
+            roi = next((roi for roi in obj.prefetched_rois if roi.owner_id == user.pk), None)
+        else:
+            roi = ROI.objects.filter(owner=user, transaction=obj).first()
         if not roi:
             return None
         data = {
@@ -230,4 +281,37 @@ class WithdrawalCheckSerializer(serializers.Serializer):
     """
     can_withdraw = serializers.BooleanField()
     days_remaining = serializers.IntegerField(required=False)
-    message = serializers.CharField()
\ No newline at end of file
+    message = serializers.CharField()
+
+class BulkReviewSerializer(serializers.Serializer):
+    """
+    Serializer para aprobar o rechazar varias transacciones a la vez.
+    """
+    MAX_IDS = 500
+
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=MAX_IDS)
+    action = serializers.ChoiceField(choices=['approve', 'reject'])
+
+
+class ClaimSerializer(serializers.Serializer):
+    """
+    Serializer para reclamar retiros pendientes de revisión.
+    """
+    count = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class ReleaseClaimsSerializer(serializers.Serializer):
+    """
+    Serializer para liberar retiros reclamados.
+    """
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=100)
+
+
+class BatchDepositSerializer(serializers.Serializer):
+    """
+    Serializer para registrar depósitos en lote, idempotente por ``hash``.
+    Cada registro: ``wallet_address``, ``amount`` y ``hash``.
+    """
+    MAX_RECORDS = 5000
+
+    deposits = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=MAX_RECORDS)
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from apps.transaction.eligibility import build_eligibility
+from apps.transaction.models import Transaction, WithdrawalEligibility
+from apps.wallet.models import Wallet
+
+# Sent after a queryset update reviewed ``transactions`` (no post_save is sent).
+transactions_reviewed = Signal()
+# Sent after ``bulk_create`` inserted ``transactions`` (no post_save is sent).
+transactions_created = Signal()
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+def update_withdrawal_eligibility(sender, instance, **kwargs):
+    if instance.is_deposit or instance.destination_id is None:
+        return
+    owner_id = Wallet.all_objects.filter(pk=instance.destination_id).values_list('owner_id', flat=True).first()
+    if owner_id is not None and WithdrawalEligibility.all_objects.filter(owner_id=owner_id).exists():
+        build_eligibility(owner_id)
+
+
+@receiver([transactions_reviewed, transactions_created])
+def update_bulk_eligibility(sender, transactions, **kwargs):
+    wallets = {transaction.destination_id for transaction in transactions if not transaction.is_deposit}
+    owners = WithdrawalEligibility.all_objects.filter(owner__wallets__in=wallets).values_list('owner_id', flat=True)
+    for owner_id in set(owners):
+        build_eligibility(owner_id)
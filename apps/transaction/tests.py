@@ -1,3 +1,687 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import threading
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from unittest import mock
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient, APITransactionTestCase
+
+from apps.roi.accrual import build_state, get_state
+from apps.roi.models import ROI
+from apps.transaction.deposits import ingest_deposits
+from apps.transaction.eligibility import available_balance, get_eligibility
+from apps.transaction.export import EXPORT_FIELDS
+from apps.transaction.models import Transaction
+from apps.transaction.renderers import StreamingRenderer
+from apps.transaction.serializers import TransactionSerializer
+from apps.transaction.views import AsyncTransactionListView, AsyncWithdrawalCheckView, TransactionViewSet
+from apps.transaction.review import ALREADY_PROCESSED, APPROVED, NOT_FOUND, review_transactions
+from apps.wallet import ledger
+from apps.wallet.ledger import ledger_balance
+from apps.wallet.models import BalanceCheckpoint, Posting, Wallet
+from apps.wallet.system import system_wallet_id
+from utils.bo import calculate_rois, get_checkpoint
+from utils.fixedpoint import MAX_AMOUNT
+from utils.tests import BaseTestCase
+
+User = get_user_model()
+
+
+def calculate_rois_at(user, at):
+    with mock.patch('django.utils.timezone.now', return_value=at):
+        return calculate_rois(user)
+
+
+class TransactionTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user(
+            username='admin',
+            email='admin@gmail.com',
+            name='Admin',
+            last_name='User',
+            password='testpass123'
+        )
+        self.admin.is_staff = True
+        self.admin.save()
+        self.system_wallet = Wallet.objects.create(owner=self.admin, address='SYSTEM_WALLET')
+        self.wallet = Wallet.objects.create(owner=self.user, address='USER_WALLET')
+
+    def create_deposit(self, amount=Decimal('1000')):
+        transaction = Transaction.objects.create(
+            origin=self.wallet,
+            destination=self.system_wallet,
+            amount=amount,
+            is_deposit=True,
+            is_pending=False,
+            is_approved=True,
+        )
+        ROI.objects.create(owner=self.user, deposit_amount=amount, transaction=transaction)
+        return transaction
+
+    def create_withdrawal(self, amount=Decimal('10')):
+        return Transaction.objects.create(
+            origin=self.system_wallet,
+            destination=self.wallet,
+            amount=amount,
+            is_deposit=False,
+        )
+
+    def count_queries(self, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 300, response.content)
+        return len(queries)
+
+
+class TransactionQueryCountTests(TransactionTestCase):
+    """
+    The number of queries of each endpoint must not grow with the rows returned.
+    """
+
+    def assertConstantQueries(self, method, url, add_rows, **kwargs):
+        add_rows(2)
+        few = self.count_queries(method, url, **kwargs)
+        add_rows(10)
+        many = self.count_queries(method, url, **kwargs)
+        self.assertEqual(few, many)
+
+    def add_deposits(self, count):
+        for _ in range(count):
+            self.create_deposit()
+
+    def test_list(self):
+        self.assertConstantQueries('get', '/api/v1/transactions/', self.add_deposits)
+
+    def test_legacy_list(self):
+        self.assertConstantQueries('get', '/api/v1/transactions/list/', self.add_deposits)
+
+    def test_staff_list(self):
+        self.client.force_authenticate(self.admin)
+        self.assertConstantQueries('get', '/api/transactions/', self.add_deposits)
+
+    def test_retrieve(self):
+        transaction = self.create_deposit()
+        self.assertConstantQueries('get', f'/api/v1/transactions/{transaction.pk}/', self.add_deposits)
+
+    def test_approve(self):
+        self.client.force_authenticate(self.admin)
+        self.create_deposit()
+        first = self.count_queries('post', f'/api/v1/transactions/{self.create_withdrawal().pk}/approve/')
+        self.add_deposits(10)
+        second = self.count_queries('post', f'/api/v1/transactions/{self.create_withdrawal().pk}/approve/')
+        self.assertEqual(first, second)
+
+    def test_deposit(self):
+        deposit = {'wallet_address': 'USER_WALLET', 'amount': '1000', 'is_deposit': True}
+        # The first deposit also builds the accrual state and resolves the system wallet.
+        self.count_queries('post', '/api/v1/transactions/', data=deposit)
+        first = self.count_queries('post', '/api/v1/transactions/', data=deposit)
+        self.add_deposits(10)
+        second = self.count_queries('post', '/api/v1/transactions/', data=deposit)
+        self.assertEqual(first, second)
+
+    def test_reject(self):
+        self.client.force_authenticate(self.admin)
+        first = self.count_queries('post', f'/api/v1/transactions/{self.create_withdrawal().pk}/reject/')
+        self.add_deposits(10)
+        second = self.count_queries('post', f'/api/v1/transactions/{self.create_withdrawal().pk}/reject/')
+        self.assertEqual(first, second)
+
+
+class TransactionPaginationTests(TransactionTestCase):
+    def test_cursor_pages_cover_every_transaction_once(self):
+        transactions = {str(self.create_deposit().pk) for _ in range(5)}
+        seen = []
+        url = '/api/v1/transactions/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(set(seen), transactions)
+
+    def test_rows_sharing_created_at_are_paged_once_both_ways(self):
+        transactions = [str(self.create_deposit().pk) for _ in range(7)]
+        Transaction.objects.update(created_at=timezone.now() - timedelta(days=1))
+        pages = []
+        url = '/api/v1/transactions/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            pages.append([row['id'] for row in response.data['results']])
+            last = response.data
+            url = response.data['next']
+        seen = [pk for page in pages for pk in page]
+        self.assertEqual(sorted(seen), sorted(transactions))
+        self.assertEqual(len(seen), 7)
+
+        backwards = []
+        url = last['previous']
+        while url:
+            response = self.client.get(url)
+            backwards.insert(0, [row['id'] for row in response.data['results']])
+            url = response.data['previous']
+        self.assertEqual(backwards, pages[:-1])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/v1/transactions/?cursor=bm90LWEtY3Vyc29y')
+        self.assertEqual(response.status_code, 404)
+
+    def test_no_count_query(self):
+        self.create_deposit()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/v1/transactions/list/')
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql'].upper()])
+
+
+class TransactionConditionalGetTests(TransactionTestCase):
+    def test_unchanged_list_is_not_modified(self):
+        self.create_deposit()
+        response = self.client.get('/api/v1/transactions/')
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/transactions/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        # Only the authenticated user is read.
+        self.assertEqual(len(queries), 1)
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get('/api/v1/transactions/list/')['ETag']
+        self.create_deposit()
+        response = self.client.get('/api/v1/transactions/list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_the_query(self):
+        first = self.client.get('/api/v1/transactions/?page_size=1')['ETag']
+        second = self.client.get('/api/v1/transactions/?page_size=2')['ETag']
+        self.assertNotEqual(first, second)
+
+    def test_staff_lists_are_not_conditional(self):
+        self.client.force_authenticate(self.admin)
+        self.assertFalse(self.client.get('/api/transactions/').has_header('ETag'))
+
+
+class AsyncReadViewTests(TransactionTestCase):
+    """
+    The async views must answer exactly as their DRF counterparts.
+    """
+
+    def test_list_pages_match(self):
+        for _ in range(3):
+            self.create_deposit()
+        url = '/api/v1/transactions/list/?page_size=2'
+        while url:
+            expected = self.client.get(url)
+            response = self.call_async(AsyncTransactionListView.as_view(), url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content), json.loads(expected.content))
+            self.assertEqual(response['ETag'], expected['ETag'])
+            url = expected.data['next']
+
+    def test_staff_list(self):
+        self.create_deposit()
+        other = User.objects.create_user(
+            username='other', email='other@example.com', name='Other', last_name='User', password='testpass123'
+        )
+        Transaction.objects.create(
+            origin=Wallet.objects.create(owner=other, address='OTHER_WALLET'),
+            destination=self.system_wallet,
+            amount=Decimal('5'),
+            is_deposit=True,
+        )
+        token = self.get_tokens_for_user(self.admin)['access']
+        view = AsyncTransactionListView.as_view(all_for_staff=True)
+        self.assertEqual(len(json.loads(self.call_async(view, '/', token=token).content)['results']), 2)
+        self.assertEqual(len(json.loads(self.call_async(view, '/').content)['results']), 1)
+
+    def test_unchanged_list_is_not_modified(self):
+        self.create_deposit()
+        view = AsyncTransactionListView.as_view()
+        etag = self.call_async(view, '/api/v1/transactions/list/')['ETag']
+        response = self.call_async(view, '/api/v1/transactions/list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_fall_back_to_the_viewset(self):
+        view = AsyncTransactionListView.as_view(
+            all_for_staff=True,
+            fallback=TransactionViewSet.as_view({'post': 'create'}),
+        )
+        request = RequestFactory().post(
+            '/api/v1/transactions/',
+            {'wallet_address': 'USER_WALLET', 'amount': '100', 'is_deposit': True, 'hash': 'fallback'},
+            HTTP_AUTHORIZATION=f'Bearer {self.token["access"]}',
+        )
+        response = async_to_sync(view)(request)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Transaction.objects.filter(hash='fallback').exists())
+
+    def test_check_withdrawal_matches(self):
+        url = '/api/v1/transactions/check_withdrawal/'
+        for _ in range(2):
+            expected = self.client.get(url)
+            response = self.call_async(AsyncWithdrawalCheckView.as_view(), url)
+            self.assertEqual(json.loads(response.content), json.loads(expected.content))
+            self.create_withdrawal()
+
+    def test_authentication_errors(self):
+        response = self.call_async(AsyncWithdrawalCheckView.as_view(), '/', token='')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(json.loads(response.content), {'detail': 'Authentication credentials were not provided.'})
+        self.assertTrue(response.has_header('WWW-Authenticate'))
+        response = self.call_async(AsyncWithdrawalCheckView.as_view(), '/', token='invalid')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(json.loads(response.content)['code'], 'token_not_valid')
+
+
+class WithdrawalEligibilityTests(TransactionTestCase):
+    url = '/api/v1/transactions/check_withdrawal/'
+
+    def test_check_withdrawal_reads_one_row(self):
+        self.client.get(self.url)
+        self.create_withdrawal()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertFalse(response.data['can_withdraw'])
+        self.assertEqual(len([query for query in queries if 'transaction_withdrawaleligibility' in query['sql']]), 1)
+        self.assertFalse([query for query in queries if 'transaction_transaction' in query['sql']])
+
+    def test_available_balance_follows_approvals(self):
+        self.create_deposit()
+        eligibility = get_eligibility(self.user.pk)
+        now = timezone.now()
+        self.assertEqual(available_balance(eligibility, now), calculate_rois_at(self.user, now))
+
+        self.client.force_authenticate(self.admin)
+        self.client.post(f'/api/v1/transactions/{self.create_withdrawal().pk}/approve/')
+        eligibility = get_eligibility(self.user.pk)
+        self.assertIsNotNone(eligibility.last_withdrawal_at)
+        self.assertEqual(available_balance(eligibility, now), calculate_rois_at(self.user, now))
+
+    def test_withdrawal_in_cooldown_is_rejected(self):
+        self.create_deposit(Decimal('5000'))
+        self.create_withdrawal()
+        response = self.client.post('/api/v1/transactions/', {
+            'wallet_address': 'USER_WALLET',
+            'amount': '1',
+            'is_deposit': False,
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_back_to_back_withdrawals(self):
+        roi = self.create_deposit(Decimal('5000')).roi_transactions.get()
+        roi.created_at -= timedelta(days=1)
+        roi.save(update_fields=['created_at'])
+        data = {'wallet_address': 'USER_WALLET', 'amount': '1', 'is_deposit': False}
+        request = SimpleNamespace(user=self.user)
+        # Both requests pass the unlocked checks before either is created.
+        first, second = (TransactionSerializer(data=data, context={'request': request}) for _ in range(2))
+        self.assertTrue(first.is_valid(), first.errors)
+        self.assertTrue(second.is_valid(), second.errors)
+
+        first.save()
+        with self.assertRaises(ValidationError):
+            second.save()
+        self.assertEqual(Transaction.objects.filter(is_deposit=False).count(), 1)
+        self.assertTrue(get_eligibility(self.user.pk).in_cooldown(timezone.now()))
+
+
+class TransactionAmountTests(TransactionTestCase):
+    def test_amount_beyond_the_fixed_point_range_is_rejected(self):
+        response = self.client.post('/api/v1/transactions/', {
+            'wallet_address': 'USER_WALLET',
+            'amount': str(MAX_AMOUNT + 1),
+            'is_deposit': True,
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('amount', response.data)
+        self.assertFalse(Transaction.objects.exists())
+
+
+class TransactionExportTests(TransactionTestCase):
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        deposits = {str(self.create_deposit().pk) for _ in range(3)}
+        rows = list(csv.DictReader(io.StringIO(self.content(self.client.get('/api/v1/transactions/export/')))))
+        self.assertEqual({row['id'] for row in rows}, deposits)
+        self.assertEqual(rows[0]['type'], 'deposit')
+
+    def test_ndjson_and_json_share_rows(self):
+        self.create_deposit()
+        self.create_withdrawal()
+        ndjson = self.content(self.client.get('/api/v1/transactions/export/?format=ndjson'))
+        rows = [json.loads(line) for line in ndjson.splitlines()]
+        self.assertEqual(json.loads(self.content(self.client.get('/api/v1/transactions/export/?format=json'))), rows)
+        self.assertEqual([row['status'] for row in rows], ['pending', 'approved'])
+
+    def test_same_filters_as_list(self):
+        self.create_deposit()
+        other = User.objects.create_user(
+            username='other', email='other@example.com', name='Other', last_name='User', password='testpass123'
+        )
+        Transaction.objects.create(
+            origin=Wallet.objects.create(owner=other, address='OTHER_WALLET'),
+            destination=self.system_wallet,
+            amount=Decimal('100'),
+            is_deposit=True,
+        )
+        content = self.content(self.client.get('/api/v1/transactions/export/?format=ndjson'))
+        self.assertEqual(len(content.splitlines()), 1)
+        self.client.force_authenticate(self.admin)
+        content = self.content(self.client.get('/api/v1/transactions/export/?format=ndjson'))
+        self.assertEqual(len(content.splitlines()), 2)
+
+    def test_empty_csv_has_header(self):
+        content = self.content(self.client.get('/api/v1/transactions/export/?format=csv'))
+        self.assertEqual(content.strip(), ','.join(EXPORT_FIELDS))
+
+    def test_streaming_renderers_must_encode(self):
+        with self.assertRaises(TypeError):
+            StreamingRenderer()
+
+
+class BulkReviewTests(TransactionTestCase):
+    url = '/api/v1/transactions/bulk_review/'
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+
+    def test_outcomes(self):
+        self.create_deposit(Decimal('5000'))
+        withdrawals = [self.create_withdrawal() for _ in range(3)]
+        processed = withdrawals[0]
+        self.client.post(f'/api/v1/transactions/{processed.pk}/reject/')
+        missing = uuid.uuid4()
+
+        response = self.client.post(self.url, {
+            'ids': [str(withdrawal.pk) for withdrawal in withdrawals] + [str(missing)],
+            'action': 'approve',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['outcome'] for row in response.data['results']], [
+            ALREADY_PROCESSED, APPROVED, APPROVED, NOT_FOUND,
+        ])
+        self.assertEqual(Transaction.objects.filter(is_approved=True, is_deposit=False).count(), 2)
+        self.wallet.refresh_from_db()
+        self.assertIsNotNone(self.wallet.last_transaction_date)
+
+    def test_ledger_matches_a_replay(self):
+        ledger.record(self.create_deposit(Decimal('5000')), Posting.DEPOSIT)
+        withdrawals = [self.create_withdrawal() for _ in range(3)]
+        for withdrawal in withdrawals:
+            ledger.record(withdrawal, Posting.WITHDRAWAL)
+        self.client.post(self.url, {'ids': [str(w.pk) for w in withdrawals], 'action': 'approve'}, format='json')
+        balance = ledger_balance(self.wallet.pk)
+        self.assertEqual(balance, Decimal('5000') - 3 * Decimal('10'))
+        ledger.rebuild(self.wallet.pk)
+        self.assertEqual(ledger_balance(self.wallet.pk), balance)
+
+    def test_review_is_processed_once(self):
+        withdrawal = self.create_withdrawal()
+        outcomes, _ = review_transactions([withdrawal.pk], True, self.admin)
+        self.assertEqual(outcomes[withdrawal.pk], APPROVED)
+        outcomes, reviewed = review_transactions([withdrawal.pk], False, self.admin)
+        self.assertEqual(outcomes[withdrawal.pk], ALREADY_PROCESSED)
+        self.assertEqual(reviewed, [])
+        response = self.client.post(f'/api/v1/transactions/{withdrawal.pk}/reject/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, {'ids': [str(uuid.uuid4())], 'action': 'approve'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class ReviewClaimTests(TransactionTestCase):
+    url = '/api/v1/transactions/claim/'
+
+    def setUp(self):
+        super().setUp()
+        self.reviewer = User.objects.create_user(
+            username='reviewer', email='reviewer@example.com', name='Review', last_name='User', password='testpass123'
+        )
+        self.reviewer.is_staff = True
+        self.reviewer.save()
+        self.withdrawals = [self.create_withdrawal() for _ in range(5)]
+
+    def claim(self, user, count):
+        self.client.force_authenticate(user)
+        response = self.client.post(self.url, {'count': count}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_reviewers_get_disjoint_rows_oldest_first(self):
+        first = self.claim(self.admin, 3)
+        second = self.claim(self.reviewer, 3)
+        self.assertEqual(first, [str(withdrawal.pk) for withdrawal in self.withdrawals[:3]])
+        self.assertEqual(second, [str(withdrawal.pk) for withdrawal in self.withdrawals[3:]])
+        self.assertEqual(self.claim(self.reviewer, 3), [])
+
+    def test_expired_leases_are_claimable(self):
+        self.claim(self.admin, 5)
+        Transaction.objects.update(claim_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(self.claim(self.reviewer, 5)), 5)
+
+    def test_release_and_reviewed_rows(self):
+        claimed = self.claim(self.admin, 2)
+        self.client.post(f'/api/v1/transactions/{claimed[0]}/approve/')
+        response = self.client.post('/api/v1/transactions/release/', {'ids': claimed}, format='json')
+        self.assertEqual(response.data['released'], 2)
+        self.assertEqual(self.claim(self.reviewer, 5), [str(w.pk) for w in self.withdrawals if str(w.pk) != claimed[0]])
+
+
+class BatchDepositTests(TransactionTestCase):
+    url = '/api/v1/transactions/batch_deposits/'
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+
+    def records(self, count, prefix='h'):
+        return [
+            {'wallet_address': 'USER_WALLET', 'amount': str(100 * (i + 1)), 'hash': f'{prefix}{i}'}
+            for i in range(count)
+        ]
+
+    def test_ingest_is_idempotent(self):
+        records = self.records(3) + [self.records(1)[0]]
+        response = self.client.post(self.url, {'deposits': records}, format='json')
+        self.assertEqual((response.data['inserted'], response.data['duplicates']), (3, 1))
+        response = self.client.post(self.url, {'deposits': records}, format='json')
+        self.assertEqual((response.data['inserted'], response.data['duplicates']), (0, 4))
+
+        self.assertEqual(Transaction.objects.filter(is_deposit=True).count(), 3)
+        self.assertEqual(sorted(ROI.objects.values_list('level', flat=True)), [1, 1, 1])
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('600'))
+        self.assertEqual(ledger_balance(self.wallet.pk), Decimal('600'))
+
+    def test_rejected_records(self):
+        response = self.client.post(self.url, {'deposits': [
+            {'wallet_address': 'UNKNOWN', 'amount': '100', 'hash': 'a'},
+            {'wallet_address': 'USER_WALLET', 'amount': '5', 'hash': 'b'},
+            {'wallet_address': 'USER_WALLET', 'amount': '100'},
+        ]}, format='json')
+        self.assertEqual(response.data['inserted'], 0)
+        self.assertEqual([row['error'] for row in response.data['rejected']], [
+            'amount_too_low', 'missing_hash', 'unknown_wallet',
+        ])
+
+    def test_amounts_beyond_the_fixed_point_range(self):
+        response = self.client.post(self.url, {'deposits': [
+            {'wallet_address': 'USER_WALLET', 'amount': str(MAX_AMOUNT + 1), 'hash': 'big'},
+            {'wallet_address': 'USER_WALLET', 'amount': 'NaN', 'hash': 'nan'},
+            {'wallet_address': 'USER_WALLET', 'amount': str(MAX_AMOUNT), 'hash': 'max'},
+        ]}, format='json')
+        self.assertEqual(response.data['inserted'], 1)
+        self.assertEqual([row['error'] for row in response.data['rejected']], ['invalid_amount', 'invalid_amount'])
+
+    def test_constant_statements_per_batch(self):
+        system_wallet_id()
+        with CaptureQueriesContext(connection) as few:
+            ingest_deposits(self.records(2, 'a'))
+        with CaptureQueriesContext(connection) as many:
+            ingest_deposits(self.records(20, 'b'))
+        self.assertEqual(len(few), len(many))
+
+    def test_accrual_state_follows(self):
+        get_state(self.user.pk)
+        ingest_deposits(self.records(3))
+        now = timezone.now()
+        self.assertEqual(available_balance(get_eligibility(self.user.pk), now), calculate_rois_at(self.user, now))
+        self.assertGreater(get_state(self.user.pk).weight, 0)
+
+
+class HistoricalDepositImportTests(TransactionTestCase):
+    def import_csv(self, rows):
+        source = io.StringIO()
+        writer = csv.DictWriter(source, fieldnames=['wallet_address', 'amount', 'hash', 'created_at'])
+        writer.writeheader()
+        writer.writerows(rows)
+        with mock.patch('sys.stdin', io.StringIO(source.getvalue())):
+            out, err = StringIO(), StringIO()
+            call_command('import_historical_deposits', '-', '--batch-size', '2', stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_keeps_the_original_dates(self):
+        when = timezone.now() - timedelta(days=30)
+        rows = [
+            {'wallet_address': 'USER_WALLET', 'amount': '100', 'hash': 'h1', 'created_at': when.isoformat()},
+            {'wallet_address': 'USER_WALLET', 'amount': '3000', 'hash': 'h2',
+             'created_at': (when + timedelta(days=1)).isoformat()},
+            {'wallet_address': 'USER_WALLET', 'amount': '0.3', 'hash': 'h3', 'created_at': when.isoformat()},
+            {'wallet_address': 'USER_WALLET', 'amount': '100', 'hash': 'h4', 'created_at': 'yesterday'},
+            {'wallet_address': 'USER_WALLET', 'amount': '100', 'hash': 'h5',
+             'created_at': (timezone.now() + timedelta(days=1)).isoformat()},
+        ]
+        out, err = self.import_csv(rows)
+        self.assertIn('3 inserted', out)
+        self.assertIn('rows/s', out)
+        self.assertEqual(err.count('invalid_created_at'), 2)
+
+        deposit = Transaction.objects.get(hash='h2')
+        self.assertEqual(deposit.created_at, when + timedelta(days=1))
+        roi = ROI.objects.get(transaction=deposit)
+        self.assertEqual((roi.created_at, roi.level), (deposit.created_at, 4))
+        self.assertEqual(roi.ends_at, roi.created_at + timedelta(seconds=roi.duration_seconds))
+        self.assertTrue(Transaction._meta.get_field('created_at').auto_now_add)
+        self.assertEqual(ROI.objects.get(transaction__hash='h3').level, 2)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('3100.3'))
+
+        out, _ = self.import_csv(rows)
+        self.assertIn('0 inserted, 3 duplicates', out)
+
+    def records(self, count, prefix):
+        when = timezone.now() - timedelta(days=30)
+        return [
+            {'wallet_address': 'USER_WALLET', 'amount': str(100 * (i + 1)), 'hash': f'{prefix}{i}',
+             'created_at': (when + timedelta(hours=i)).isoformat()}
+            for i in range(count)
+        ]
+
+    def test_constant_statements_per_batch(self):
+        # As BatchDepositTests: the bulk_update of the dates is one statement per batch too.
+        system_wallet_id()
+        with CaptureQueriesContext(connection) as few:
+            ingest_deposits(self.records(2, 'a'), historical=True)
+        with CaptureQueriesContext(connection) as many:
+            ingest_deposits(self.records(20, 'b'), historical=True)
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(Transaction.objects.filter(is_deposit=True).count(), 22)
+
+    def test_derived_state_follows(self):
+        get_state(self.user.pk)
+        day = timezone.now() - timedelta(days=10)
+        stale = get_checkpoint(self.user, day)
+        self.import_csv([
+            {'wallet_address': 'USER_WALLET', 'amount': '1000', 'hash': 'old',
+             'created_at': (day - timedelta(days=5)).isoformat()},
+        ])
+        self.assertFalse(BalanceCheckpoint.objects.filter(pk=stale.pk).exists())
+        self.assertNotEqual(get_checkpoint(self.user, day).deposits, stale.deposits)
+        self.assertEqual(get_state(self.user.pk).weight, build_state(self.user.pk).weight)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentDepositTests(APITransactionTestCase):
+    """
+    Deposits of the same user written from many threads at once.
+    Needs a database with row locks (PostgreSQL); SQLite locks whole tables,
+    so the test is skipped there. Against the PostgreSQL of ``DATABASES``:
+
+        python manage.py test apps.transaction.tests.ConcurrentDepositTests
+    """
+    THREADS = 8
+    DEPOSITS = 5
+    AMOUNT = Decimal('100')
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@gmail.com', name='Admin', last_name='User', password='testpass123'
+        )
+        Wallet.objects.create(owner=self.admin, address='SYSTEM_WALLET')
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', name='Test', last_name='User', password='testpass123'
+        )
+        self.wallet = Wallet.objects.create(owner=self.user, address='USER_WALLET')
+
+    def deposit(self, errors):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            for _ in range(self.DEPOSITS):
+                response = client.post('/api/v1/transactions/', {
+                    'wallet_address': 'USER_WALLET',
+                    'amount': str(self.AMOUNT),
+                    'is_deposit': True,
+                })
+                if response.status_code != 201:
+                    errors.append(response.content)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    def test_no_lost_updates(self):
+        errors = []
+        threads = [threading.Thread(target=self.deposit, args=(errors,)) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+        total = self.AMOUNT * self.THREADS * self.DEPOSITS
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, total)
+        self.assertEqual(ledger_balance(self.wallet.pk), total)
+        self.assertEqual(ROI.objects.filter(owner=self.user).count(), self.THREADS * self.DEPOSITS)
+
+
+class QueryPlanTests(TransactionTestCase):
+    def test_hot_queries_use_indexes(self):
+        output = StringIO()
+        call_command('check_query_plans', seed_users=50, disable_seqscan=True, stdout=output)
+        self.assertIn('No sequential scans', output.getvalue())
@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from apps.transaction.views import TransactionViewSet
 from apps.transaction.views import TransactionCreateView, TransactionListView
+from apps.transaction.views import AsyncTransactionListView, AsyncWithdrawalCheckView
 
 app_name = 'transaction'
 
@@ -16,4 +18,15 @@ urlpatterns = [
     
     # Include the router URLs
     path('', include(router.urls)),
-]
\ No newline at end of file
+]
+
+if settings.ASYNC_READ_VIEWS:
+    # Take over the reads of the router; creating a transaction stays on the viewset.
+    urlpatterns = [
+        path('list/', AsyncTransactionListView.as_view(), name='list_transactions'),
+        path('check_withdrawal/', AsyncWithdrawalCheckView.as_view(), name='transaction-check-withdrawal'),
+        path('', AsyncTransactionListView.as_view(
+            all_for_staff=True,
+            fallback=TransactionViewSet.as_view({'post': 'create'}),
+        ), name='transaction-list'),
+    ] + urlpatterns
\ No newline at end of file
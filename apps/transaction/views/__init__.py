@@ -1,2 +1,3 @@
 from apps.transaction.views.viewsets import TransactionViewSet
-from apps.transaction.views.legacy import TransactionCreateView, TransactionListView, AdminPermission, ClientTransactionPermission
\ No newline at end of file
+from apps.transaction.views.legacy import TransactionCreateView, TransactionListView, AdminPermission, ClientTransactionPermission
+from apps.transaction.views.async_reads import AsyncTransactionListView, AsyncWithdrawalCheckView
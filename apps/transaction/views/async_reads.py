@@ -0,0 +1,61 @@
+from django.db import models
+from django.utils import timezone
+from rest_framework.request import Request
+
+from apps.transaction.eligibility import aget_eligibility, withdrawal_check
+from apps.transaction.models import Transaction
+from apps.transaction.pagination import TransactionCursorPagination
+from apps.transaction.serializers import TransactionListSerializer, WithdrawalCheckSerializer
+from utils.async_views import AsyncAPIView
+from utils.conditional import ledger_etag, not_modified, set_validators
+
+
+class AsyncTransactionListView(AsyncAPIView):
+    """
+    Async version of the transaction lists: the transactions of the user's
+    wallets, or every transaction for staff when ``all_for_staff`` is set
+    (as ``TransactionViewSet.list`` does). Same pages and ETags.
+    """
+    pagination_class = TransactionCursorPagination
+    all_for_staff = False
+
+    def get_queryset(self, user):
+        if self.all_for_staff and user.is_staff:
+            queryset = Transaction.objects.all()
+        else:
+            wallets = user.wallets.all()
+            queryset = Transaction.objects.filter(
+                models.Q(origin__in=wallets) | models.Q(destination__in=wallets)
+            )
+        return TransactionListSerializer.setup_eager_loading(queryset).order_by('-created_at')
+
+    async def get(self, request):
+        user = request.user
+        # Staff lists span every user and are always rendered.
+        etag = None if user.is_staff else ledger_etag(user, request.get_full_path(), self.renderer.media_type)
+        if etag is not None:
+            response = not_modified(request, etag)
+            if response is not None:
+                return set_validators(response, etag)
+
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(self.get_queryset(user), Request(request), view=self)
+        context = {
+            'request': request,
+            'user_wallet_ids': {pk async for pk in user.wallets.values_list('pk', flat=True)},
+        }
+        data = TransactionListSerializer(page, many=True, context=context).data
+        response = self.render(paginator.get_paginated_response(data).data)
+        if etag is not None:
+            set_validators(response, etag)
+        return response
+
+
+class AsyncWithdrawalCheckView(AsyncAPIView):
+    """
+    Async version of ``TransactionViewSet.check_withdrawal``.
+    """
+
+    async def get(self, request):
+        eligibility = await aget_eligibility(request.user.pk)
+        return self.render(WithdrawalCheckSerializer(withdrawal_check(eligibility, timezone.now())).data)
@@ -1,13 +1,18 @@
-from django.shortcuts import get_object_or_404
+import uuid
+
+from django.http import Http404
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.utils import timezone
 
 from apps.transaction.serializers import TransactionSerializer, TransactionListSerializer
 from apps.transaction.models import Transaction
+from apps.transaction.pagination import TransactionCursorPagination
+from apps.transaction.review import ALREADY_PROCESSED, NOT_FOUND, review_transactions
 from django.db import models
 
+from utils.conditional import LedgerConditionalListMixin
+
 class ClientTransactionPermission(permissions.BasePermission):
     """
     Custom permission to only allow clients to create transactions.
@@ -54,12 +59,13 @@ class TransactionCreateView(generics.CreateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class TransactionListView(generics.ListAPIView):
+class TransactionListView(LedgerConditionalListMixin, generics.ListAPIView):
     """
     API endpoint that lists transactions where the authenticated user is either the origin or destination.
     """
     serializer_class = TransactionListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TransactionCursorPagination
     
     def get_queryset(self):
         """
@@ -70,9 +76,10 @@ class TransactionListView(generics.ListAPIView):
         # Get the user's wallet(s)
         wallets = user.wallets.all()
         # Get transactions where user's wallet is origin or destination
-        return Transaction.objects.filter(
+        queryset = Transaction.objects.filter(
             models.Q(origin__in=wallets) | models.Q(destination__in=wallets)
-        ).order_by('-created_at')
+        )
+        return TransactionListSerializer.setup_eager_loading(queryset).order_by('-created_at')
 
 
 class TransactionApprovalView(APIView):
@@ -87,16 +94,6 @@ class TransactionApprovalView(APIView):
         Required parameters:
         - action: 'approve' or 'reject'
         """
-        # Get the transaction
-        transaction = get_object_or_404(Transaction, id=transaction_id)
-        
-        # Check if transaction is already processed
-        if not transaction.is_pending:
-            return Response(
-                {"detail": "Transaction has already been processed."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
         # Get the action (approve or reject)
         action = request.data.get('action')
         
@@ -106,22 +103,23 @@ class TransactionApprovalView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update the transaction
-        transaction.is_pending = False
-        transaction.is_approved = action == 'approve'
-        transaction.reviewer = request.user
-        transaction.reviewed_at = timezone.now()
-        transaction.save()
+        try:
+            transaction_id = uuid.UUID(str(transaction_id))
+        except ValueError:
+            raise Http404
+        outcomes, reviewed = review_transactions([transaction_id], action == 'approve', request.user)
         
-        # Update wallet balance if the transaction is approved and it's a withdrawal
-        if action == 'approve' and not transaction.is_deposit:
-            destination_wallet = transaction.destination
-            if destination_wallet:
-                destination_wallet.last_transaction_date = timezone.now()
-                destination_wallet.save()
+        if outcomes[transaction_id] == NOT_FOUND:
+            raise Http404
+        # Check if transaction is already processed
+        if outcomes[transaction_id] == ALREADY_PROCESSED:
+            return Response(
+                {"detail": "Transaction has already been processed."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         # Return the updated transaction
-        transaction_data = TransactionListSerializer(transaction, context={'request': request}).data
+        transaction_data = TransactionListSerializer(reviewed[0], context={'request': request}).data
         
         return Response(
             {
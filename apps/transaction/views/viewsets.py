@@ -1,25 +1,38 @@
+import uuid
+
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
-from django.shortcuts import get_object_or_404
+from django.http import Http404, StreamingHttpResponse
 from django.db import models
 
+from apps.transaction.deposits import ingest_deposits
+from apps.transaction.eligibility import get_eligibility, withdrawal_check
+from apps.transaction.export import EXPORT_FIELDS, export_rows
 from apps.transaction.models import Transaction
-from apps.transaction.serializers import TransactionSerializer, TransactionListSerializer
+from apps.transaction.pagination import TransactionCursorPagination
+from apps.transaction.renderers import CSVRenderer, NDJSONRenderer, StreamingJSONRenderer
+from apps.transaction.review import (
+    ALREADY_PROCESSED, NOT_FOUND, claim_withdrawals, release_claims, review_transactions,
+)
+from apps.transaction.serializers import (
+    BatchDepositSerializer, BulkReviewSerializer, ClaimSerializer, ReleaseClaimsSerializer, TransactionSerializer, TransactionListSerializer,
+)
 from apps.transaction.views.legacy import AdminPermission, ClientTransactionPermission
+from utils.conditional import LedgerConditionalListMixin
 from django.utils import timezone
-from datetime import timedelta
 from rest_framework.decorators import action
 from apps.transaction.serializers import WithdrawalCheckSerializer
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(LedgerConditionalListMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing transactions.
     """
     queryset = Transaction.objects.all().order_by('-created_at')
     serializer_class = TransactionListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TransactionCursorPagination
     
     def get_permissions(self):
         """
@@ -27,7 +40,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
         """
         if self.action == 'create':
             permission_classes = [ClientTransactionPermission]
-        elif self.action in ['approve', 'reject']:
+        elif self.action in ['approve', 'reject', 'bulk_review', 'batch_deposits', 'claim', 'release']:
             permission_classes = [AdminPermission]
         else:
             # For list, retrieve, etc.
@@ -51,13 +64,14 @@ class TransactionViewSet(viewsets.ModelViewSet):
         
         # Admin users can see all transactions
         if user.is_staff:
-            return Transaction.objects.all().order_by('-created_at')
-            
-        # Regular users can only see their own transactions
-        wallets = user.wallets.all()
-        return Transaction.objects.filter(
-            models.Q(origin__in=wallets) | models.Q(destination__in=wallets)
-        ).order_by('-created_at')
+            queryset = Transaction.objects.all()
+        else:
+            # Regular users can only see their own transactions
+            wallets = user.wallets.all()
+            queryset = Transaction.objects.filter(
+                models.Q(origin__in=wallets) | models.Q(destination__in=wallets)
+            )
+        return TransactionListSerializer.setup_eager_loading(queryset).order_by('-created_at')
     
     def create(self, request, *args, **kwargs):
         """
@@ -88,31 +102,23 @@ class TransactionViewSet(viewsets.ModelViewSet):
         """
         Helper method to process (approve or reject) a transaction.
         """
-        transaction = get_object_or_404(Transaction, pk=pk)
+        try:
+            pk = uuid.UUID(str(pk))
+        except ValueError:
+            raise Http404
+        outcomes, reviewed = review_transactions([pk], approve, request.user)
         
+        if outcomes[pk] == NOT_FOUND:
+            raise Http404
         # Check if transaction is already processed
-        if not transaction.is_pending:
+        if outcomes[pk] == ALREADY_PROCESSED:
             return Response(
                 {"detail": "Transaction has already been processed."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update the transaction
-        transaction.is_pending = False
-        transaction.is_approved = approve
-        transaction.reviewer = request.user
-        transaction.reviewed_at = timezone.now()
-        transaction.save()
-        
-        # Update wallet balance if the transaction is approved and it's a withdrawal
-        if approve and not transaction.is_deposit:
-            destination_wallet = transaction.destination
-            if destination_wallet:
-                destination_wallet.last_transaction_date = timezone.now()
-                destination_wallet.save()
-        
         # Return the updated transaction
-        transaction_data = TransactionListSerializer(transaction, context={'request': request}).data
+        transaction_data = TransactionListSerializer(reviewed[0], context={'request': request}).data
         
         action_text = "approved" if approve else "rejected"
         return Response(
@@ -122,7 +128,85 @@ class TransactionViewSet(viewsets.ModelViewSet):
             },
             status=status.HTTP_200_OK
         )
+
+    @action(detail=False, methods=['post'])
+    def bulk_review(self, request):
+        """
+        Approve or reject several pending transactions at once.
+        Each id is reviewed at most once, whoever else is reviewing it.
+        """
+        serializer = BulkReviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        outcomes, _ = review_transactions(
+            serializer.validated_data['ids'],
+            serializer.validated_data['action'] == 'approve',
+            request.user,
+        )
+        return Response(
+            {"results": [{"id": str(pk), "outcome": outcome} for pk, outcome in outcomes.items()]},
+            status=status.HTTP_200_OK
+        )
     
+    @action(detail=False, methods=['post'])
+    def batch_deposits(self, request):
+        """
+        Register many deposits at once. Deposits whose hash already exists are
+        skipped, so a batch can be safely sent again.
+        """
+        serializer = BatchDepositSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = ingest_deposits(serializer.validated_data['deposits'])
+        return Response(
+            {
+                "inserted": result['inserted'],
+                "duplicates": result['duplicates'],
+                "rejected": [{"hash": hash_value, "error": error} for hash_value, error in result['rejected']],
+            },
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['post'])
+    def claim(self, request):
+        """
+        Claim the next pending withdrawals to review, leased to the reviewer.
+        Concurrent reviewers always get different rows.
+        """
+        serializer = ClaimSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        claimed, expires_at = claim_withdrawals(request.user, serializer.validated_data['count'])
+        return Response(
+            {
+                "lease_expires_at": expires_at,
+                "results": TransactionListSerializer(claimed, many=True, context={'request': request}).data
+            },
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['post'])
+    def release(self, request):
+        """
+        Give back claimed withdrawals before their lease ends.
+        """
+        serializer = ReleaseClaimsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        released = release_claims(request.user, serializer.validated_data['ids'])
+        return Response({"released": released}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer, StreamingJSONRenderer])
+    def export(self, request):
+        """
+        Exporta las transacciones visibles para el usuario (mismos filtros que el
+        listado) como CSV, NDJSON o JSON (``?format=``), en streaming.
+        """
+        renderer = request.accepted_renderer
+        rows = export_rows(self.filter_queryset(self.get_queryset()))
+        response = StreamingHttpResponse(
+            renderer.stream(rows, EXPORT_FIELDS),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = f'attachment; filename="transactions.{renderer.format}"'
+        return response
+
     @action(detail=False, methods=['get'])
     def check_withdrawal(self, request):
         """
@@ -136,29 +220,5 @@ class TransactionViewSet(viewsets.ModelViewSet):
             )
 
         # Buscar el último retiro del usuario
-        seven_days_ago = timezone.now() - timedelta(days=7)
-        last_withdrawal = Transaction.objects.filter(
-            destination__owner=user,
-            is_deposit=False,
-            created_at__gte=seven_days_ago
-        ).order_by('-created_at').first()
-
-        if last_withdrawal:
-            # Calcular días restantes
-            days_passed = (timezone.now() - last_withdrawal.created_at).days
-            days_remaining = 7 - days_passed
-            
-            return Response(
-                WithdrawalCheckSerializer({
-                    'can_withdraw': False,
-                    'days_remaining': days_remaining,
-                    'message': f'Debes esperar {days_remaining} días para realizar otro retiro.'
-                }).data
-            )
-
-        return Response(
-            WithdrawalCheckSerializer({
-                'can_withdraw': True,
-                'message': 'Puedes realizar un retiro.'
-            }).data
-        )
\ No newline at end of file
+        eligibility = get_eligibility(user.pk)
+        return Response(WithdrawalCheckSerializer(withdrawal_check(eligibility)).data)
\ No newline at end of file
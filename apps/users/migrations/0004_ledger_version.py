@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='ledger_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
+from django.db.models import F
 
 from utils.models import BaseModel
 
@@ -35,12 +36,33 @@ class CustomUserManager(BaseUserManager):
 class User(BaseModel, AbstractUser):
     name = models.CharField(max_length=255, blank=True, null=True)
     last_name = models.CharField(max_length=255, blank=True, null=True)
+    # Bumped on every write to the user's transactions, ROIs or wallets (see
+    # apps.users.signals); drives the ETags of their profile and transactions.
+    ledger_version = models.PositiveBigIntegerField(default=0, editable=False)
     objects = CustomUserManager()
     all_objects = models.Manager()
 
+    class Meta:
+        indexes = [
+            # Login by email and registration checks.
+            models.Index(
+                fields=['email'],
+                condition=models.Q(deleted_at__isnull=True),
+                name='user_email_active_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.email
 
+    @classmethod
+    def bump_ledger_versions(cls, owners):
+        """
+        Increment the ledger version of ``owners`` (ids or a ``values('owner')``
+        queryset) in a single UPDATE.
+        """
+        return cls.all_objects.filter(pk__in=owners).update(ledger_version=F('ledger_version') + 1)
+
 
 class LogModel(BaseModel):
     field = models.CharField(max_length=255, blank=True, null=True)
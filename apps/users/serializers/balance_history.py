@@ -0,0 +1,53 @@
+import re
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+
+STEP_UNITS = {
+    'm': timedelta(minutes=1),
+    'h': timedelta(hours=1),
+    'd': timedelta(days=1),
+}
+MAX_POINTS = 1000
+
+
+class BalanceHistoryQuerySerializer(serializers.Serializer):
+    """
+    Validate the query parameters of the balance history endpoint.
+    ``step`` is a number followed by a unit: m (minutes), h (hours) or d (days).
+    """
+    to = serializers.DateTimeField(required=False)
+    step = serializers.CharField(required=False, default='1d')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # ``from`` is a Python keyword, so the field is declared here.
+        self.fields['from'] = serializers.DateTimeField(required=False)
+
+    def validate_step(self, value):
+        match = re.fullmatch(r'(\d+)([mhd])', value)
+        if not match or int(match.group(1)) == 0:
+            raise serializers.ValidationError("Formato inválido. Use por ejemplo 30m, 6h o 1d.")
+        return int(match.group(1)) * STEP_UNITS[match.group(2)]
+
+    def validate(self, data):
+        to = data.get('to') or timezone.now()
+        start = data.get('from') or to - timedelta(days=30)
+        if start > to:
+            raise serializers.ValidationError({"from": "Debe ser anterior a 'to'."})
+        if (to - start) // data['step'] + 1 > MAX_POINTS:
+            raise serializers.ValidationError({"step": f"El rango no puede superar {MAX_POINTS} puntos."})
+        data['from'] = start
+        data['to'] = to
+        return data
+
+    @property
+    def points(self):
+        start, step, to = self.validated_data['from'], self.validated_data['step'], self.validated_data['to']
+        points = []
+        point = start
+        while point <= to:
+            points.append(point)
+            point += step
+        return points
@@ -1,10 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.db import models
-from apps.roi.models import ROI
+from apps.roi.accrual import get_state
+from apps.roi.cache import schedules
 from apps.transaction.models import Transaction
 from apps.transaction.serializers.transaction import TransactionListSerializer
-from utils.bo import calculate_rois, calculate_rois_by_date
+from utils.bo import calculate_rois_by_date, calculate_withdrawals, rois_total
+from utils.serializers import SparseFieldsetMixin
 from django.utils import timezone
 from datetime import datetime
 from decimal import Decimal
@@ -12,10 +14,14 @@ from decimal import Decimal
 User = get_user_model()
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     User profile serializer with specific fields requested.
+    Supports ``?fields=`` / ``?omit=`` (see ``SparseFieldsetMixin``).
     """
+    # Projection without the balance, ROI and summary computations.
+    LIGHT_FIELDS = ['id', 'email', 'name', 'walletAddress', 'isAdmin']
+
     walletAddress = serializers.CharField(read_only=True, required=False)  # Not in model
     balance = serializers.SerializerMethodField(read_only=True, required=False)  # Not in model
     isAdmin = serializers.SerializerMethodField()
@@ -28,11 +34,44 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = ['id', 'email', 'name', 'walletAddress', 'balance', 'isAdmin', 'rois', 'dailySummary']
         read_only_fields = ['id', 'email', 'name', 'isAdmin', 'rois', 'dailySummary']
 
+    def preloaded(self, key, load):
+        """
+        Return ``key`` from the context when the view already loaded it (see
+        the async profile view), else ``load()``.
+        """
+        if key in self.context:
+            return self.context[key]
+        return load()
+
+    @staticmethod
+    def todays_transactions(user, today):
+        """
+        Approved withdrawals of ``user`` made since the start of ``today``,
+        ready for ``TransactionListSerializer``.
+        """
+        start_of_day = today.replace(hour=0, minute=0, second=0, microsecond=0)
+        return TransactionListSerializer.setup_eager_loading(Transaction.objects.filter(
+            created_at__gte=start_of_day
+        ).filter(
+            is_approved=True
+        ).filter(
+            is_deposit=False
+        ).filter(
+            # Transactions where the user is either the origin or destination
+            models.Q(origin__owner=user) | models.Q(destination__owner=user)
+        ).order_by('-created_at'))
+
+    def user_schedule(self, obj):
+        return self.preloaded('schedule', lambda: schedules.get(obj.pk))
+
     def get_balance(self, obj):
         """
-        Return the user's balance.
+        Return the user's balance (``calculate_rois``, floored at 0).
         """
-        balance_total = calculate_rois(obj)
+        at = self.preloaded('at', timezone.now)
+        state = self.preloaded('state', lambda: get_state(obj.pk, at))
+        withdrawals = self.preloaded('withdrawals', lambda: calculate_withdrawals(obj))
+        balance_total = rois_total(state, at, withdrawals)
         if balance_total < 0:
             return 0.00
         return balance_total
@@ -45,18 +84,16 @@ class UserProfileSerializer(serializers.ModelSerializer):
     
     def get_rois(self, obj):
         """
-        Return the total ROI for the user.
+        Return every ROI of the user, matured ones included.
         """
-        rois = ROI.objects.filter(owner=obj)
-        data = []
-        for roi in rois:
-            if roi.time_remaining.total_seconds() >= 0:
-                data.append({
-                    'started_at': roi.created_at,
-                    'daily_percentage': roi.daily_percentage,
-                    'amount': roi.deposit_amount,
-                })
-        return data
+        return [
+            {
+                'started_at': record.start,
+                'daily_percentage': record.daily_percentage,
+                'amount': record.amount,
+            }
+            for record in self.user_schedule(obj).records
+        ]
     
     def get_dailySummary(self, obj):
         """
@@ -65,28 +102,25 @@ class UserProfileSerializer(serializers.ModelSerializer):
         - todaysTransactions: List of today's transactions (serialized)
         """
         today = timezone.now()
-        start_of_day = today.replace(hour=0, minute=0, second=0, microsecond=0)
         
         # Balance until yesterday
-        balance_until_yesterday = calculate_rois_by_date(obj, today)
+        balance_until_yesterday = self.preloaded(
+            'balance_until_yesterday', lambda: calculate_rois_by_date(obj, today)
+        )
         
         # Today's approved transactions
-        todays_transactions = Transaction.objects.filter(
-            created_at__gte=start_of_day
-        ).filter(
-            is_approved=True
-        ).filter(
-            is_deposit=False
-        ).filter(
-            # Transactions where the user is either the origin or destination
-            models.Q(origin__owner=obj) | models.Q(destination__owner=obj)
-        ).order_by('-created_at')
+        todays_transactions = self.preloaded(
+            'todays_transactions', lambda: self.todays_transactions(obj, today)
+        )
         
         # Serialize the transactions
+        context = {'request': self.context.get('request')}
+        if 'user_wallet_ids' in self.context:
+            context['user_wallet_ids'] = self.context['user_wallet_ids']
         transaction_serializer = TransactionListSerializer(
-            todays_transactions, 
+            todays_transactions,
             many=True,
-            context={'request': self.context.get('request')}
+            context=context
         )
         
         return {
@@ -21,7 +21,9 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
         data = super().validate(attrs)
         data['is_admin'] = self.user.is_staff
-        data['user'] = UserProfileSerializer(self.user).data
+        data['user'] = UserProfileSerializer(
+            self.user, context=self.context, fields=UserProfileSerializer.LIGHT_FIELDS
+        ).data
         return data
 
 
@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction as db_transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.roi.models import ROI
+from apps.roi.signals import rois_created
+from apps.transaction.models import Transaction
+from apps.transaction.signals import transactions_created, transactions_reviewed
+from apps.wallet.models import Wallet
+from apps.wallet.system import cached_system_wallet_id
+
+User = get_user_model()
+
+
+def bump_wallet_owners(wallets):
+    """
+    Bump the ledger version of the owners of ``wallets`` within the current
+    transaction. The owner of the system wallet, which is on every deposit
+    and withdrawal, is bumped once committed instead, so concurrent writes
+    don't queue on their row.
+    """
+    wallets = set(wallets) - {None}
+    system_wallet = cached_system_wallet_id()
+    if system_wallet in wallets:
+        wallets.discard(system_wallet)
+        db_transaction.on_commit(
+            lambda: User.bump_ledger_versions(Wallet.all_objects.filter(pk=system_wallet).values('owner'))
+        )
+    if wallets:
+        User.bump_ledger_versions(Wallet.all_objects.filter(pk__in=wallets).values('owner'))
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+def bump_transaction_versions(sender, instance, **kwargs):
+    bump_wallet_owners([instance.origin_id, instance.destination_id])
+
+
+@receiver([transactions_reviewed, transactions_created])
+def bump_bulk_transaction_versions(sender, transactions, **kwargs):
+    bump_wallet_owners(
+        wallet for transaction in transactions for wallet in (transaction.origin_id, transaction.destination_id)
+    )
+
+
+@receiver([post_save, post_delete], sender=ROI)
+def bump_roi_version(sender, instance, **kwargs):
+    User.bump_ledger_versions([instance.owner_id])
+
+
+@receiver(rois_created)
+def bump_bulk_roi_versions(sender, rois, **kwargs):
+    User.bump_ledger_versions({roi.owner_id for roi in rois})
+
+
+@receiver([post_save, post_delete], sender=Wallet)
+def bump_wallet_version(sender, instance, **kwargs):
+    bump_wallet_owners([instance.pk])
@@ -1 +1,289 @@
-# Create your tests here.
+import json
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.roi.models import ROI
+from apps.transaction.models import Transaction
+from apps.users.serializers.profile import UserProfileSerializer
+from apps.users.views import AsyncProfileView, BalanceStreamView
+from apps.wallet.models import Wallet
+from utils.bo import calculate_balance_history, calculate_balance_total_by_date, start_of_day
+from utils.conditional import profile_freshness
+from utils.fixedpoint import accrual_rate, accrual_weight, to_units
+from utils.tests import BaseTestCase
+
+User = get_user_model()
+
+
+class UserProfileTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create_user(
+            username='admin',
+            email='admin@gmail.com',
+            name='Admin',
+            last_name='User',
+            password='testpass123'
+        )
+        self.system_wallet = Wallet.objects.create(owner=admin, address='SYSTEM_WALLET')
+        self.wallet = Wallet.objects.create(owner=self.user, address='USER_WALLET')
+
+    def add_todays_withdrawals(self, count):
+        for _ in range(count):
+            Transaction.objects.create(
+                origin=self.system_wallet,
+                destination=self.wallet,
+                amount=Decimal('10'),
+                is_deposit=False,
+                is_pending=False,
+                is_approved=True,
+            )
+
+    def count_queries(self, path='/api/v1/me/'):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data
+
+
+class UserProfileQueryCountTests(UserProfileTestCase):
+    def test_daily_summary_queries_do_not_grow(self):
+        # The first request stores the balance checkpoint of the day.
+        self.count_queries()
+        self.add_todays_withdrawals(2)
+        few, data = self.count_queries()
+        self.assertEqual(len(data['dailySummary']['todaysTransactions']), 2)
+        self.add_todays_withdrawals(10)
+        many, data = self.count_queries()
+        self.assertEqual(len(data['dailySummary']['todaysTransactions']), 12)
+        self.assertEqual(few, many)
+
+
+class BalanceHistoryTests(UserProfileTestCase):
+    def back_dated(self, transaction, days, hours):
+        created_at = timezone.now() - timedelta(days=days, hours=hours)
+        for row in [transaction, *transaction.roi_transactions.all()]:
+            row.created_at = created_at
+            row.save(update_fields=['created_at'])
+
+    def deposit(self, amount, days, hours=0):
+        deposit = Transaction.objects.create(
+            origin=self.wallet, destination=self.system_wallet, amount=Decimal(amount), is_deposit=True,
+            is_pending=False, is_approved=True,
+        )
+        ROI.objects.create(owner=self.user, deposit_amount=deposit.amount, transaction=deposit)
+        self.back_dated(deposit, days, hours)
+
+    def test_start_of_day_points_equal_the_single_date_computation(self):
+        self.deposit('5000', days=70)  # matured
+        self.deposit('1000', days=10, hours=3)
+        self.deposit('123.45678901', days=4, hours=5)
+        self.deposit('777.77777777', days=2, hours=11)
+        withdrawal = Transaction.objects.create(
+            origin=self.system_wallet, destination=self.wallet, amount=Decimal('10'), is_deposit=False,
+            is_pending=False, is_approved=True,
+        )
+        self.back_dated(withdrawal, days=1, hours=2)
+
+        days = [start_of_day(timezone.now() - timedelta(days=days)) for days in (12, 9, 4, 1, 0)]
+        history = calculate_balance_history(self.user, days)
+        self.assertEqual([point for point, _ in history], days)
+        for day, balance in history:
+            self.assertEqual(balance, calculate_balance_total_by_date(self.user, day))
+
+    def test_points_are_not_truncated_to_the_day(self):
+        self.deposit('1000', days=3)
+        point = Transaction.objects.get().created_at + timedelta(seconds=1)
+        (_, balance), = calculate_balance_history(self.user, [point])
+        self.assertEqual(calculate_balance_total_by_date(self.user, point), 0)
+        self.assertGreater(balance, Decimal('1000'))
+
+
+class SparseFieldsetTests(UserProfileTestCase):
+    def setUp(self):
+        super().setUp()
+        ROI.objects.create(owner=self.user, deposit_amount=Decimal('1000'))
+        self.add_todays_withdrawals(2)
+
+    def test_unselected_fields_are_not_computed(self):
+        full, _ = self.count_queries()
+        with mock.patch('apps.users.serializers.profile.calculate_rois_by_date') as rois_by_date:
+            light, data = self.count_queries('/api/v1/me/?fields=name,balance')
+        self.assertEqual(set(data), {'name', 'balance'})
+        rois_by_date.assert_not_called()
+        self.assertLess(light, full)
+
+    def test_omitted_fields_are_dropped(self):
+        _, data = self.count_queries('/api/v1/me/?omit=rois,dailySummary')
+        self.assertEqual(set(data), {'id', 'email', 'name', 'balance', 'isAdmin'})
+
+    def test_selection_is_part_of_the_etag(self):
+        full = self.client.get('/api/v1/me/')
+        light = self.client.get('/api/v1/me/?fields=name', HTTP_IF_NONE_MATCH=full['ETag'])
+        self.assertEqual(light.status_code, 200)
+        self.assertNotEqual(light['ETag'], full['ETag'])
+
+    def test_async_profile_matches(self):
+        path = '/api/v1/me/?fields=name,balance,rois'
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now()):
+            expected = self.client.get(path)
+            response = self.call_async(AsyncProfileView.as_view(), path)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+        self.assertEqual(response['ETag'], expected['ETag'])
+
+    def test_login_and_registration_return_a_light_profile(self):
+        self.client.credentials()
+        with mock.patch('apps.users.serializers.profile.calculate_withdrawals') as withdrawals:
+            login = self.client.post('/api/token/', {'username': 'test@example.com', 'password': 'testpass123'})
+            registration = self.client.post('/api/v1/register/', {
+                'username': 'new',
+                'email': 'new@example.com',
+                'name': 'New',
+                'last_name': 'User',
+                'password': 'S3cure-pass-123',
+                'password_confirm': 'S3cure-pass-123',
+            })
+        withdrawals.assert_not_called()
+        self.assertEqual(login.status_code, 200)
+        self.assertEqual(registration.status_code, 201)
+        for user in (login.data['user'], registration.data['user']):
+            self.assertLessEqual(set(user), set(UserProfileSerializer.LIGHT_FIELDS))
+            self.assertIn('email', user)
+
+        login = self.client.post('/api/token/?fields=name,balance', {
+            'username': 'test@example.com', 'password': 'testpass123',
+        })
+        self.assertEqual(set(login.data['user']), {'name', 'balance'})
+
+
+class ProfileConditionalGetTests(UserProfileTestCase):
+    def test_unchanged_profile_is_not_modified(self):
+        response = self.client.get('/api/v1/me/')
+        etag = response['ETag']
+        self.assertIn('private', response['Cache-Control'])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        # The authenticated user and their accrual state.
+        self.assertEqual(len(queries), 2)
+
+    def test_ledger_writes_change_the_etag(self):
+        etag = self.client.get('/api/v1/me/')['ETag']
+        self.add_todays_withdrawals(1)
+        response = self.client.get('/api/v1/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        ROI.objects.create(owner=self.user, deposit_amount=Decimal('1000'))
+        self.assertEqual(self.client.get('/api/v1/me/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class AsyncProfileViewTests(UserProfileTestCase):
+    def test_profile_matches(self):
+        ROI.objects.create(owner=self.user, deposit_amount=Decimal('1000'))
+        self.add_todays_withdrawals(2)
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now()):
+            expected = self.client.get('/api/v1/me/')
+            response = self.call_async(AsyncProfileView.as_view(), '/api/v1/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+        self.assertEqual(response['ETag'], expected['ETag'])
+        self.assertEqual(response['Cache-Control'], expected['Cache-Control'])
+
+    def test_unchanged_profile_is_not_modified(self):
+        etag = self.call_async(AsyncProfileView.as_view(), '/api/v1/me/')['ETag']
+        response = self.call_async(AsyncProfileView.as_view(), '/api/v1/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(SSE_POLL_INTERVAL=0.01, SSE_KEEPALIVE=60)
+class BalanceStreamTests(UserProfileTestCase):
+    def read_events(self, count, write=None):
+        """
+        Open the stream and return its first ``count`` chunks, calling
+        ``write`` after the first one.
+        """
+        response = self.call_async(BalanceStreamView.as_view(), '/api/v1/me/stream/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        async def read():
+            chunks = []
+            stream = response.streaming_content
+            async for chunk in stream:
+                chunks.append(chunk.decode())
+                if len(chunks) == count:
+                    break
+                if write is not None and len(chunks) == 1:
+                    await sync_to_async(write)()
+            await stream.aclose()
+            return chunks
+
+        return async_to_sync(read)()
+
+    def frame(self, chunk):
+        event, data = chunk.strip().split('\n')
+        self.assertEqual(event, 'event: balance')
+        return json.loads(data.removeprefix('data: '))
+
+    def test_stream_pushes_changed_parameters(self):
+        roi = ROI.objects.create(owner=self.user, deposit_amount=Decimal('1000'))
+        weight = accrual_weight(to_units(roi.deposit_amount), to_units(roi.daily_percentage))
+        first, second = self.read_events(
+            2, write=lambda: ROI.objects.create(owner=self.user, deposit_amount=Decimal('1000'))
+        )
+
+        first, second = self.frame(first), self.frame(second)
+        self.assertAlmostEqual(first['ratePerSecond'], float(accrual_rate(weight)))
+        self.assertAlmostEqual(second['ratePerSecond'], float(accrual_rate(2 * weight)))
+        self.assertIsNotNone(second['nextExpiry'])
+        self.assertGreater(second['balance'], first['balance'])
+
+    @override_settings(SSE_KEEPALIVE=0.05)
+    def test_unchanged_ledger_only_keeps_alive(self):
+        ROI.objects.create(owner=self.user, deposit_amount=Decimal('1000'))
+        first, second = self.read_events(2)
+        self.frame(first)
+        self.assertEqual(second, ': keepalive\n\n')
+
+    def test_requires_authentication(self):
+        response = self.call_async(BalanceStreamView.as_view(), '/api/v1/me/stream/', token='')
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(PROFILE_MAX_AGE=60, PROFILE_BALANCE_RESOLUTION='0.01', TIME_ZONE='UTC')
+class ProfileFreshnessTests(SimpleTestCase):
+    at = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+
+    def state(self, deposit='0', daily_percentage='0', next_expiry=None):
+        weight = accrual_weight(to_units(deposit), to_units(daily_percentage))
+        return SimpleNamespace(weight=weight, next_expiry=next_expiry)
+
+    def test_idle_ledger_uses_max_age(self):
+        window, max_age = profile_freshness(self.state(), self.at)
+        self.assertEqual(max_age, 60)
+        self.assertEqual(profile_freshness(self.state(), self.at + timedelta(seconds=59))[0], window)
+        self.assertNotEqual(profile_freshness(self.state(), self.at + timedelta(seconds=60))[0], window)
+
+    def test_accrual_rate_shortens_max_age(self):
+        # 8640 a day at 1% accrues 0.01 every 10 seconds.
+        _, max_age = profile_freshness(self.state('8640', '1'), self.at)
+        self.assertEqual(max_age, 10)
+
+    def test_next_expiry_bounds_max_age(self):
+        state = self.state(next_expiry=self.at + timedelta(seconds=5))
+        self.assertEqual(profile_freshness(state, self.at)[1], 5)
+
+    def test_end_of_day_bounds_max_age(self):
+        at = self.at.replace(hour=23, minute=59, second=30)
+        self.assertEqual(profile_freshness(self.state(), at)[1], 30)
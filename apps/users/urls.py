@@ -1,10 +1,23 @@
+from django.conf import settings
 from django.urls import path
+from apps.users.views.async_profile import AsyncProfileView
+from apps.users.views.balance_stream import BalanceStreamView
 from apps.users.views.profile import UserProfileViewSet
 from apps.users.views.registration import RegistrationView
 from apps.users.views.logout import LogoutView
 
+if settings.ASYNC_READ_VIEWS:
+    me_view = AsyncProfileView.as_view()
+else:
+    me_view = UserProfileViewSet.as_view({'get': 'me'})
+
 urlpatterns = [
-    path('me/', UserProfileViewSet.as_view({'get': 'me'}), name='user-me'),
+    path('me/', me_view, name='user-me'),
+    path('me/balance-history/', UserProfileViewSet.as_view({'get': 'balance_history'}), name='user-balance-history'),
     path('register/', RegistrationView.as_view(), name='user-register'),
     path('logout/', LogoutView.as_view(), name='user-logout'),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # Streams stay open for as long as the client listens: ASGI only.
+    urlpatterns.append(path('me/stream/', BalanceStreamView.as_view(), name='user-me-stream'))
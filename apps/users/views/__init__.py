@@ -1,3 +1,5 @@
 from apps.users.views.profile import UserProfileViewSet
 from apps.users.views.registration import RegistrationView
-from apps.users.views.logout import LogoutView
\ No newline at end of file
+from apps.users.views.logout import LogoutView
+from apps.users.views.async_profile import AsyncProfileView
+from apps.users.views.balance_stream import BalanceStreamView
@@ -0,0 +1,47 @@
+from django.utils import timezone
+
+from apps.roi.accrual import aget_state
+from apps.roi.cache import schedules
+from apps.users.serializers.profile import UserProfileSerializer
+from utils.async_views import AsyncAPIView
+from utils.bo import acalculate_rois_by_date, acalculate_withdrawals
+from utils.conditional import ledger_etag, not_modified, profile_freshness, set_validators
+
+
+class AsyncProfileView(AsyncAPIView):
+    """
+    Async version of ``UserProfileViewSet.me``: same body, ETag and max-age.
+    """
+
+    async def get(self, request):
+        """
+        Load everything ``UserProfileSerializer`` reads with the async ORM and
+        hand it over in the context, so serializing runs no query.
+        """
+        user = request.user
+        serializer = UserProfileSerializer(user, context={'request': request})
+        fields = serializer.fields
+        now = timezone.now()
+        state = await aget_state(user.pk, now)
+        window, max_age = profile_freshness(state, now)
+        etag = ledger_etag(
+            user, 'me', self.renderer.media_type, ','.join(fields), window, state.weight, state.settled_units,
+            timezone.localdate(now),
+        )
+        response = not_modified(request, etag)
+        if response is None:
+            # Only what the selected fields read.
+            context = serializer.context
+            context.update(at=now, state=state)
+            if 'rois' in fields:
+                context['schedule'] = await schedules.aget(user.pk)
+            if 'balance' in fields:
+                context['withdrawals'] = await acalculate_withdrawals(user)
+            if 'dailySummary' in fields:
+                context['balance_until_yesterday'] = await acalculate_rois_by_date(user, now)
+                context['todays_transactions'] = [
+                    transaction async for transaction in UserProfileSerializer.todays_transactions(user, now)
+                ]
+                context['user_wallet_ids'] = {pk async for pk in user.wallets.values_list('pk', flat=True)}
+            response = self.render(serializer.data)
+        return set_validators(response, etag, max_age)
@@ -0,0 +1,87 @@
+import asyncio
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+
+from apps.roi.accrual import aget_state
+from apps.users.watcher import ledger_watcher
+from utils.async_views import AsyncAPIView, database_slots, release_connection
+from utils.bo import acalculate_withdrawals, rois_total
+from utils.fixedpoint import accrual_rate
+
+
+class BalanceStreamView(AsyncAPIView):
+    """
+    Server-sent events with the parameters of the user's balance, so clients
+    can animate it locally instead of polling ``/me/``.
+
+    Each ``balance`` event holds the balance at ``at`` (before the floor at 0
+    ``/me/`` applies), the amount it grows by per second and the next ROI
+    expiry, where the rate changes. Clients show
+    ``max(0, balance + ratePerSecond * (now - at))``. A new event is only sent
+    when a transaction or ROI changes these, or at the next expiry. The
+    stream ends when the access token expires; reconnect with a fresh one.
+    """
+    http_method_names = ['get', 'options']
+
+    async def get(self, request):
+        expires_at = datetime.fromtimestamp(request.auth['exp'], tz=dt_timezone.utc)
+        response = StreamingHttpResponse(self.events(request.user, expires_at), content_type='text/event-stream')
+        patch_cache_control(response, private=True, no_cache=True)
+        # Tell nginx not to buffer the events.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def events(self, user, expires_at):
+        watcher = ledger_watcher()
+        subscription = watcher.watch(user.pk, user.ledger_version)
+        sent = None
+        try:
+            while not subscription.gone:
+                # Cleared before reading, so a write made meanwhile wakes us again.
+                subscription.changed.clear()
+                now = timezone.now()
+                if now >= expires_at:
+                    return
+                parameters, frame = await self.balance(user, now)
+                if parameters != sent:
+                    yield self.event('balance', frame)
+                    sent = parameters
+
+                wake_at = expires_at
+                if frame['nextExpiry'] is not None:
+                    wake_at = min(wake_at, frame['nextExpiry'])
+                while not subscription.changed.is_set() and timezone.now() < wake_at:
+                    timeout = min(settings.SSE_KEEPALIVE, (wake_at - timezone.now()).total_seconds())
+                    try:
+                        await asyncio.wait_for(subscription.changed.wait(), timeout)
+                    except TimeoutError:
+                        yield ': keepalive\n\n'
+        finally:
+            watcher.unwatch(subscription)
+
+    async def balance(self, user, at):
+        """
+        Return ``(parameters, frame)``: what the balance depends on, and the
+        event data describing it at ``at``.
+        """
+        async with database_slots():
+            try:
+                state = await aget_state(user.pk, at)
+                withdrawals = await acalculate_withdrawals(user)
+            finally:
+                await sync_to_async(release_connection)()
+        parameters = (state.weight, state.weighted_start, state.next_expiry, withdrawals)
+        return parameters, {
+            'at': at,
+            'balance': rois_total(state, at, withdrawals),
+            'ratePerSecond': accrual_rate(state.weight),
+            'nextExpiry': state.next_expiry,
+        }
+
+    def event(self, name, data):
+        return f'event: {name}\ndata: {self.renderer.render(data).decode()}\n\n'
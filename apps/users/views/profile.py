@@ -2,8 +2,14 @@ from rest_framework import viewsets, mixins
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.utils import timezone
 
+from apps.roi.accrual import get_state
+
+from apps.users.serializers.balance_history import BalanceHistoryQuerySerializer
 from apps.users.serializers.profile import UserProfileSerializer
+from utils.bo import calculate_balance_history
+from utils.conditional import ledger_etag, not_modified, profile_freshness, set_validators
 
 
 class UserProfileViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
@@ -23,6 +29,36 @@ class UserProfileViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     def me(self, request):
         """
         Endpoint for retrieving the current authenticated user's profile.
+        Only computes the fields selected with ``?fields=`` / ``?omit=``.
+        Answers 304 while the ledger, the accrual window and the day are unchanged.
+        """
+        user = self.get_object()
+        serializer = self.get_serializer(user)
+        now = timezone.now()
+        state = get_state(user.pk, now)
+        window, max_age = profile_freshness(state, now)
+        etag = ledger_etag(
+            user, 'me', request.accepted_media_type, ','.join(serializer.fields), window, state.weight,
+            state.settled_units, timezone.localdate(now),
+        )
+        response = not_modified(request, etag)
+        if response is None:
+            # The balance is computed from the state the ETag was built from.
+            serializer.context.update(at=now, state=state)
+            response = Response(serializer.data)
+        return set_validators(response, etag, max_age)
+
+    @action(detail=False, methods=['get'], url_path='balance-history')
+    def balance_history(self, request):
+        """
+        Endpoint returning the total balance of the current user over time.
+        Query parameters: from, to (ISO 8601) and step (e.g. 1h, 1d).
         """
-        serializer = self.get_serializer(self.get_object())
-        return Response(serializer.data)
\ No newline at end of file
+        query = BalanceHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        history = calculate_balance_history(self.get_object(), query.points)
+        return Response({
+            'from': query.validated_data['from'],
+            'to': query.validated_data['to'],
+            'points': [{'date': point, 'balance': balance} for point, balance in history],
+        })
@@ -42,7 +42,9 @@ class RegistrationView(generics.CreateAPIView):
         #     'message': 'Usuario registrado exitosamente'
         # }
         data = {
-            'user': UserProfileSerializer(user).data,
+            'user': UserProfileSerializer(
+                user, context=self.get_serializer_context(), fields=UserProfileSerializer.LIGHT_FIELDS
+            ).data,
             'tokens': tokens,
             'message': 'Usuario registrado exitosamente'
         }
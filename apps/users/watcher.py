@@ -0,0 +1,86 @@
+"""
+Change notifications for long-lived async responses (see the balance stream).
+
+Every write to a user's ledger bumps ``User.ledger_version``, from whichever
+process made it. Instead of each open stream polling its own row, one task
+per event loop reads the versions of all watched users in a single query
+every ``SSE_POLL_INTERVAL`` seconds and wakes the streams whose user changed.
+"""
+import asyncio
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from utils.async_views import database_slots, release_connection
+
+User = get_user_model()
+
+_watchers = weakref.WeakKeyDictionary()
+
+
+class Subscription:
+    """
+    Interest of one stream in the ledger of ``user_id``. ``changed`` is set
+    when the version moves past ``version``; ``gone`` when the user no
+    longer exists.
+    """
+
+    def __init__(self, user_id, version):
+        self.user_id = user_id
+        self.version = version
+        self.changed = asyncio.Event()
+        self.gone = False
+
+
+class LedgerWatcher:
+    def __init__(self):
+        self.subscriptions = set()
+        self.task = None
+
+    def watch(self, user_id, version):
+        subscription = Subscription(user_id, version)
+        self.subscriptions.add(subscription)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.poll())
+        return subscription
+
+    def unwatch(self, subscription):
+        self.subscriptions.discard(subscription)
+
+    async def poll(self):
+        """
+        Check the watched versions until nothing is watched anymore.
+        """
+        while self.subscriptions:
+            await asyncio.sleep(settings.SSE_POLL_INTERVAL)
+            self.notify(await self.versions({subscription.user_id for subscription in self.subscriptions}))
+
+    async def versions(self, user_ids):
+        async with database_slots():
+            try:
+                rows = User.objects.filter(pk__in=user_ids).values_list('pk', 'ledger_version')
+                return {pk: version async for pk, version in rows}
+            finally:
+                await sync_to_async(release_connection)()
+
+    def notify(self, versions):
+        for subscription in list(self.subscriptions):
+            version = versions.get(subscription.user_id)
+            if version is None:
+                subscription.gone = True
+                subscription.changed.set()
+            elif version != subscription.version:
+                subscription.version = version
+                subscription.changed.set()
+
+
+def ledger_watcher():
+    """
+    Watcher of the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _watchers:
+        _watchers[loop] = LedgerWatcher()
+    return _watchers[loop]
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class WalletConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.wallet'
+
+    def ready(self):
+        from apps.wallet import signals  # noqa: F401
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from apps.jobs.registry import task
+from utils.bo import get_checkpoint, start_of_day
+
+User = get_user_model()
+
+
+@task(every=timedelta(hours=1))
+def build_todays_checkpoints():
+    """
+    Build today's balance checkpoint of every user holding a wallet, so the
+    first profile read of the day doesn't have to.
+    """
+    today = start_of_day(timezone.now())
+    users = User.objects.filter(wallets__isnull=False).exclude(balance_checkpoints__as_of=today).distinct()
+    for user in users.order_by('pk').iterator():
+        get_checkpoint(user, today)
@@ -0,0 +1,186 @@
+import uuid
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import OuterRef, Q, Subquery, Sum
+
+from apps.transaction.models import Transaction
+from apps.wallet.models import Posting, Wallet
+
+# Sign of the (balance, held) change on the client side of a transaction.
+# The counterparty wallet receives the opposite change (see ``counterparty_totals``).
+EFFECTS = {
+    Posting.DEPOSIT: (1, 0),
+    Posting.WITHDRAWAL: (0, 1),
+    Posting.APPROVAL: (-1, -1),
+    Posting.REJECTION: (0, -1),
+}
+ZERO = Decimal('0')
+
+
+def entry_id(transaction, kind):
+    """
+    Deterministic entry id, so an entry keeps its id after a rebuild.
+    """
+    return uuid.uuid5(transaction.id, kind)
+
+
+def client_wallets(transaction):
+    """
+    Return the ``(client, counterparty)`` wallet ids of a transaction.
+    Deposits leave from the client wallet, withdrawals arrive to it.
+    """
+    if transaction.is_deposit:
+        return transaction.origin_id, transaction.destination_id
+    return transaction.destination_id, transaction.origin_id
+
+
+def transaction_events(transaction):
+    """
+    Return the ledger events a transaction has produced so far, as
+    ``(kind, occurred_at)`` pairs in order.
+    """
+    if transaction.is_deposit:
+        return [(Posting.DEPOSIT, transaction.created_at)]
+    events = [(Posting.WITHDRAWAL, transaction.created_at)]
+    if not transaction.is_pending:
+        kind = Posting.APPROVAL if transaction.is_approved else Posting.REJECTION
+        events.append((kind, transaction.reviewed_at or transaction.created_at))
+    return events
+
+
+def leg(transaction, kind):
+    """
+    Return the ``(wallet, counterparty, amount, hold)`` posting of an entry on
+    the client wallet, or ``None`` without one. The counterparty (the shared
+    system wallet) is not posted to, so it is never locked nor sequenced.
+    """
+    client, counterparty = client_wallets(transaction)
+    if not client:
+        return None
+    amount_sign, hold_sign = EFFECTS[kind]
+    return client, counterparty, transaction.amount * amount_sign, transaction.amount * hold_sign
+
+
+def latest_posting(wallet_id):
+    return Posting.objects.filter(wallet_id=wallet_id).order_by('-sequence').first()
+
+
+def latest_postings(wallet_ids):
+    """
+    Return the latest posting of each wallet in ``wallet_ids``, in one query.
+    """
+    # One probe of the (wallet, sequence) index per wallet, however many
+    # postings the wallets already hold.
+    latest = Posting.objects.filter(wallet_id=OuterRef('pk')).order_by('-sequence').values('pk')[:1]
+    ids = Wallet.all_objects.filter(pk__in=wallet_ids).values(latest=Subquery(latest))
+    postings = Posting.objects.filter(pk__in=ids)
+    return {posting.wallet_id: posting for posting in postings}
+
+
+def record(transaction, kind):
+    """
+    Append the postings of a transaction event to the wallets involved.
+    """
+    return record_many([transaction], kind)
+
+
+@db_transaction.atomic
+def record_many(transactions, kind):
+    """
+    Append the postings of the same event of several transactions at once.
+    Client wallet rows are locked in primary key order to serialize sequence
+    numbers. Reviews only move balances for withdrawals; deposits are settled
+    on creation.
+    """
+    entries = [
+        (transaction, posting)
+        for transaction in transactions
+        if not transaction.is_deposit or kind == Posting.DEPOSIT
+        for posting in [leg(transaction, kind)]
+        if posting
+    ]
+    if not entries:
+        return []
+    wallet_ids = sorted({wallet_id for _, (wallet_id, *_) in entries})
+    list(Wallet.all_objects.select_for_update().filter(pk__in=wallet_ids).order_by('pk').values_list('pk'))
+
+    postings = []
+    latest = latest_postings(wallet_ids)
+    for transaction, (wallet_id, counterparty_id, amount, hold) in entries:
+        last = latest.get(wallet_id)
+        posting = Posting(
+            wallet_id=wallet_id,
+            counterparty_id=counterparty_id,
+            transaction=transaction,
+            entry=entry_id(transaction, kind),
+            sequence=last.sequence + 1 if last else 1,
+            kind=kind,
+            amount=amount,
+            hold=hold,
+            balance=(last.balance if last else ZERO) + amount,
+            held=(last.held if last else ZERO) + hold,
+        )
+        postings.append(posting)
+        latest[wallet_id] = posting
+    return Posting.objects.bulk_create(postings, batch_size=1000)
+
+
+def ledger_balance(wallet):
+    """
+    Settled balance (deposits minus approved withdrawals) of ``wallet``,
+    read from its latest posting. ``wallet`` may be an id or a subquery.
+    """
+    balance = Posting.objects.filter(wallet=wallet).order_by('-sequence').values_list('balance', flat=True).first()
+    return ZERO if balance is None else balance
+
+
+def counterparty_totals(wallet):
+    """
+    ``(balance, held)`` of the counterparty side of the postings naming
+    ``wallet`` as counterparty: the system wallet's view of the ledger,
+    summed on demand since it is not posted to.
+    """
+    totals = Posting.objects.filter(counterparty=wallet).aggregate(balance=Sum('amount'), held=Sum('hold'))
+    return -(totals['balance'] or ZERO), -(totals['held'] or ZERO)
+
+
+@db_transaction.atomic
+def rebuild(wallet_id):
+    """
+    Replace the postings of a wallet by a replay of the live transactions it
+    is the client of. The wallet row stays locked meanwhile, so concurrent
+    writes simply wait; the system wallet has none to replay.
+    """
+    Wallet.all_objects.select_for_update().filter(pk=wallet_id).values_list('pk').first()
+    Posting.all_objects.filter(wallet_id=wallet_id).delete()
+
+    events = []
+    transactions = Transaction.objects.filter(
+        Q(origin_id=wallet_id, is_deposit=True) | Q(destination_id=wallet_id, is_deposit=False)
+    )
+    for transaction in transactions.order_by('created_at').iterator(chunk_size=2000):
+        for kind, occurred_at in transaction_events(transaction):
+            events.append((occurred_at, transaction.created_at, kind, transaction))
+    events.sort(key=lambda event: event[:2])
+
+    postings = []
+    balance = held = ZERO
+    for _, _, kind, transaction in events:
+        _, counterparty_id, amount, hold = leg(transaction, kind)
+        balance += amount
+        held += hold
+        postings.append(Posting(
+            wallet_id=wallet_id,
+            counterparty_id=counterparty_id,
+            transaction=transaction,
+            entry=entry_id(transaction, kind),
+            sequence=len(postings) + 1,
+            kind=kind,
+            amount=amount,
+            hold=hold,
+            balance=balance,
+            held=held,
+        ))
+    Posting.objects.bulk_create(postings, batch_size=1000)
+    return len(postings)
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+
+from apps.wallet.models import BalanceCheckpoint
+from utils.bo import get_checkpoint, start_of_day
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Backfills and extends the daily balance checkpoints of every user up to today'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Only build the checkpoints of this user')
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Only backfill this many days back instead of the whole history'
+        )
+
+    def handle(self, *args, **options):
+        today = start_of_day(timezone.now())
+        users = User.objects.all().order_by('pk')
+        if options['email']:
+            users = users.filter(email=options['email'])
+
+        created = 0
+        for user in users.iterator():
+            last = BalanceCheckpoint.objects.filter(owner=user).order_by('-as_of').first()
+            if last is not None:
+                day = last.as_of + timedelta(days=1)
+            else:
+                first_activity = self.first_activity(user)
+                if first_activity is None:
+                    continue
+                day = start_of_day(first_activity) + timedelta(days=1)
+            if options['days'] is not None:
+                day = max(day, today - timedelta(days=options['days']))
+
+            # Each checkpoint is derived from the previous one, so every day only
+            # scans the rows created during it plus the ROIs active at midnight.
+            while day <= today:
+                get_checkpoint(user, day)
+                created += 1
+                day += timedelta(days=1)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully built {created} balance checkpoints')
+        )
+
+    def first_activity(self, user):
+        """
+        Return the creation date of the oldest transaction or ROI of ``user``.
+        """
+        dates = [
+            user.roi_owners.aggregate(first=Min('created_at'))['first'],
+            user.wallets.aggregate(first=Min('outgoing_transactions__created_at'))['first'],
+            user.wallets.aggregate(first=Min('incoming_transactions__created_at'))['first'],
+        ]
+        dates = [date for date in dates if date is not None]
+        return min(dates) if dates else None
@@ -2,12 +2,11 @@ import uuid
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from apps.wallet.models import Wallet
+from apps.wallet.system import SYSTEM_WALLET_UUID
 from django.db import transaction
 
 User = get_user_model()
 
-SYSTEM_WALLET_UUID = "11111111-1111-1111-1111-111111111111"
-
 
 class Command(BaseCommand):
     help = 'Creates a system wallet with a predetermined UUID for handling deposits and withdrawals'
@@ -0,0 +1,93 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.wallet.models import Wallet
+from utils.bo import annotate_ledger, calculate_rois_by_owner
+
+User = get_user_model()
+
+FIELDS = ['id', 'email', 'wallet', 'deposits', 'withdrawals', 'accrued', 'balance', 'rois', 'total']
+
+
+class Command(BaseCommand):
+    help = 'Streams the balance of every user as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--output', help='File to write to (defaults to stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--at',
+            help='ISO 8601 instant to compute the balances at (defaults to now)'
+        )
+        parser.add_argument('--progress-every', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        at = timezone.now()
+        if options['at']:
+            at = parse_datetime(options['at'])
+            if at is None:
+                raise CommandError('--at must be an ISO 8601 datetime.')
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        # Deposits and withdrawals are summed by the database in one statement
+        # read through a server-side cursor; ROI balances come from
+        # ``calculate_rois_by_owner``, one query per chunk of users, so memory
+        # stays bounded by the chunk size whatever the number of users.
+        wallet = Wallet.objects.filter(owner=OuterRef('pk')).order_by('pk').values('address')[:1]
+        users = annotate_ledger(User.objects.order_by('pk'), at).annotate(
+            wallet=Subquery(wallet),
+        ).values('id', 'email', 'wallet', 'deposits', 'withdrawals')
+        rows = users.iterator(chunk_size=options['chunk_size'])
+
+        output = open(options['output'], 'w', newline='') if options['output'] else self.stdout
+        try:
+            write = self.writer(output, options['format'])
+            started = time.monotonic()
+            count = 0
+            while chunk := list(islice(rows, options['chunk_size'])):
+                withdrawals = {row['id']: row['withdrawals'] for row in chunk}
+                rois = calculate_rois_by_owner(list(withdrawals), at, withdrawals)
+                for row in chunk:
+                    row['balance'] = row['deposits'] - row['withdrawals']
+                    row['rois'] = rois[row['id']]
+                    row['accrued'] = row['rois'] + row['withdrawals']
+                    row['total'] = row['balance'] + row['rois']
+                    write(row)
+                    count += 1
+                    if count % options['progress_every'] == 0:
+                        self.report(count, started)
+        finally:
+            if output is not self.stdout:
+                output.close()
+
+        if count % options['progress_every']:
+            self.report(count, started)
+        self.stderr.write(self.style.SUCCESS(f'Successfully exported {count} balances at {at.isoformat()}'))
+
+    def writer(self, output, format):
+        """
+        Return a callable writing one row to ``output`` in ``format``.
+        """
+        if format == 'csv':
+            writer = csv.DictWriter(output, fieldnames=FIELDS)
+            writer.writeheader()
+            return writer.writerow
+
+        def write(row):
+            output.write(json.dumps({key: str(row[key]) if row[key] is not None else None for key in FIELDS}) + '\n')
+        return write
+
+    def report(self, count, started):
+        elapsed = time.monotonic() - started
+        rate = count / elapsed if elapsed else 0
+        self.stderr.write(f'{count} users exported ({rate:.0f} rows/sec)')
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.wallet.ledger import rebuild
+from apps.wallet.models import Wallet
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the wallet postings by replaying the existing transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wallet', help='Only rebuild the postings of this wallet id')
+
+    def handle(self, *args, **options):
+        wallets = Wallet.objects.order_by('pk')
+        if options['wallet']:
+            wallets = wallets.filter(pk=options['wallet'])
+
+        # One short transaction per wallet: writers on other wallets never wait,
+        # and writers on the wallet being rebuilt only wait for its replay.
+        total = 0
+        for wallet_id in wallets.values_list('pk', flat=True).iterator():
+            count = rebuild(wallet_id)
+            total += count
+            self.stdout.write(f'Wallet {wallet_id}: {count} postings')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {total} postings')
+        )
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-17 20:36
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('as_of', models.DateTimeField()),
+                ('deposits', models.DecimalField(decimal_places=8, default=0, max_digits=40)),
+                ('withdrawals', models.DecimalField(decimal_places=8, default=0, max_digits=40)),
+                ('matured_roi', models.DecimalField(decimal_places=10, default=0, max_digits=40)),
+                ('accrued_roi', models.DecimalField(decimal_places=10, default=0, max_digits=40)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoints', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('owner', 'as_of'), name='unique_balance_checkpoint')],
+            },
+        ),
+    ]
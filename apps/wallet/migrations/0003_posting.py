@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-17 20:38
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction', '0003_alter_transaction_amount'),
+        ('wallet', '0002_balancecheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('entry', models.UUIDField()),
+                ('sequence', models.PositiveBigIntegerField()),
+                ('kind', models.CharField(choices=[('deposit', 'Deposit'), ('withdrawal', 'Withdrawal request'), ('approval', 'Withdrawal approval'), ('rejection', 'Withdrawal rejection')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=8, default=0, max_digits=40)),
+                ('hold', models.DecimalField(decimal_places=8, default=0, max_digits=40)),
+                ('balance', models.DecimalField(decimal_places=8, default=0, max_digits=40)),
+                ('held', models.DecimalField(decimal_places=8, default=0, max_digits=40)),
+                ('counterparty', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='counterparty_postings', to='wallet.wallet')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='postings', to='transaction.transaction')),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='wallet.wallet')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('wallet', 'sequence'), name='unique_posting_sequence')],
+            },
+        ),
+    ]
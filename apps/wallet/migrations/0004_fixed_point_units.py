@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0003_posting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallet',
+            name='balance_units',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-17 20:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0004_fixed_point_units'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wallet',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['owner', 'id'], name='wallet_owner_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 11:20
+
+from django.db import migrations
+from django.db.models import F, Q
+
+
+def drop_counterparty_postings(apps, schema_editor):
+    # The counterparty side of an entry is now derived from the client
+    # posting, so the postings written on the system wallet are removed.
+    Posting = apps.get_model('wallet', 'Posting')
+    Posting.objects.filter(
+        Q(transaction__is_deposit=True, wallet=F('transaction__destination'))
+        | Q(transaction__is_deposit=False, wallet=F('transaction__origin'))
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0005_hot_query_indexes'),
+        ('transaction', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_counterparty_postings, migrations.RunPython.noop),
+    ]
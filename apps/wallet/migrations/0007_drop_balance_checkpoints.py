@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-18 12:40
+
+from django.db import migrations
+
+
+def drop_checkpoints(apps, schema_editor):
+    # Checkpoints are derived and their accrued_roi was rounded per ROI: they
+    # are taken again, with the accrual engine, on the next read.
+    BalanceCheckpoint = apps.get_model('wallet', 'BalanceCheckpoint')
+    BalanceCheckpoint.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0006_drop_counterparty_postings'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_checkpoints, migrations.RunPython.noop),
+    ]
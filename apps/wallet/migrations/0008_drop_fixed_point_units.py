@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 23:29
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0007_drop_balance_checkpoints'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='wallet',
+            name='balance_units',
+        ),
+    ]
@@ -1,5 +1,8 @@
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from utils.models import BaseModel
 
 User = get_user_model()
@@ -31,5 +34,160 @@ class Wallet(BaseModel):
         blank=True
     )
 
+    class Meta:
+        indexes = [
+            # Primary wallet lookup (``user.wallets.first()``).
+            models.Index(
+                fields=['owner', 'id'],
+                condition=models.Q(deleted_at__isnull=True),
+                name='wallet_owner_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"Wallet {self.address} - {self.owner.email}"
+
+    @classmethod
+    def add_to_balances(cls, amounts):
+        """
+        Add ``{wallet_id: amount}`` to the wallet balances in a single UPDATE
+        computed by the database, so concurrent writers never overwrite each other.
+        """
+        amounts = {pk: Decimal(amount) for pk, amount in amounts.items() if amount}
+        if not amounts:
+            return 0
+        balance = models.Case(*(models.When(pk=pk, then=models.Value(amount)) for pk, amount in amounts.items()))
+        return cls.all_objects.filter(pk__in=amounts).update(
+            balance=models.F('balance') + balance,
+            updated_at=timezone.now(),
+        )
+
+
+class BalanceCheckpoint(BaseModel):
+    """
+    Snapshot of a user's balance components at the start of a day.
+    Backs ``calculate_balance_by_date`` and ``calculate_rois_by_date``.
+    """
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='balance_checkpoints'
+    )
+    as_of = models.DateTimeField()
+    deposits = models.DecimalField(
+        max_digits=40,
+        decimal_places=8,
+        default=0
+    )
+    withdrawals = models.DecimalField(
+        max_digits=40,
+        decimal_places=8,
+        default=0
+    )
+    matured_roi = models.DecimalField(
+        max_digits=40,
+        decimal_places=10,
+        default=0
+    )
+    accrued_roi = models.DecimalField(
+        max_digits=40,
+        decimal_places=10,
+        default=0
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'as_of'], name='unique_balance_checkpoint'),
+        ]
+
+    def __str__(self):
+        return f"Checkpoint {self.as_of:%Y-%m-%d} - {self.owner.email}"
+
+    @property
+    def balance(self):
+        """Deposits minus approved withdrawals at ``as_of``."""
+        return self.deposits - self.withdrawals
+
+    @property
+    def rois(self):
+        """ROI earnings minus approved withdrawals at ``as_of``."""
+        return self.matured_roi + self.accrued_roi - self.withdrawals
+
+
+class Posting(BaseModel):
+    """
+    Append-only ledger line of a wallet.
+
+    Every transaction event is written as one posting on the client wallet,
+    identified by ``entry``. ``balance`` and ``held`` are the running totals
+    of the wallet after this posting, so the current balance is the latest
+    posting by ``sequence``. The ``counterparty`` side (the system wallet) is
+    the same posting with the opposite sign, summed on demand rather than
+    sequenced, so writers never contend on it.
+    """
+    DEPOSIT = 'deposit'
+    WITHDRAWAL = 'withdrawal'
+    APPROVAL = 'approval'
+    REJECTION = 'rejection'
+    KIND_CHOICES = [
+        (DEPOSIT, 'Deposit'),
+        (WITHDRAWAL, 'Withdrawal request'),
+        (APPROVAL, 'Withdrawal approval'),
+        (REJECTION, 'Withdrawal rejection'),
+    ]
+
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name='postings'
+    )
+    counterparty = models.ForeignKey(
+        Wallet,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='counterparty_postings'
+    )
+    transaction = models.ForeignKey(
+        'transaction.Transaction',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='postings'
+    )
+    entry = models.UUIDField()
+    sequence = models.PositiveBigIntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    amount = models.DecimalField(
+        max_digits=40,
+        decimal_places=8,
+        default=0
+    )
+    hold = models.DecimalField(
+        max_digits=40,
+        decimal_places=8,
+        default=0
+    )
+    balance = models.DecimalField(
+        max_digits=40,
+        decimal_places=8,
+        default=0
+    )
+    held = models.DecimalField(
+        max_digits=40,
+        decimal_places=8,
+        default=0
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'sequence'], name='unique_posting_sequence'),
+        ]
+
+    def __str__(self):
+        return f"Posting #{self.sequence} {self.kind} {self.amount} - {self.wallet.address}"
+
+    @property
+    def available(self):
+        """Balance not held by pending withdrawals."""
+        return self.balance - self.held
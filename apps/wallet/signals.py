@@ -0,0 +1,53 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.roi.models import ROI
+from apps.transaction.models import Transaction
+from apps.roi.signals import rois_created
+from apps.transaction.signals import transactions_created, transactions_reviewed
+from apps.wallet.models import Wallet
+from apps.wallet.system import cached_system_wallet_id, clear_system_wallet
+from utils.bo import invalidate_checkpoints
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+def invalidate_transaction_checkpoints(sender, instance, **kwargs):
+    """
+    Drop the balance checkpoints a back-dated (or late reviewed) transaction changes.
+    """
+    wallets = [instance.origin_id, instance.destination_id]
+    owners = Wallet.all_objects.filter(pk__in=wallets).values('owner')
+    invalidate_checkpoints(owners, instance.created_at)
+
+
+@receiver([post_save, post_delete], sender=ROI)
+def invalidate_roi_checkpoints(sender, instance, **kwargs):
+    """
+    Drop the balance checkpoints a back-dated ROI changes.
+    """
+    invalidate_checkpoints([instance.owner_id], instance.created_at)
+
+
+@receiver([transactions_reviewed, transactions_created])
+def invalidate_bulk_transaction_checkpoints(sender, transactions, **kwargs):
+    """
+    Drop the balance checkpoints bulk reviews or inserts change, at once.
+    """
+    wallets = {wallet for transaction in transactions for wallet in (transaction.origin_id, transaction.destination_id)}
+    owners = Wallet.all_objects.filter(pk__in=wallets).values('owner')
+    invalidate_checkpoints(owners, min(transaction.created_at for transaction in transactions))
+
+
+@receiver(rois_created)
+def invalidate_bulk_roi_checkpoints(sender, rois, **kwargs):
+    invalidate_checkpoints({roi.owner_id for roi in rois}, min(roi.created_at for roi in rois))
+
+
+@receiver([post_save, post_delete], sender=Wallet)
+def reset_system_wallet(sender, instance, created=False, **kwargs):
+    """
+    Resolve the system wallet again when a wallet is created (it may be the
+    system one) or the cached one changes.
+    """
+    if created or instance.pk == cached_system_wallet_id():
+        clear_system_wallet()
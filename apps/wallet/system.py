@@ -0,0 +1,50 @@
+import threading
+import uuid
+
+from apps.wallet.models import Wallet
+
+# Wallet created by ``manage.py create_system_wallet``.
+SYSTEM_WALLET_UUID = uuid.UUID('11111111-1111-1111-1111-111111111111')
+# Owner of the system wallet on installations set up before that command.
+LEGACY_SYSTEM_EMAIL = 'admin@gmail.com'
+
+_lock = threading.Lock()
+_system_wallet_id = None
+
+
+def cached_system_wallet_id():
+    return _system_wallet_id
+
+
+def system_wallet_id():
+    """
+    Id of the wallet receiving deposits and paying withdrawals, resolved once
+    per process: the ``SYSTEM_WALLET_UUID`` wallet when it exists, otherwise
+    the first wallet of ``LEGACY_SYSTEM_EMAIL``.
+
+    Raises ``Wallet.DoesNotExist`` when there is no system wallet.
+    """
+    global _system_wallet_id
+    wallet_id = _system_wallet_id
+    if wallet_id is not None:
+        return wallet_id
+    wallet_id = Wallet.objects.filter(pk=SYSTEM_WALLET_UUID).values_list('pk', flat=True).first()
+    if wallet_id is None:
+        wallet_id = Wallet.objects.filter(
+            owner__email=LEGACY_SYSTEM_EMAIL,
+        ).order_by('pk').values_list('pk', flat=True).first()
+    if wallet_id is None:
+        raise Wallet.DoesNotExist('No system wallet configured.')
+    with _lock:
+        _system_wallet_id = wallet_id
+    return wallet_id
+
+
+def clear_system_wallet():
+    """
+    Forget the resolved system wallet (see ``apps.wallet.signals``).
+    """
+    global _system_wallet_id
+    with _lock:
+        _system_wallet_id = None
+
@@ -1,3 +1,301 @@
-from django.test import TestCase
+import csv
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.roi.models import ROI
+from apps.roi.signals import rois_created
+from apps.transaction.models import Transaction
+from apps.transaction.signals import transactions_created
+from apps.wallet import ledger
+from apps.wallet.models import BalanceCheckpoint, Posting, Wallet
+from utils.bo import (
+    calculate_balance, calculate_balance_total, calculate_balance_total_by_date, calculate_rois, get_checkpoint,
+    start_of_day,
+)
+from utils.fixedpoint import from_units, roi_earnings_units, to_microseconds, to_units
+
+User = get_user_model()
+
+
+class ExportBalancesTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(
+            username='admin', email='admin@gmail.com', name='Admin', last_name='User', password='testpass123'
+        )
+        self.system_wallet = Wallet.objects.create(owner=admin, address='SYSTEM_WALLET')
+        self.users = []
+        for index, deposits in enumerate([('1000', '250.5'), ('123.45678901',), ()]):
+            user = User.objects.create_user(
+                username=f'user{index}', email=f'user{index}@example.com', name='Test', last_name='User',
+                password='testpass123'
+            )
+            wallet = Wallet.objects.create(owner=user, address=f'USER_WALLET_{index}')
+            for days_ago, amount in enumerate(deposits, start=3):
+                deposit = Transaction.objects.create(
+                    origin=wallet, destination=self.system_wallet, amount=Decimal(amount), is_deposit=True,
+                    is_pending=False, is_approved=True,
+                )
+                roi = ROI.objects.create(owner=user, deposit_amount=deposit.amount, transaction=deposit)
+                roi.created_at -= timedelta(days=days_ago, seconds=4321)
+                roi.save(update_fields=['created_at'])
+            Transaction.objects.create(
+                origin=self.system_wallet, destination=wallet, amount=Decimal('7'), is_deposit=False,
+                is_pending=False, is_approved=True,
+            )
+            self.users.append(user)
+        self.at = timezone.now() + timedelta(hours=1)
+
+    def export(self, format):
+        out = StringIO()
+        call_command(
+            'export_balances', '--format', format, '--at', self.at.isoformat(), '--chunk-size', '2',
+            stdout=out, stderr=StringIO(),
+        )
+        return out.getvalue()
+
+    def assertMatchesTheApi(self, rows):
+        rows = {row['email']: row for row in rows}
+        with mock.patch('django.utils.timezone.now', return_value=self.at):
+            for user in self.users:
+                row = rows[user.email]
+                self.assertEqual(Decimal(row['rois']), calculate_rois(user))
+                self.assertEqual(Decimal(row['total']), calculate_balance_total(user))
+
+    def test_ndjson_matches_calculate_rois(self):
+        rows = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual(len(rows), 4)
+        self.assertMatchesTheApi(rows)
+
+    def test_csv_matches_calculate_rois(self):
+        rows = list(csv.DictReader(StringIO(self.export('csv'))))
+        self.assertEqual(len(rows), 4)
+        self.assertMatchesTheApi(rows)
+
+    def test_past_instant_ignores_later_transactions(self):
+        user = self.users[2]
+        wallet = user.wallets.get()
+        now = timezone.now()
+        old = Transaction.objects.create(
+            origin=wallet, destination=self.system_wallet, amount=Decimal('1000'), is_deposit=True,
+            is_pending=False, is_approved=True,
+        )
+        roi = ROI.objects.create(owner=user, deposit_amount=old.amount, transaction=old)
+        withdrawn = Transaction.objects.get(destination=wallet)
+        for row, days in ((old, 5), (roi, 5), (withdrawn, 4)):
+            row.created_at = now - timedelta(days=days)
+            row.save(update_fields=['created_at'])
+        # Later deposit and withdrawal.
+        later = Transaction.objects.create(
+            origin=wallet, destination=self.system_wallet, amount=Decimal('500'), is_deposit=True,
+            is_pending=False, is_approved=True,
+        )
+        ROI.objects.create(owner=user, deposit_amount=later.amount, transaction=later)
+        Transaction.objects.create(
+            origin=self.system_wallet, destination=wallet, amount=Decimal('30'), is_deposit=False,
+            is_pending=False, is_approved=True,
+        )
+
+        self.at = now - timedelta(days=2)
+        row, = [row for row in csv.DictReader(StringIO(self.export('csv'))) if row['email'] == user.email]
+        accrued = from_units(roi_earnings_units(
+            to_units(roi.deposit_amount), to_units(roi.daily_percentage), to_units(roi.roi_percentage),
+            roi.duration_seconds, to_microseconds(self.at) - to_microseconds(roi.created_at),
+        ))
+        self.assertEqual(
+            [Decimal(row[key]) for key in ('deposits', 'withdrawals', 'accrued', 'balance', 'rois', 'total')],
+            [1000, 7, accrued, 993, accrued - 7, 993 + accrued - 7],
+        )
+
+
+class LedgerTests(TestCase):
+    COLUMNS = ('wallet', 'counterparty', 'transaction', 'entry', 'sequence', 'kind', 'amount', 'hold', 'balance',
+               'held')
+
+    def setUp(self):
+        admin = User.objects.create_user(
+            username='admin', email='admin@gmail.com', name='Admin', last_name='User', password='testpass123'
+        )
+        self.system_wallet = Wallet.objects.create(owner=admin, address='SYSTEM_WALLET')
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', name='Test', last_name='User', password='testpass123'
+        )
+        self.wallet = Wallet.objects.create(owner=self.user, address='USER_WALLET')
+
+    def deposit(self, amount):
+        deposit = Transaction.objects.create(
+            origin=self.wallet, destination=self.system_wallet, amount=Decimal(amount), is_deposit=True,
+            is_pending=False, is_approved=True,
+        )
+        ledger.record(deposit, Posting.DEPOSIT)
+        return deposit
+
+    def withdraw(self, amount):
+        withdrawal = Transaction.objects.create(
+            origin=self.system_wallet, destination=self.wallet, amount=Decimal(amount), is_deposit=False,
+            is_pending=True, is_approved=False,
+        )
+        ledger.record(withdrawal, Posting.WITHDRAWAL)
+        return withdrawal
+
+    def review(self, withdrawal, approve):
+        withdrawal.is_pending = False
+        withdrawal.is_approved = approve
+        withdrawal.reviewed_at = timezone.now()
+        withdrawal.save(update_fields=['is_pending', 'is_approved', 'reviewed_at'])
+        ledger.record(withdrawal, Posting.APPROVAL if approve else Posting.REJECTION)
+
+    def postings(self, wallet):
+        return list(Posting.objects.filter(wallet=wallet).order_by('sequence').values_list(*self.COLUMNS))
+
+    def test_record_posts_to_the_client_wallet_only(self):
+        self.deposit('1000')
+        approved, rejected, pending = self.withdraw('100'), self.withdraw('50'), self.withdraw('25.5')
+        self.review(approved, True)
+        self.review(rejected, False)
+
+        postings = Posting.objects.filter(wallet=self.wallet).order_by('sequence')
+        self.assertEqual([posting.sequence for posting in postings], list(range(1, 7)))
+        self.assertEqual([posting.kind for posting in postings], [
+            Posting.DEPOSIT, Posting.WITHDRAWAL, Posting.WITHDRAWAL, Posting.WITHDRAWAL, Posting.APPROVAL,
+            Posting.REJECTION,
+        ])
+        last = postings.last()
+        self.assertEqual((last.balance, last.held, last.available), (Decimal('900'), pending.amount, Decimal('874.5')))
+        self.assertFalse(Posting.objects.filter(wallet=self.system_wallet).exists())
+        self.assertEqual(ledger.counterparty_totals(self.system_wallet), (-last.balance, -last.held))
+
+    def test_rebuild_replays_the_same_postings(self):
+        self.deposit('1000')
+        withdrawal = self.withdraw('100')
+        self.deposit('0.12345678')
+        self.review(withdrawal, True)
+        self.withdraw('10')
+        recorded = self.postings(self.wallet)
+
+        self.assertEqual(ledger.rebuild(self.wallet.pk), len(recorded))
+        self.assertEqual(self.postings(self.wallet), recorded)
+        self.assertEqual(ledger.rebuild(self.system_wallet.pk), 0)
+        self.assertEqual(self.postings(self.wallet), recorded)
+
+    def test_ledger_balance_matches_calculate_balance(self):
+        self.deposit('1000')
+        self.deposit('250.12345678')
+        approved, rejected = self.withdraw('100'), self.withdraw('50')
+        self.withdraw('30')
+        self.review(approved, True)
+        self.review(rejected, False)
+
+        balance = calculate_balance(self.user)
+        self.assertEqual(balance, Decimal('1150.12345678'))
+        self.assertEqual(ledger.ledger_balance(self.wallet.pk), balance)
+        with override_settings(LEDGER_BALANCE_READS=True):
+            self.assertEqual(calculate_balance(self.user), balance)
+
+
+class CheckpointInvalidationTests(TestCase):
+    TOTALS = ('deposits', 'withdrawals', 'matured_roi', 'accrued_roi')
+
+    def setUp(self):
+        admin = User.objects.create_user(
+            username='admin', email='admin@gmail.com', name='Admin', last_name='User', password='testpass123'
+        )
+        self.system_wallet = Wallet.objects.create(owner=admin, address='SYSTEM_WALLET')
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', name='Test', last_name='User', password='testpass123'
+        )
+        self.wallet = Wallet.objects.create(owner=self.user, address='USER_WALLET')
+        self.today = start_of_day(timezone.now())
+        self.deposit('1000', self.days_ago(40))
+        self.deposit('3000', self.days_ago(25))
+        self.days = [self.days_ago(days) for days in (30, 20, 10, 5)]
+        # Each checkpoint is derived from the previous one.
+        self.checkpoints = [get_checkpoint(self.user, day) for day in self.days]
+
+    def days_ago(self, days, hours=7):
+        return self.today - timedelta(days=days, hours=-hours)
+
+    def deposit(self, amount, created_at):
+        deposit = Transaction.objects.create(
+            origin=self.wallet, destination=self.system_wallet, amount=Decimal(amount), is_deposit=True,
+            is_pending=False, is_approved=True,
+        )
+        roi = ROI.objects.create(owner=self.user, deposit_amount=deposit.amount, transaction=deposit)
+        for row in (deposit, roi):
+            row.created_at = created_at
+            row.save(update_fields=['created_at'])
+        return deposit, roi
+
+    def bulk_deposit(self, amount, created_at):
+        """Rows inserted as the batch import does, without ``post_save``."""
+        deposit, = Transaction.objects.bulk_create([Transaction(
+            origin=self.wallet, destination=self.system_wallet, amount=Decimal(amount), is_deposit=True,
+            is_pending=False, is_approved=True,
+        )])
+        roi = ROI(owner=self.user, deposit_amount=deposit.amount, transaction=deposit)
+        roi.save()
+        ROI.objects.filter(pk=roi.pk).update(created_at=created_at, ends_at=created_at + (roi.ends_at - roi.created_at))
+        Transaction.objects.filter(pk=deposit.pk).update(created_at=created_at)
+        deposit.refresh_from_db()
+        roi.refresh_from_db()
+        return deposit, roi
+
+    def assertKeptUntil(self, index):
+        kept = BalanceCheckpoint.objects.filter(pk__in=[checkpoint.pk for checkpoint in self.checkpoints])
+        self.assertEqual(set(kept.values_list('pk', flat=True)), {checkpoint.pk for checkpoint in self.checkpoints[:index]})
+
+    def assertMatchesAFreshComputation(self):
+        derived = [get_checkpoint(self.user, day) for day in self.days]
+        totals = [calculate_balance_total_by_date(self.user, day) for day in self.days]
+        BalanceCheckpoint.objects.all().delete()
+        fresh = [get_checkpoint(self.user, day) for day in self.days]
+        for checkpoint, expected in zip(derived, fresh):
+            self.assertEqual(
+                [getattr(checkpoint, field) for field in self.TOTALS],
+                [getattr(expected, field) for field in self.TOTALS],
+            )
+        self.assertEqual(totals, [calculate_balance_total_by_date(self.user, day) for day in self.days])
+
+    def test_back_dated_transaction(self):
+        withdrawal = Transaction.objects.create(
+            origin=self.system_wallet, destination=self.wallet, amount=Decimal('120'), is_deposit=False,
+            is_pending=False, is_approved=True,
+        )
+        withdrawal.created_at = self.days_ago(15)
+        withdrawal.save(update_fields=['created_at'])
+        self.assertKeptUntil(2)
+        self.assertMatchesAFreshComputation()
+
+    def test_back_dated_roi(self):
+        deposit = Transaction.objects.create(
+            origin=self.wallet, destination=self.system_wallet, amount=Decimal('500'), is_deposit=True,
+            is_pending=False, is_approved=True,
+        )
+        roi = ROI.objects.create(owner=self.user, deposit_amount=deposit.amount, transaction=deposit)
+        self.assertKeptUntil(4)
+        roi.created_at = self.days_ago(12)
+        roi.save(update_fields=['created_at'])
+        self.assertKeptUntil(2)
+        self.assertMatchesAFreshComputation()
+
+    def test_bulk_transactions_created(self):
+        deposit, _ = self.bulk_deposit('700', self.days_ago(22))
+        self.assertKeptUntil(4)
+        transactions_created.send(sender=Transaction, transactions=[deposit])
+        self.assertKeptUntil(1)
+        self.assertMatchesAFreshComputation()
+
+    def test_bulk_rois_created(self):
+        # The deposit itself is dated today: only its ROI is back-dated.
+        deposit, roi = self.bulk_deposit('700', self.days_ago(8))
+        Transaction.objects.filter(pk=deposit.pk).update(created_at=timezone.now())
+        rois_created.send(sender=ROI, rois=[roi])
+        self.assertKeptUntil(3)
+        self.assertMatchesAFreshComputation()
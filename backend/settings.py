@@ -32,6 +32,44 @@ DEBUG = os.environ.get('DEBUG', default='True') == 'True'
 
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', default='*').split(',')
 
+# Read balances from the wallet postings instead of recomputing them from
+# transactions. Enable once `manage.py rebuild_ledger` has run.
+LEDGER_BALANCE_READS = os.environ.get('LEDGER_BALANCE_READS', default='False') == 'True'
+
+# Per-process cache of the users' ROI schedules (see apps/roi/cache.py).
+ROI_SCHEDULE_CACHE_SIZE = int(os.environ.get('ROI_SCHEDULE_CACHE_SIZE', default='10000'))
+ROI_SCHEDULE_CACHE_TTL = int(os.environ.get('ROI_SCHEDULE_CACHE_TTL', default='60'))
+
+# Seconds a reviewer keeps the pending withdrawals they claimed.
+REVIEW_CLAIM_LEASE = int(os.environ.get('REVIEW_CLAIM_LEASE', default='300'))
+
+# Clients may reuse a profile for as long as its balance accrues less than
+# PROFILE_BALANCE_RESOLUTION, and never longer than PROFILE_MAX_AGE seconds.
+PROFILE_BALANCE_RESOLUTION = os.environ.get('PROFILE_BALANCE_RESOLUTION', default='0.01')
+PROFILE_MAX_AGE = int(os.environ.get('PROFILE_MAX_AGE', default='60'))
+
+# Serve the profile, transaction lists and withdrawal check with their native
+# async views. Enable when running backend.asgi under an ASGI server, e.g.
+# `uvicorn backend.asgi:application --workers 4`.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', default='False') == 'True'
+# Requests of one ASGI worker using a database connection at once; the rest
+# wait on the event loop. Keep workers * ASYNC_DB_CONNECTIONS under the
+# server's max_connections.
+ASYNC_DB_CONNECTIONS = int(os.environ.get('ASYNC_DB_CONNECTIONS', default='20'))
+# The balance stream (/api/v1/me/stream/, served with ASYNC_READ_VIEWS) checks
+# the ledgers of its listeners every SSE_POLL_INTERVAL seconds, with a single
+# query per worker, and sends a comment every SSE_KEEPALIVE idle seconds.
+SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL', default='2'))
+SSE_KEEPALIVE = int(os.environ.get('SSE_KEEPALIVE', default='15'))
+
+# Background jobs, run by `manage.py run_worker` (see apps/jobs). A running job
+# is handed to another worker after JOBS_LEASE seconds; failed jobs are retried
+# after JOBS_RETRY_BACKOFF seconds, doubling on every attempt. Finished jobs
+# are kept JOBS_RETENTION_DAYS days.
+JOBS_LEASE = int(os.environ.get('JOBS_LEASE', default='300'))
+JOBS_RETRY_BACKOFF = int(os.environ.get('JOBS_RETRY_BACKOFF', default='10'))
+JOBS_RETENTION_DAYS = int(os.environ.get('JOBS_RETENTION_DAYS', default='7'))
+
 RENDER_EXTERNAL_HOSTNAME = os.getenv("RENDER_EXTERNAL_HOSTNAME")
 if RENDER_EXTERNAL_HOSTNAME:
     ALLOWED_HOSTS.append(RENDER_EXTERNAL_HOSTNAME)
@@ -52,6 +90,7 @@ MY_APPS = [
     "apps.wallet",
     "apps.transaction",
     "apps.roi",
+    "apps.jobs",
     "utils",
 ]
 
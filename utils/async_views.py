@@ -0,0 +1,142 @@
+"""
+Base of the native async read views, served when ``ASYNC_READ_VIEWS`` is on.
+
+DRF views only run synchronously, so these are plain Django async views that
+keep the API contract of their DRF counterparts: the same JWT authentication
+and error bodies, the same serializers and the same JSON rendering. Every
+query goes through the async ORM.
+"""
+import asyncio
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.http import HttpResponse
+from django.utils.translation import gettext_lazy as _
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+_database_slots = weakref.WeakKeyDictionary()
+
+
+def database_slots():
+    """
+    Semaphore of the running event loop bounding how many requests use a
+    database connection at once. Each request runs its queries in a thread
+    of its own, with a connection of its own: without a bound, a worker
+    holding many slow clients would open as many connections.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _database_slots:
+        _database_slots[loop] = asyncio.Semaphore(settings.ASYNC_DB_CONNECTIONS)
+    return _database_slots[loop]
+
+
+def release_connection():
+    """
+    Close the connection of the current request before giving its slot back,
+    unless it is inside an enclosing transaction (e.g. of a test case).
+    """
+    if not connection.in_atomic_block:
+        close_old_connections()
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` loading the user with the async ORM. Validating the
+    access token itself needs no query.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """
+        Async version of ``JWTAuthentication.get_user``.
+        """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+
+class AsyncAPIView(View):
+    """
+    Async view for authenticated JSON reads.
+
+    Requests with a method the view does not implement are handed to the
+    sync ``fallback`` view when one is given, so an async read can share its
+    URL with a DRF write endpoint.
+    """
+    http_method_names = ['get', 'head', 'options']
+    authentication = AsyncJWTAuthentication()
+    renderer = JSONRenderer()
+    fallback = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        if self.fallback is not None and request.method.lower() not in self.http_method_names:
+            return await sync_to_async(self.fallback)(request, *args, **kwargs)
+        async with database_slots():
+            try:
+                authenticated = await self.authentication.aauthenticate(request)
+                if authenticated is None:
+                    raise exceptions.NotAuthenticated()
+                request.user, request.auth = authenticated
+                return await super().dispatch(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return self.handle_exception(request, exc)
+            finally:
+                await sync_to_async(release_connection)()
+
+    def handle_exception(self, request, exc):
+        """
+        Render ``exc`` as DRF's default exception handler does.
+        """
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {'detail': exc.detail}
+        response = self.render(data, exc.status_code)
+        if response.status_code == status.HTTP_401_UNAUTHORIZED:
+            response['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+        return response
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(
+            self.renderer.render(data),
+            status=status_code,
+            content_type=self.renderer.media_type,
+        )
@@ -1,43 +1,278 @@
 from apps.transaction.models import Transaction
-from apps.roi.models import ROI
-from datetime import datetime, time, timedelta
+from apps.roi.accrual import get_state, states_at
+from apps.roi.cache import load_schedule
+from apps.roi.models import AccrualState, ROI
+from apps.wallet.ledger import ledger_balance
+from apps.wallet.models import BalanceCheckpoint, Wallet
+from asgiref.sync import sync_to_async
+from datetime import datetime, time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from decimal import Decimal
+from utils.fixedpoint import accrued_units, from_units, to_microseconds, to_units
+
+User = get_user_model()
+
+AMOUNT_FIELD = DecimalField(max_digits=40, decimal_places=8)
+EARNINGS_FIELD = DecimalField(max_digits=40, decimal_places=10)
+
+
+def primary_wallet(owner):
+    """
+    Subquery resolving the wallet returned by ``user.wallets.first()``.
+    """
+    return Wallet.objects.filter(owner=owner).order_by('pk').values('pk')[:1]
+
+
+def active_rois(at):
+    """
+    ROIs that have started and still have time remaining at ``at``.
+    """
+    return ROI.objects.filter(created_at__lte=at, ends_at__gt=at)
+
+
+def _total(queryset, group_by, expression, output_field):
+    """
+    Correlated subquery summing ``expression`` over ``queryset``, 0 if empty.
+    """
+    totals = queryset.order_by().values(group_by).annotate(total=Sum(expression)).values('total')
+    return Coalesce(Subquery(totals), Value(Decimal('0')), output_field=output_field)
+
+
+def annotate_ledger(users, at=None):
+    """
+    Annotate a user queryset with ``deposits`` and ``withdrawals`` (approved
+    only), created up to ``at`` when given. Every user is resolved in a single
+    SQL statement; ROI earnings come from the accrual engine (see ``rois_total``).
+    """
+    wallet = Subquery(primary_wallet(OuterRef(OuterRef('pk'))))
+    transactions = Transaction.objects.all() if at is None else Transaction.objects.filter(created_at__lte=at)
+    deposits = transactions.filter(origin=wallet, is_deposit=True)
+    withdrawals = transactions.filter(destination=wallet, is_deposit=False, is_approved=True)
+    return users.annotate(
+        deposits=_total(deposits, 'origin', 'amount', AMOUNT_FIELD),
+        withdrawals=_total(withdrawals, 'destination', 'amount', AMOUNT_FIELD),
+    )
+
+
+def get_ledger(user, at=None):
+    """
+    Return the ledger totals of a single user as a dict. ``accrued`` comes
+    from the accrual state, as in ``calculate_rois``.
+    """
+    if at is None:
+        at = timezone.now()
+    users = User.all_objects.filter(pk=user.pk)
+    ledger = annotate_ledger(users, at).values('deposits', 'withdrawals').get()
+    ledger['accrued'] = rois_total(get_state(user.pk, at), at)
+    return ledger
+
 
 def calculate_balance(user):
     """
     Calculate the total balance from a list of wallets.
     """
-    total_balance = 0
-    for transaction in Transaction.objects.filter(origin=user.wallets.first(), is_deposit=True):
-        total_balance += transaction.amount
-    for transaction in Transaction.objects.filter(destination=user.wallets.first(), is_deposit=False, is_approved=True):
-        total_balance -= transaction.amount
-    return total_balance
+    if settings.LEDGER_BALANCE_READS:
+        return ledger_balance(primary_wallet(user))
+    ledger = get_ledger(user)
+    return ledger['deposits'] - ledger['withdrawals']
+
+def approved_withdrawals(user):
+    """
+    Approved withdrawals into the primary wallet of ``user``.
+    """
+    return Transaction.objects.filter(
+        destination=Subquery(primary_wallet(user)),
+        is_deposit=False,
+        is_approved=True,
+    )
+
+def withdrawals_total():
+    return Coalesce(Sum('amount'), Value(Decimal('0')), output_field=AMOUNT_FIELD)
+
+def calculate_withdrawals(user):
+    """
+    Calculate the total of the approved withdrawals of a user.
+    """
+    return approved_withdrawals(user).aggregate(total=withdrawals_total())['total']
+
+async def acalculate_withdrawals(user):
+    """
+    Async version of ``calculate_withdrawals``.
+    """
+    return (await approved_withdrawals(user).aaggregate(total=withdrawals_total()))['total']
 
-def calculate_rois(user):
+def rois_total(state, at, withdrawals=Decimal('0')):
+    """
+    Earnings at ``at`` of the ROIs active in the accrual ``state`` (settled
+    at ``at``), minus ``withdrawals``. Every ROI total at the current time
+    goes through here, so the fields of a response always agree.
+    """
+    return from_units(state.accrued_units(at)) - withdrawals
+
+def calculate_rois(user, at=None):
     """
     Calculate the total ROI for a user.
     """
-    total_roi = 0
-    rois = ROI.objects.filter(owner=user)
-    for roi in rois:
-        if(roi.time_remaining.total_seconds() > 0):
-            earnings = roi.current_earnings
-            total_roi += earnings
-    
-    withdrawals = Transaction.objects.filter(destination=user.wallets.first(), is_deposit=False, is_approved=True)
-    for withdrawal in withdrawals:
-        total_roi -= withdrawal.amount
-    return total_roi
+    if at is None:
+        at = timezone.now()
+    return rois_total(get_state(user.pk, at), at, calculate_withdrawals(user))
+
+def approved_withdrawals_by_owner(owner_ids, at=None):
+    """
+    Approved withdrawals into the primary wallet of each of ``owner_ids``,
+    created up to ``at`` when given, summed in a single query.
+    """
+    withdrawals = Transaction.objects.filter(
+        destination=Subquery(primary_wallet(OuterRef('destination__owner'))),
+        destination__owner__in=owner_ids,
+        is_deposit=False,
+        is_approved=True,
+    )
+    if at is not None:
+        withdrawals = withdrawals.filter(created_at__lte=at)
+    totals = withdrawals.order_by().values('destination__owner').annotate(total=Sum('amount'))
+    return {row['destination__owner']: row['total'] for row in totals}
+
+def calculate_rois_by_owner(owner_ids, at=None, withdrawals=None):
+    """
+    Batch version of ``calculate_rois`` for every user in ``owner_ids``, in two
+    queries whatever their number (one if their approved ``withdrawals`` are
+    given, keyed by owner). Each value equals ``calculate_rois(user, at)``.
+    """
+    if at is None:
+        at = timezone.now()
+    if withdrawals is None:
+        withdrawals = approved_withdrawals_by_owner(owner_ids, at)
+    states = states_at(owner_ids, at)
+    return {
+        owner_id: rois_total(states.get(owner_id, AccrualState()), at, withdrawals.get(owner_id, Decimal('0')))
+        for owner_id in owner_ids
+    }
 
 def calculate_balance_total(user):
     """
     Calculate the total balance including ROIs for a user.
     """
-    balance = calculate_balance(user)
-    rois = calculate_rois(user)
-    return balance + rois
+    ledger = get_ledger(user)
+    return ledger['deposits'] + ledger['accrued'] - 2 * ledger['withdrawals']
+
+def start_of_day(target_date):
+    """
+    Return the aware datetime at which the day of ``target_date`` starts.
+    """
+    if isinstance(target_date, datetime):
+        cutoff = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        # If a date object is passed
+        cutoff = datetime.combine(target_date, time.min)
+    if timezone.is_naive(cutoff):
+        cutoff = timezone.make_aware(cutoff)
+    return cutoff
+
+
+def _checkpoint_query(user, cutoff, since=None):
+    """
+    Single statement with the balance components of ``user`` at ``cutoff``.
+    When ``since`` (an earlier checkpoint) is given, only the rows between both
+    instants are scanned. ``accrued_roi`` is added by the accrual engine.
+    """
+    wallet = Subquery(primary_wallet(OuterRef(OuterRef('pk'))))
+    transactions = Transaction.objects.filter(created_at__lt=cutoff)
+    matured = ROI.objects.filter(owner=OuterRef('pk'), created_at__lt=cutoff, ends_at__lte=cutoff)
+    if since is not None:
+        transactions = transactions.filter(created_at__gte=since.as_of)
+        matured = matured.filter(ends_at__gt=since.as_of)
+    deposits = transactions.filter(origin=wallet, is_deposit=True)
+    withdrawals = transactions.filter(destination=wallet, is_deposit=False, is_approved=True)
+    cap = F('deposit_amount') * F('roi_percentage') / Value(Decimal('100'))
+
+    return User.all_objects.filter(pk=user.pk).annotate(
+        deposits=_total(deposits, 'origin', 'amount', AMOUNT_FIELD),
+        withdrawals=_total(withdrawals, 'destination', 'amount', AMOUNT_FIELD),
+        matured_roi=_total(matured, 'owner', cap, EARNINGS_FIELD),
+    ).values('deposits', 'withdrawals', 'matured_roi')
+
+
+def _accrued_roi(user, cutoff):
+    """
+    Earnings at ``cutoff`` of the ROIs active then, with the arithmetic of
+    ``calculate_rois`` (the withdrawals are kept apart in the checkpoint).
+    """
+    return calculate_rois_by_owner([user.pk], cutoff, withdrawals={})[user.pk]
+
+
+def _checkpoint_totals(user, cutoff, since=None):
+    """
+    Balance components of ``user`` at ``cutoff``, added to ``since`` if given.
+    """
+    totals = _add_checkpoint(_checkpoint_query(user, cutoff, since).get(), since)
+    totals['accrued_roi'] = _accrued_roi(user, cutoff)
+    return totals
+
+
+def _add_checkpoint(totals, since):
+    if since is not None:
+        totals['deposits'] += since.deposits
+        totals['withdrawals'] += since.withdrawals
+        totals['matured_roi'] += since.matured_roi
+    return totals
+
+
+def get_checkpoint(user, target_date):
+    """
+    Return the balance checkpoint of ``user`` at the start of ``target_date``.
+
+    An existing checkpoint is returned as is. Otherwise it is derived from the
+    nearest earlier checkpoint plus the rows in between, and stored when the
+    day has already started so later calls become a single lookup.
+    """
+    cutoff = start_of_day(target_date)
+    nearest = BalanceCheckpoint.objects.filter(
+        owner=user,
+        as_of__lte=cutoff
+    ).order_by('-as_of').first()
+    if nearest is not None and nearest.as_of == cutoff:
+        return nearest
+
+    checkpoint = BalanceCheckpoint(owner=user, as_of=cutoff, **_checkpoint_totals(user, cutoff, nearest))
+    if cutoff <= timezone.now():
+        BalanceCheckpoint.objects.bulk_create([checkpoint], ignore_conflicts=True)
+    return checkpoint
+
+
+async def aget_checkpoint(user, target_date):
+    """
+    Async version of ``get_checkpoint``.
+    """
+    cutoff = start_of_day(target_date)
+    nearest = await BalanceCheckpoint.objects.filter(
+        owner=user,
+        as_of__lte=cutoff
+    ).order_by('-as_of').afirst()
+    if nearest is not None and nearest.as_of == cutoff:
+        return nearest
+
+    totals = _add_checkpoint(await _checkpoint_query(user, cutoff, nearest).aget(), nearest)
+    totals['accrued_roi'] = await sync_to_async(_accrued_roi)(user, cutoff)
+    checkpoint = BalanceCheckpoint(owner=user, as_of=cutoff, **totals)
+    if cutoff <= timezone.now():
+        await BalanceCheckpoint.objects.abulk_create([checkpoint], ignore_conflicts=True)
+    return checkpoint
+
+
+def invalidate_checkpoints(owners, since):
+    """
+    Drop the checkpoints of ``owners`` taken after ``since``.
+    Called whenever a row dated before the current day is written.
+    """
+    if since >= start_of_day(timezone.now()):
+        return
+    BalanceCheckpoint.objects.filter(owner__in=owners, as_of__gt=since).delete()
+
 
 def calculate_balance_by_date(user, target_date):
     """
@@ -51,37 +286,7 @@ def calculate_balance_by_date(user, target_date):
     Returns:
         Decimal: Total balance up to the day before the target_date
     """
-    # Convert target_date to the start of the day
-    if isinstance(target_date, datetime):
-        start_of_day = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
-    else:
-        # If a date object is passed
-        start_of_day = datetime.combine(target_date, time.min)
-    
-    total_balance = 0
-    
-    # Get deposits up to the start of the target day
-    deposits = Transaction.objects.filter(
-        origin=user.wallets.first(),
-        is_deposit=True,
-        created_at__lt=start_of_day
-    )
-    
-    for transaction in deposits:
-        total_balance += transaction.amount
-    
-    # Get withdrawals up to the start of the target day
-    withdrawals = Transaction.objects.filter(
-        destination=user.wallets.first(), 
-        is_deposit=False, 
-        is_approved=True,
-        created_at__lt=start_of_day
-    )
-    
-    for transaction in withdrawals:
-        total_balance -= transaction.amount
-        
-    return total_balance
+    return get_checkpoint(user, target_date).balance
 
 def calculate_rois_by_date(user, target_date):
     """
@@ -95,58 +300,19 @@ def calculate_rois_by_date(user, target_date):
     Returns:
         Decimal: Total ROI earnings up to the day before the target_date
     """
-    # Convert target_date to the start of the day
-    if isinstance(target_date, datetime):
-        cutoff_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
-    else:
-        # If a date object is passed
-        cutoff_date = datetime.combine(target_date, time.min)
-    
-    total_roi = Decimal('0')
-    rois = ROI.objects.filter(owner=user, created_at__lt=cutoff_date)
-    
-    for roi in rois:
-        # Skip if ROI has no time remaining at the cutoff date
-        end_date = roi.created_at + timedelta(seconds=roi.duration_seconds)
-        if end_date <= cutoff_date:
-            # For completed ROIs, add the full earnings
-            total_roi += roi.deposit_amount * roi.roi_percentage / Decimal('100')
-            continue
-            
-        # Calculate elapsed time between ROI creation and the cutoff date
-        elapsed_time = cutoff_date - roi.created_at
-        elapsed_seconds = elapsed_time.total_seconds()
-        
-        if elapsed_seconds <= 0:
-            continue
-            
-        # Calculate daily earnings
-        daily_earnings = roi.deposit_amount * roi.daily_percentage / Decimal('100')
-        
-        # Calculate earnings per second
-        seconds_in_day = 24 * 60 * 60  # 86400 seconds
-        earnings_per_second = daily_earnings / Decimal(str(seconds_in_day))
-        
-        # Calculate current earnings based on elapsed seconds
-        current_earnings = earnings_per_second * Decimal(str(elapsed_seconds))
-        
-        total_roi += round(current_earnings, 10)
-    
-    # Subtract any withdrawals made before the cutoff date
-    withdrawals = Transaction.objects.filter(
-        destination=user.wallets.first(), 
-        is_deposit=False, 
-        is_approved=True,
-        created_at__lt=cutoff_date
-    )
-    for withdrawal in withdrawals:
-        total_roi -= withdrawal.amount
+    total_roi = get_checkpoint(user, target_date).rois
     # Ensure total ROI is not negative
     if total_roi < 0:
         total_roi = Decimal('0')
     
     return total_roi
 
+async def acalculate_rois_by_date(user, target_date):
+    """
+    Async version of ``calculate_rois_by_date``.
+    """
+    return max((await aget_checkpoint(user, target_date)).rois, Decimal('0'))
+
 def calculate_balance_total_by_date(user, target_date=None):
     """
     Calculate the total balance including ROIs for a user up to the specified date.
@@ -162,7 +328,76 @@ def calculate_balance_total_by_date(user, target_date=None):
     if target_date is None:
         target_date = timezone.now()
         
-    balance = calculate_balance_by_date(user, target_date)
-    rois = calculate_rois_by_date(user, target_date)
+    checkpoint = get_checkpoint(user, target_date)
+    rois = max(checkpoint.rois, Decimal('0'))
     
-    return balance + rois
\ No newline at end of file
+    return checkpoint.balance + rois
+
+def history_transactions(user, before):
+    """
+    ``(created_at, amount, is_deposit)`` of the deposits and approved
+    withdrawals of the primary wallet of ``user`` created before ``before``.
+    """
+    wallet = Subquery(primary_wallet(user))
+    return Transaction.objects.filter(
+        Q(origin=wallet, is_deposit=True) | Q(destination=wallet, is_deposit=False, is_approved=True),
+        created_at__lt=before,
+    ).values_list('created_at', 'amount', 'is_deposit')
+
+def calculate_balance_history(user, points):
+    """
+    Calculate the total balance at every instant in ``points`` (sorted
+    ascending) in a single forward sweep. Points are exact instants, not
+    truncated to the day: a point at the start of a day equals
+    ``calculate_balance_total_by_date`` for that day, which counts the rows
+    before midnight.
+
+    Transactions and ROIs are loaded with one query each, so the cost is
+    O(events + points). Active ROIs are kept as the
+    integer aggregates Σweight and Σweight·start of the fixed-point kernel, so
+    the accrual of a point is rounded once instead of once per ROI, as in
+    ``calculate_rois``.
+
+    Returns a list of ``(point, balance)`` pairs.
+    """
+    if not points:
+        return []
+    last = points[-1]
+
+    # (time, order, kind, value): ROI ends sort first so they are applied at
+    # their own instant (matured when ``end <= cutoff``), the rest strictly before.
+    events = []
+    for created_at, amount, is_deposit in history_transactions(user, last):
+        events.append((to_microseconds(created_at), 1, 'deposit' if is_deposit else 'withdrawal', to_units(amount)))
+    for record in load_schedule(user.pk, before=last).records:
+        events.append((record.start_us, 1, 'start', record))
+        events.append((record.end_us, 0, 'end', record))
+    events.sort(key=lambda event: event[:2])
+
+    deposits = withdrawals = matured = weight = weighted_start = 0
+    history = []
+    index = 0
+    for point in points:
+        point_us = to_microseconds(point)
+        while index < len(events):
+            occurred_at, order, kind, value = events[index]
+            if occurred_at > point_us or (occurred_at == point_us and order):
+                break
+            if kind == 'deposit':
+                deposits += value
+            elif kind == 'withdrawal':
+                withdrawals += value
+            elif kind == 'start':
+                weight += value.weight
+                weighted_start += value.weight * value.start_us
+            else:
+                # Ended: the linear accrual becomes the capped total.
+                weight -= value.weight
+                weighted_start -= value.weight * value.start_us
+                matured += value.cap_units
+            index += 1
+
+        accrued = accrued_units(1, weight * point_us - weighted_start)
+        rois = max(matured + accrued - withdrawals, 0)
+        history.append((point, from_units(deposits - withdrawals + rois)))
+    return history
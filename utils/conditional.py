@@ -0,0 +1,91 @@
+"""
+Conditional GET for the per-user views.
+
+ETags are derived from ``User.ledger_version``, which the authentication
+already loads, so a request whose ``If-None-Match`` still matches is answered
+with a 304 before any queryset or serializer runs.
+"""
+import hashlib
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from utils.fixedpoint import MICROSECONDS_IN_DAY, SCALE, divide, to_microseconds, to_units
+
+
+def ledger_etag(user, *parts):
+    """
+    Strong ETag of a representation that only changes with the ledger of
+    ``user`` and ``parts``.
+    """
+    key = '|'.join(str(part) for part in (user.pk, user.ledger_version, *parts))
+    return '"%s"' % hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def not_modified(request, etag):
+    """
+    Return a 304 response when ``If-None-Match`` matches ``etag``, else None.
+    """
+    return get_conditional_response(request, etag=etag)
+
+
+def set_validators(response, etag, max_age=None):
+    """
+    Add ``etag`` and the caching headers of a per-user response. Without a
+    ``max_age`` clients must revalidate before every reuse.
+    """
+    response['ETag'] = etag
+    if max_age is None:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, private=True, max_age=max_age)
+    patch_vary_headers(response, ('Authorization', 'Accept'))
+    return response
+
+
+def profile_freshness(state, at=None):
+    """
+    Return ``(window, max_age)`` for a profile computed at ``at`` from the
+    accrual ``state`` of its owner.
+
+    Time is split in windows as long as the active ROIs take to accrue
+    ``PROFILE_BALANCE_RESOLUTION`` (at most ``PROFILE_MAX_AGE`` seconds);
+    ``window`` is the index of the current one, and ``max_age`` the seconds
+    until it, the next ROI expiry or the day ends.
+    """
+    if at is None:
+        at = timezone.now()
+    at_us = to_microseconds(at)
+    length = settings.PROFILE_MAX_AGE * 1000000
+    weight = int(state.weight)
+    if weight > 0:
+        resolution = to_units(settings.PROFILE_BALANCE_RESOLUTION)
+        length = min(length, divide(resolution * SCALE * 100 * MICROSECONDS_IN_DAY, weight))
+    length = max(length, 1)
+
+    window = at_us // length
+    ends_us = (window + 1) * length
+    if state.next_expiry is not None:
+        ends_us = min(ends_us, to_microseconds(state.next_expiry))
+    tomorrow = timezone.make_aware(datetime.combine(timezone.localdate(at) + timedelta(days=1), time.min))
+    ends_us = min(ends_us, to_microseconds(tomorrow))
+    return window, max(0, (ends_us - at_us) // 1000000)
+
+
+class LedgerConditionalListMixin:
+    """
+    Answer list requests of regular users with a 304 while their ledger and
+    the query string are unchanged. Staff lists span every user and are
+    always rendered.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_staff:
+            return super().list(request, *args, **kwargs)
+        etag = ledger_etag(request.user, request.get_full_path(), request.accepted_media_type)
+        response = not_modified(request, etag) or super().list(request, *args, **kwargs)
+        if response.status_code not in (200, 304):
+            return response
+        return set_validators(response, etag)
@@ -0,0 +1,109 @@
+"""
+Fixed-point integer representation of amounts and the ROI accrual kernel.
+
+Amounts are handled as integers of 1e-10 units: enough to hold the 8 decimal
+places stored in the amount columns and the 10 places ROI earnings are
+rounded to, so conversions are lossless and accrual needs a single integer
+division. A BigIntegerField of units holds amounts up to ``MAX_AMOUNT``
+(about 922,337,203); ``to_units`` refuses anything larger.
+
+Rounding rule: every division rounds half to even (the rounding of
+``round(Decimal, 10)``), once, on the exact integer result.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import ROUND_HALF_EVEN, Decimal
+
+SCALE = 10 ** 10
+# Largest value of the signed 64-bit columns holding units, and its amount.
+MAX_UNITS = 2 ** 63 - 1
+MAX_AMOUNT = Decimal(MAX_UNITS).scaleb(-10)
+MICROSECONDS_IN_DAY = 24 * 60 * 60 * 1000000
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_units(value):
+    """
+    Convert an amount (Decimal, int, float or str) into integer units.
+    Raises ``ValueError`` beyond ``MAX_AMOUNT``.
+    """
+    if value is None:
+        return None
+    if isinstance(value, float):
+        value = str(value)
+    units = int((Decimal(value) * SCALE).to_integral_value(rounding=ROUND_HALF_EVEN))
+    if abs(units) > MAX_UNITS:
+        raise ValueError(f'{value} is out of the fixed-point range')
+    return units
+
+
+def from_units(units):
+    """
+    Convert integer units back into a Decimal amount.
+    """
+    if units is None:
+        return None
+    return Decimal(units).scaleb(-10)
+
+
+def to_microseconds(value):
+    """
+    Convert an aware datetime into integer microseconds since the epoch.
+    """
+    return (value - EPOCH) // ONE_MICROSECOND
+
+
+def divide(numerator, denominator):
+    """
+    Integer division rounding half to even.
+    """
+    quotient, remainder = divmod(numerator, denominator)
+    double = 2 * remainder
+    if double > denominator or (double == denominator and quotient % 2):
+        quotient += 1
+    return quotient
+
+
+def accrual_weight(deposit_units, daily_percentage_units):
+    """
+    Weight of an ROI in the accrual kernel: its earnings per microsecond
+    scaled by ``SCALE * 100 * MICROSECONDS_IN_DAY``. Weights (and weighted
+    start times) of many ROIs can be added together exactly.
+    """
+    return deposit_units * daily_percentage_units
+
+
+def accrued_units(weight, elapsed_microseconds):
+    """
+    Earnings, in units, of a weight accrued over ``elapsed_microseconds``.
+    """
+    return divide(weight * elapsed_microseconds, SCALE * 100 * MICROSECONDS_IN_DAY)
+
+
+def accrual_rate(weight):
+    """
+    Amount a weight accrues per second, unrounded.
+    """
+    return Decimal(weight) * 1000000 / (SCALE * 100 * MICROSECONDS_IN_DAY) / SCALE
+
+
+def capped_units(deposit_units, roi_percentage_units):
+    """
+    Total expected earnings of an ROI, in units.
+    """
+    return divide(deposit_units * roi_percentage_units, SCALE * 100)
+
+
+def roi_earnings_units(deposit_units, daily_percentage_units, roi_percentage_units, duration_seconds,
+                       elapsed_microseconds):
+    """
+    Earnings of one ROI after ``elapsed_microseconds``: linear accrual while
+    the period runs, the capped total once it has ended.
+    """
+    if elapsed_microseconds <= 0:
+        return 0
+    if elapsed_microseconds >= duration_seconds * 1000000:
+        return capped_units(deposit_units, roi_percentage_units)
+    weight = accrual_weight(deposit_units, daily_percentage_units)
+    return accrued_units(weight, elapsed_microseconds)
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import math
+import statistics
+import time
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Open many concurrent slow clients against a running server (one worker of '
+        '`gunicorn backend.wsgi` or `uvicorn backend.asgi:application`) and report how '
+        'many of them it serves in time'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Endpoint to read, e.g. http://127.0.0.1:8000/api/v1/me/')
+        parser.add_argument('--clients', type=int, default=200, help='Concurrent clients')
+        parser.add_argument('--trickle', type=float, default=2.0,
+                            help='Seconds each client takes to send its request')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Seconds a client waits in total')
+        parser.add_argument('--token', help='Access token sent as Bearer')
+        parser.add_argument('--email', help='Obtain the access token for this user')
+        parser.add_argument('--password', help='Password of --email')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError('Only http:// URLs are supported.')
+        token = options['token']
+        if token is None and options['email']:
+            token = self.obtain_token(url, options['email'], options['password'])
+
+        started = time.monotonic()
+        results = asyncio.run(self.run_clients(url, token, options))
+        elapsed = time.monotonic() - started
+
+        served = [latency for outcome, latency in results if outcome == 200]
+        failures = {}
+        for outcome, _ in results:
+            if outcome != 200:
+                failures[outcome] = failures.get(outcome, 0) + 1
+        self.stdout.write(f'Clients: {len(results)}, served in time: {len(served)}, wall time: {elapsed:.2f}s')
+        if served:
+            served.sort()
+            self.stdout.write(
+                f'Latency p50: {statistics.median(served):.2f}s, '
+                f'p95: {served[math.ceil(len(served) * 0.95) - 1]:.2f}s, '
+                f'max: {served[-1]:.2f}s'
+            )
+        for outcome, count in sorted(failures.items(), key=str):
+            self.stdout.write(f'  {outcome}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'{len(served)}/{len(results)} slow clients served'))
+
+    def obtain_token(self, url, email, password):
+        request = Request(
+            f'{url.scheme}://{url.netloc}/api/token/',
+            data=json.dumps({'username': email, 'password': password}).encode(),
+            headers={'Content-Type': 'application/json'},
+        )
+        with urlopen(request) as response:
+            return json.loads(response.read())['access']
+
+    async def run_clients(self, url, token, options):
+        path = url.path or '/'
+        if url.query:
+            path += f'?{url.query}'
+        headers = f'GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\nConnection: close\r\n'
+        if token:
+            headers += f'Authorization: Bearer {token}\r\n'
+        request = f'{headers}\r\n'.encode()
+        clients = [
+            self.slow_client(url.hostname, url.port or 80, request, options['trickle'], options['timeout'])
+            for _ in range(options['clients'])
+        ]
+        return await asyncio.gather(*clients)
+
+    async def slow_client(self, host, port, request, trickle, timeout):
+        """
+        Send ``request`` in ten pieces spread over ``trickle`` seconds, then read
+        the whole response. Returns ``(status or error, latency)``.
+        """
+        started = time.monotonic()
+        writer = None
+        try:
+            async with asyncio.timeout(timeout):
+                reader, writer = await asyncio.open_connection(host, port)
+                step = -(-len(request) // 10)
+                for offset in range(0, len(request), step):
+                    writer.write(request[offset:offset + step])
+                    await writer.drain()
+                    await asyncio.sleep(trickle / 10)
+                status_line = await reader.readline()
+                await reader.read()
+            outcome = int(status_line.split()[1]) if status_line else 'empty response'
+        except TimeoutError:
+            outcome = 'timeout'
+        except (OSError, ValueError, IndexError) as exc:
+            outcome = type(exc).__name__
+        finally:
+            if writer is not None:
+                writer.close()
+        return outcome, time.monotonic() - started
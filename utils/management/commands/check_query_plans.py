@@ -0,0 +1,215 @@
+import re
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from apps.roi.accrual import ending_between
+from apps.roi.cache import schedule_rows
+from apps.roi.models import AccrualState, ROI
+from apps.transaction.models import Transaction, WithdrawalEligibility
+from apps.transaction.pagination import Position, TransactionCursorPagination, after
+from apps.transaction.serializers import TransactionListSerializer
+from apps.wallet.models import BalanceCheckpoint, Posting, Wallet
+from utils.bo import (
+    _checkpoint_query, active_rois, annotate_ledger, approved_withdrawals, history_transactions, primary_wallet,
+    start_of_day,
+)
+
+User = get_user_model()
+
+# PostgreSQL: "Seq Scan on transaction_transaction". SQLite: "SCAN transaction_transaction"
+# (an index scan reads "SCAN t USING INDEX ..." and a lookup "SEARCH t USING ...").
+SEQUENTIAL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)(?! USING)(?:\s|$)'),
+}
+
+
+def sequential_scans(plan, vendor):
+    """
+    Return the tables read with a sequential scan in an EXPLAIN output.
+    """
+    pattern = SEQUENTIAL_SCAN.get(vendor)
+    if pattern is None:
+        return []
+    return [table for table in pattern.findall(plan) if table != 'CONSTANT']
+
+
+def hot_queries(user):
+    """
+    The queries run on every request of the balance engine and the viewsets,
+    built exactly as the application builds them, for ``user``.
+    """
+    now = timezone.now()
+    wallets = user.wallets.all()
+    staff_list = TransactionListSerializer.setup_eager_loading(Transaction.objects.all())
+    client_list = TransactionListSerializer.setup_eager_loading(
+        Transaction.objects.filter(models.Q(origin__in=wallets) | models.Q(destination__in=wallets))
+    )
+    ordering = TransactionCursorPagination.ordering
+    page_size = TransactionCursorPagination.page_size
+    cutoff = start_of_day(now)
+    return {
+        'login': User.objects.filter(email=user.email),
+        'primary_wallet': Wallet.objects.filter(owner=user).order_by('pk')[:1],
+        'ledger': annotate_ledger(User.all_objects.filter(pk=user.pk), now),
+        'withdrawals': approved_withdrawals(user),
+        'checkpoint_lookup': BalanceCheckpoint.objects.filter(owner=user, as_of__lte=cutoff).order_by('-as_of')[:1],
+        'checkpoint_totals': _checkpoint_query(user, cutoff),
+        'balance_history': history_transactions(user, now),
+        'roi_schedule': schedule_rows(user.pk),
+        'roi_history': schedule_rows(user.pk, before=now),
+        'active_rois': active_rois(now).filter(owner=user),
+        'accrual_state': AccrualState.objects.filter(owner_id=user.pk),
+        'accrual_settle': ending_between(user.pk, now - timedelta(days=1), now),
+        'ledger_balance': Posting.objects.filter(wallet=primary_wallet(user)).order_by('-sequence')[:1],
+        'transaction_list_staff': staff_list.order_by(*ordering)[:page_size],
+        'transaction_list_client': client_list.order_by(*ordering)[:page_size],
+        'transaction_list_next_page': after(staff_list, Position(now, uuid.UUID(int=0))).order_by(*ordering)[:page_size],
+        # The lookup of get_eligibility, which decides every withdrawal.
+        'check_withdrawal': WithdrawalEligibility.objects.select_related('owner__accrual_state').filter(
+            owner_id=user.pk,
+        ).order_by('pk')[:1],
+        'review_claim': Transaction.objects.filter(
+            models.Q(claim_expires_at__isnull=True) | models.Q(claim_expires_at__lte=now),
+            is_pending=True,
+            is_deposit=False,
+        ).order_by('created_at')[:page_size],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Runs EXPLAIN on the hot queries and fails if any of them reads a table with a sequential scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Explain the queries of this user (defaults to the first client)')
+        parser.add_argument(
+            '--seed-users',
+            type=int,
+            default=0,
+            help='Seed a benchmark dataset of this many users first (rolled back at the end)'
+        )
+        parser.add_argument('--deposits', type=int, default=20, help='Deposits per seeded user')
+        parser.add_argument(
+            '--disable-seqscan',
+            action='store_true',
+            help='PostgreSQL: make sequential scans a last resort, so on a small dataset they only '
+                 'show up when no index can serve the query'
+        )
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in SEQUENTIAL_SCAN:
+            self.stdout.write(self.style.WARNING(f'Query plans of {vendor} are not checked'))
+            return
+
+        with transaction.atomic():
+            if options['disable_seqscan'] and vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            if options['seed_users']:
+                self.seed(options['seed_users'], options['deposits'])
+            failures = self.check_plans(options)
+            # Never keep the benchmark dataset.
+            transaction.set_rollback(bool(options['seed_users']))
+
+        if failures:
+            raise CommandError(f'Sequential scans found in: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('No sequential scans in the hot queries'))
+
+    def check_plans(self, options):
+        users = User.objects.filter(is_staff=False).order_by('pk')
+        if options['email']:
+            users = User.objects.filter(email=options['email'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No user to explain the queries of, use --seed-users')
+
+        failures = []
+        for name, queryset in hot_queries(user).items():
+            plan = queryset.explain()
+            tables = sequential_scans(plan, connection.vendor)
+            if options['verbose_plans']:
+                self.stdout.write(f'-- {name}\n{plan}\n')
+            if tables:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: sequential scan on {", ".join(sorted(set(tables)))}'))
+            else:
+                self.stdout.write(f'{name}: ok')
+        return failures
+
+    def seed(self, user_count, deposits):
+        """
+        Insert ``user_count`` users with a wallet, ``deposits`` deposits and
+        their ROIs each, one pending withdrawal, an accrual state, a checkpoint
+        and a posting, then refresh statistics.
+        """
+        system = User.objects.filter(is_staff=True).first()
+        if system is None:
+            system = User.objects.create_user(
+                username=f'bench-{uuid.uuid4().hex[:8]}',
+                email=f'bench-{uuid.uuid4().hex[:8]}@example.com',
+                name='Benchmark',
+                last_name='System',
+                password=None,
+            )
+        system_wallet = Wallet.objects.filter(owner=system).order_by('pk').first()
+        if system_wallet is None:
+            system_wallet = Wallet.objects.create(owner=system, address=f'SYSTEM-{uuid.uuid4().hex}')
+
+        tag = uuid.uuid4().hex[:8]
+        users = User.objects.bulk_create([
+            User(username=f'bench-{tag}-{i}', email=f'bench-{tag}-{i}@example.com', password='!')
+            for i in range(user_count)
+        ])
+        wallets = Wallet.objects.bulk_create([
+            Wallet(owner=user, address=f'bench-{tag}-{i}')
+            for i, user in enumerate(users)
+        ])
+
+        amounts = [Decimal(100 + 250 * (i % 25)) for i in range(deposits)]
+        transactions, rois = [], []
+        for user, wallet in zip(users, wallets):
+            for amount in amounts:
+                deposit = Transaction(
+                    origin=wallet, destination=system_wallet, amount=amount,
+                    is_deposit=True, is_pending=False, is_approved=True,
+                )
+                transactions.append(deposit)
+                level = ROI.get_level_by_deposit(amount)
+                config = ROI.LEVEL_CONFIG[level]
+                rois.append(ROI(
+                    owner=user, deposit_amount=amount, level=level,
+                    roi_percentage=config['roi_percentage'], daily_percentage=config['daily_percentage'],
+                    duration_seconds=config['duration_days'] * 24 * 60 * 60, transaction=deposit,
+                ))
+            transactions.append(Transaction(
+                origin=system_wallet, destination=wallet, amount=Decimal('10'),
+            ))
+        Transaction.objects.bulk_create(transactions, batch_size=2000)
+        ROI.objects.bulk_create(rois, batch_size=2000)
+
+        # The per-user state tables every read goes through.
+        total = sum(amounts)
+        today = start_of_day(timezone.now())
+        AccrualState.objects.bulk_create([AccrualState(owner=user) for user in users], batch_size=2000)
+        BalanceCheckpoint.objects.bulk_create([
+            BalanceCheckpoint(owner=user, as_of=today, deposits=total) for user in users
+        ], batch_size=2000)
+        Posting.objects.bulk_create([
+            Posting(
+                wallet=wallet, counterparty=system_wallet, transaction=deposit, entry=uuid.uuid4(), sequence=1,
+                kind=Posting.DEPOSIT, amount=total, hold=0, balance=total, held=0,
+            )
+            for wallet, deposit in zip(wallets, transactions[::deposits + 1])
+        ], batch_size=2000)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(f'Seeded {len(users)} users, {len(transactions)} transactions and {len(rois)} ROIs')
@@ -1,4 +1,5 @@
 import uuid
+from decimal import Decimal
 from typing import ClassVar
 
 from django.db import models, transaction
@@ -6,6 +7,44 @@ from django.db.models.options import Options
 from django.utils.timezone import now
 
 
+class ExactIntegerField(models.Field):
+    """
+    Integer of up to ``max_digits`` digits, beyond the 64 bits of a
+    BigIntegerField, kept exact on every backend: ``numeric`` on PostgreSQL
+    and text on SQLite, whose NUMERIC columns store large values as floats.
+    Python values are ``int``. Don't do arithmetic on it in SQL.
+    """
+
+    def __init__(self, *args, max_digits=80, **kwargs):
+        self.max_digits = max_digits
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.max_digits != 80:
+            kwargs['max_digits'] = self.max_digits
+        return name, path, args, kwargs
+
+    def db_type(self, connection):
+        if connection.vendor == 'sqlite':
+            return 'text'
+        return f'numeric({self.max_digits}, 0)'
+
+    def to_python(self, value):
+        if value is None or isinstance(value, int):
+            return value
+        return int(value)
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = self.to_python(value)
+        if value is None:
+            return None
+        return str(value) if connection.vendor == 'sqlite' else Decimal(value)
+
+
 class SoftDeleteManager(models.Manager):  # noqa: R0903
     """Manager to retrieve only non-deleted objects."""
 
@@ -139,3 +178,20 @@ class BaseModel(models.Model):  # noqa: R0903
 
     class Meta:  # noqa: R0903
         abstract = True
+
+
+def bulk_create_dated(model, objs, derived=(), **kwargs):
+    """
+    ``bulk_create`` keeping the ``created_at`` set on ``objs`` (e.g. when
+    importing history) instead of the insert time stamped by ``auto_now_add``:
+    the rows are given their dates back in a ``bulk_update``, along with the
+    ``derived`` fields whose ``pre_save`` computes them from ``created_at``.
+    """
+    dates = [obj.created_at for obj in objs]
+    objs = model.objects.bulk_create(objs, **kwargs)
+    for obj, created_at in zip(objs, dates):
+        obj.created_at = created_at
+        for name in derived:
+            model._meta.get_field(name).pre_save(obj, False)
+    model.objects.bulk_update(objs, ['created_at', *derived], batch_size=1000)
+    return objs
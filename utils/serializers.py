@@ -0,0 +1,30 @@
+class SparseFieldsetMixin:
+    """
+    Serializer limited to a subset of its fields.
+
+    The subset is given with ``fields`` (the fields to keep) and ``omit`` (the
+    fields to drop), as lists or through the comma-separated ``?fields=`` and
+    ``?omit=`` of the request in the context, which take precedence. Unknown
+    names are ignored. Other fields are removed before serializing, so their
+    ``get_<field>`` methods never run.
+    """
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None:
+            params = getattr(request, 'query_params', request.GET)
+            if 'fields' in params:
+                fields = self.split(params['fields'])
+            if 'omit' in params:
+                omit = self.split(params['omit'])
+
+        dropped = set(omit or ())
+        if fields is not None:
+            dropped.update(set(self.fields) - set(fields))
+        for name in dropped:
+            self.fields.pop(name, None)
+
+    @staticmethod
+    def split(value):
+        return [name.strip() for name in value.split(',') if name.strip()]
@@ -1,7 +1,20 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
+from django.test import RequestFactory, SimpleTestCase
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from apps.roi.models import ROI
+from apps.transaction.models import Transaction
+from apps.wallet.models import Wallet
+from utils.bo import calculate_balance, calculate_balance_total, calculate_rois, calculate_rois_by_owner
+from utils.fixedpoint import MAX_AMOUNT, MAX_UNITS, divide, from_units, to_units
+
 User = get_user_model()
 
 
@@ -24,3 +37,118 @@ class BaseTestCase(APITestCase):
             'refresh': str(refresh),
             'access': str(refresh.access_token),
         }
+
+    def call_async(self, view, path, token=None, **extra):
+        """
+        Call the async ``view`` with a GET of ``path`` authenticated as the test user.
+        """
+        if token is None:
+            token = self.token['access']
+        if token:
+            extra['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        return async_to_sync(view)(RequestFactory().get(path, **extra))
+
+
+class FixedPointTests(SimpleTestCase):
+    def test_round_trip(self):
+        for amount in ['0', '0.0000000001', '1', '1000.12345678', '-42.5', '0.3', str(MAX_AMOUNT), str(-MAX_AMOUNT)]:
+            self.assertEqual(from_units(to_units(amount)), Decimal(amount))
+        self.assertEqual(to_units(MAX_AMOUNT), MAX_UNITS)
+        self.assertEqual(to_units(0.1), to_units('0.1'))
+
+    def test_rounds_half_to_even(self):
+        self.assertEqual(to_units('0.00000000005'), 0)
+        self.assertEqual(to_units('0.00000000015'), 2)
+        self.assertEqual(to_units('0.00000000025'), 2)
+        self.assertEqual(to_units('-0.00000000015'), -2)
+        self.assertEqual([divide(n, 2) for n in (5, 7, 9, -5, -7)], [2, 4, 4, -2, -4])
+        self.assertEqual([divide(n, 3) for n in (4, 5, -4, -5)], [1, 2, -1, -2])
+
+    def test_out_of_range(self):
+        for amount in [MAX_AMOUNT + Decimal('0.0000000001'), -MAX_AMOUNT - 1, '1e12']:
+            with self.assertRaises(ValueError):
+                to_units(amount)
+
+
+def baseline_rois(user, at):
+    """
+    ``calculate_rois`` as the original per-ROI Decimal loop computed it.
+    """
+    total = Decimal('0')
+    for roi in ROI.objects.filter(owner=user):
+        if roi.created_at + timedelta(seconds=roi.duration_seconds) - at > timedelta(0):
+            per_second = roi.deposit_amount * roi.daily_percentage / 100 / Decimal(str(24 * 60 * 60))
+            total += round(per_second * Decimal(str((at - roi.created_at).total_seconds())), 10)
+    for withdrawal in Transaction.objects.filter(destination=user.wallets.first(), is_deposit=False,
+                                                 is_approved=True):
+        total -= withdrawal.amount
+    return total
+
+
+class BalanceParityTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create_user(
+            username='admin', email='admin@gmail.com', name='Admin', last_name='User', password='testpass123'
+        )
+        self.system_wallet = Wallet.objects.create(owner=admin, address='SYSTEM_WALLET')
+        self.wallet = Wallet.objects.create(owner=self.user, address='USER_WALLET')
+
+    def add_deposit(self, amount, days_ago=0):
+        deposit = Transaction.objects.create(
+            origin=self.wallet, destination=self.system_wallet, amount=Decimal(amount), is_deposit=True,
+            is_pending=False, is_approved=True,
+        )
+        roi = ROI.objects.create(owner=self.user, deposit_amount=deposit.amount, transaction=deposit)
+        if days_ago:
+            roi.created_at -= timedelta(days=days_ago, seconds=12345, microseconds=678)
+            roi.save(update_fields=['created_at'])
+
+    def totals(self, at):
+        with mock.patch('django.utils.timezone.now', return_value=at):
+            me = self.client.get('/api/v1/me/').data['balance']
+            return calculate_rois(self.user), calculate_balance(self.user), calculate_balance_total(self.user), me
+
+    def test_matches_the_per_roi_loop(self):
+        self.add_deposit('5000', days_ago=70)  # expired
+        self.add_deposit('1000', days_ago=10)
+        self.add_deposit('123.45678901', days_ago=3)
+        self.add_deposit('500')
+        Transaction.objects.create(
+            origin=self.system_wallet, destination=self.wallet, amount=Decimal('10'), is_deposit=False,
+            is_pending=False, is_approved=True,
+        )
+        at = timezone.now() + timedelta(hours=1)
+        rois, balance, total, me = self.totals(at)
+
+        self.assertEqual(total, balance + rois)
+        self.assertEqual(me, rois)
+        self.assertEqual(balance, Decimal('6623.45678901') - 10)
+        # The accrual state rounds the sum of the 3 active ROIs once instead of each of them.
+        self.assertLessEqual(abs(rois - baseline_rois(self.user, at)), 3 * Decimal('1E-10'))
+
+    def test_single_active_roi_is_identical(self):
+        self.add_deposit('5000', days_ago=61)
+        self.add_deposit('1000.12345678', days_ago=5)
+        at = timezone.now() + timedelta(minutes=7)
+        rois, _, _, me = self.totals(at)
+        self.assertEqual(rois, baseline_rois(self.user, at))
+        self.assertEqual(me, rois)
+
+    def test_batch_matches_calculate_rois(self):
+        self.add_deposit('5000', days_ago=70)  # expired
+        self.add_deposit('1000', days_ago=10)
+        self.add_deposit('123.45678901', days_ago=3)
+        other = User.objects.create_user(
+            username='other', email='other@example.com', name='Other', last_name='User', password='testpass123'
+        )
+        other_wallet = Wallet.objects.create(owner=other, address='OTHER_WALLET')
+        Transaction.objects.create(
+            origin=self.system_wallet, destination=other_wallet, amount=Decimal('3'), is_deposit=False,
+            is_pending=False, is_approved=True,
+        )
+        at = timezone.now() + timedelta(hours=1)
+        with self.assertNumQueries(2):
+            rois = calculate_rois_by_owner([self.user.pk, other.pk], at)
+        with mock.patch('django.utils.timezone.now', return_value=at):
+            self.assertEqual(rois, {self.user.pk: calculate_rois(self.user), other.pk: Decimal('-3')})